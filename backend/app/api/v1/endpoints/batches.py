@@ -0,0 +1,152 @@
+"""Batch inference endpoints: submit many prompts, fetch results later."""
+
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_current_user
+from app.db.session import async_session_maker, get_db
+from app.schemas.batch import BatchCreate, BatchOut, BatchResultOut, BatchResultPage
+from app.services.batch_service import BatchService
+from app.services.batch_worker import BatchWorkerPool
+
+router = APIRouter()
+
+
+def get_batch_service(db: Annotated[AsyncSession, Depends(get_db)]) -> BatchService:
+    return BatchService(db)
+
+
+async def _get_batch_or_404(service: BatchService, batch_id: str, user_id: str):
+    batch = await service.get(batch_id, user_id)
+    if batch is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found",
+        )
+    return batch
+
+
+@router.post(
+    "",
+    response_model=BatchOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit prompts for offline completion",
+)
+async def create_batch(
+    data: BatchCreate,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[BatchService, Depends(get_batch_service)],
+) -> BatchOut:
+    """Queue every prompt as an independent single-turn completion.
+
+    Batch workers process prompts while the model has slots left over from
+    interactive chat. Poll ``GET /batches/{id}`` for progress and read
+    results with ``GET /batches/{id}/results``.
+    """
+    batch = await service.create(
+        user_id=current_user["email"],
+        model=data.model,
+        prompts=data.prompts,
+        system=data.system,
+        options=data.options,
+    )
+    BatchWorkerPool.notify()
+    return BatchOut.model_validate(batch)
+
+
+@router.get(
+    "",
+    response_model=list[BatchOut],
+    summary="List the user's most recent batches",
+)
+async def list_batches(
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[BatchService, Depends(get_batch_service)],
+    limit: int = Query(50, ge=1, le=200, description="Maximum batches to return"),
+) -> list[BatchOut]:
+    batches = await service.list(current_user["email"], limit=limit)
+    return [BatchOut.model_validate(b) for b in batches]
+
+
+@router.get(
+    "/{batch_id}",
+    response_model=BatchOut,
+    summary="Get batch progress",
+)
+async def get_batch(
+    batch_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[BatchService, Depends(get_batch_service)],
+) -> BatchOut:
+    batch = await _get_batch_or_404(service, batch_id, current_user["email"])
+    return BatchOut.model_validate(batch)
+
+
+@router.get(
+    "/{batch_id}/results",
+    response_model=BatchResultPage,
+    summary="Get a page of results in prompt order",
+)
+async def get_batch_results(
+    batch_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[BatchService, Depends(get_batch_service)],
+    after: int = Query(-1, ge=-1, description="Return prompts with a greater index"),
+    limit: int = Query(100, ge=1, le=1000, description="Items per page"),
+) -> BatchResultPage:
+    await _get_batch_or_404(service, batch_id, current_user["email"])
+    items = await service.results(batch_id, after=after, limit=limit)
+    return BatchResultPage(
+        items=[BatchResultOut.from_model(item) for item in items],
+        next_after=items[-1].index if len(items) == limit else None,
+    )
+
+
+@router.get(
+    "/{batch_id}/results.ndjson",
+    response_class=StreamingResponse,
+    summary="Stream finished results as NDJSON",
+)
+async def stream_batch_results(
+    batch_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+) -> StreamingResponse:
+    """One ``BatchResultOut`` JSON object per line, for every finished prompt.
+
+    No request-scoped session: yield dependencies are only torn down after
+    the response has been sent, so its connection would sit idle in a
+    transaction for the whole stream. The ownership check uses a session
+    that is closed before streaming starts, and the body reads with its own.
+    """
+    async with async_session_maker() as db:
+        await _get_batch_or_404(BatchService(db), batch_id, current_user["email"])
+
+    async def lines():
+        async with async_session_maker() as db:
+            async for item in BatchService(db).iter_results(batch_id):
+                yield BatchResultOut.from_model(item).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.delete(
+    "/{batch_id}",
+    response_model=BatchOut,
+    summary="Cancel a batch",
+)
+async def cancel_batch(
+    batch_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[BatchService, Depends(get_batch_service)],
+) -> BatchOut:
+    """Stop a queued or running batch; prompts already running still finish."""
+    batch = await service.cancel(batch_id, current_user["email"])
+    if batch is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found",
+        )
+    return BatchOut.model_validate(batch)
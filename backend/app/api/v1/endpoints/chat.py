@@ -1,15 +1,19 @@
 """Chat API endpoints for conversations and messaging."""
 
-from typing import Annotated, Any
+from datetime import datetime
+from typing import Annotated, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import Settings, get_settings
 from app.core.security import get_current_user
 from app.db.session import get_db
 from app.schemas.chat import (
+    ChatCompletionOut,
+    ChatMessageOut,
+    ChatOptions,
     ChatRequest,
     ChatResponseChunk,
     ConversationCreate,
@@ -17,9 +21,15 @@ from app.schemas.chat import (
     ConversationList,
     ConversationOut,
     ConversationUpdate,
+    MessagePage,
     ModelList,
 )
 from app.services.chat_service import ChatService
+from app.services.llm_provider import ProviderUnavailableError
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.scheduler import QueueFullError
+from app.services.sse import coalesce_chunks, encode_chunk
+from app.services.stream_buffer import GenerationBuffer, StreamRegistry
 
 router = APIRouter()
 
@@ -31,6 +41,25 @@ def get_chat_service(
     return ChatService(db, provider_name=settings.llm_provider)
 
 
+def get_provider_service(
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> ChatService:
+    """For endpoints that only talk to the LLM provider: no database session."""
+    return ChatService(None, provider_name=settings.llm_provider)
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, str]]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
 # =============================================================================
 # Conversation CRUD  (delegates to ChatService.conversations)
 # =============================================================================
@@ -64,20 +93,35 @@ async def create_conversation(
 async def list_conversations(
     current_user: Annotated[dict[str, Any], Depends(get_current_user)],
     service: Annotated[ChatService, Depends(get_chat_service)],
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number; prefer cursor for deep pages"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Count all conversations (one extra query)"),
 ) -> ConversationList:
+    """Most recently updated first.
+
+    Follow ``next_cursor`` with ``include_total=false`` to page through any
+    number of conversations at constant cost per page.
+    """
     conversations, total = await service.conversations.list(
         user_id=current_user["email"],
         page=page,
         page_size=page_size,
+        cursor=_decode_cursor(cursor),
+        include_total=include_total,
     )
 
+    next_cursor = None
+    if len(conversations) == page_size:
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
     return ConversationList(
         items=[ConversationOut.from_model(c) for c in conversations],
         total=total,
-        page=page,
+        # page is ignored when a cursor is given; don't echo it back.
+        page=None if cursor else page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -90,11 +134,17 @@ async def get_conversation(
     conversation_id: str,
     current_user: Annotated[dict[str, Any], Depends(get_current_user)],
     service: Annotated[ChatService, Depends(get_chat_service)],
+    latest: Optional[int] = Query(
+        None,
+        ge=1,
+        le=500,
+        description="Return only the newest N messages; load older ones from /messages",
+    ),
 ) -> ConversationDetailOut:
     conversation = await service.conversations.get(
         conversation_id=conversation_id,
         user_id=current_user["email"],
-        include_messages=True,
+        include_messages=latest is None,
     )
 
     if not conversation:
@@ -103,7 +153,55 @@ async def get_conversation(
             detail="Conversation not found",
         )
 
-    return ConversationDetailOut.from_model(conversation)
+    if latest is None:
+        return ConversationDetailOut.from_model(conversation)
+    messages, _ = await service.conversations.get_messages(conversation_id, limit=latest)
+    return ConversationDetailOut.from_model(conversation, messages)
+
+
+@router.get(
+    "/conversations/{conversation_id}/messages",
+    response_model=MessagePage,
+    summary="Get a window of a conversation's messages",
+)
+async def get_conversation_messages(
+    conversation_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[ChatService, Depends(get_chat_service)],
+    before: Optional[str] = Query(None, description="Messages older than this cursor"),
+    after: Optional[str] = Query(None, description="Messages newer than this cursor"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum messages to return"),
+    include_meta: bool = Query(True, description="Include each message's metadata"),
+) -> MessagePage:
+    """Messages oldest first. Without cursors, returns the newest ``limit``.
+
+    Scroll back by passing the returned ``before`` as ``before`` while
+    ``has_more`` is true; fetch messages added since with ``after``.
+    """
+    conversation = await service.conversations.get(
+        conversation_id=conversation_id,
+        user_id=current_user["email"],
+        include_messages=False,
+    )
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
+
+    messages, has_more = await service.conversations.get_messages(
+        conversation_id,
+        before=_decode_cursor(before),
+        after=_decode_cursor(after),
+        limit=limit,
+        include_meta=include_meta,
+    )
+    return MessagePage(
+        items=[ChatMessageOut.from_model(m, include_meta) for m in messages],
+        has_more=has_more,
+        before=encode_cursor(messages[0].created_at, messages[0].id) if messages else None,
+        after=encode_cursor(messages[-1].created_at, messages[-1].id) if messages else None,
+    )
 
 
 @router.patch(
@@ -161,39 +259,22 @@ async def delete_conversation(
 # =============================================================================
 
 
-@router.post(
-    "/conversations/{conversation_id}/chat",
-    summary="Send a message and stream response",
-    response_class=StreamingResponse,
-)
-async def chat_stream(
-    conversation_id: str,
-    data: ChatRequest,
-    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
-    service: Annotated[ChatService, Depends(get_chat_service)],
+def _sse_response(
+    buffer: GenerationBuffer,
+    options: ChatOptions,
+    last_event_id: int = 0,
 ) -> StreamingResponse:
-    """Stream AI response as Server-Sent Events."""
+    """Tail a generation buffer as Server-Sent Events with numbered ids."""
 
     async def event_generator():
         try:
-            async for chunk in service.send_message(
-                conversation_id=conversation_id,
-                user_id=current_user["email"],
-                content=data.message,
-                options=data.options,
-            ):
-                if chunk.is_finished:
-                    response = ChatResponseChunk(type="done", metadata=chunk.metadata)
-                elif chunk.metadata and chunk.metadata.get("error"):
-                    response = ChatResponseChunk(
-                        type="error", error=chunk.content, metadata=chunk.metadata,
-                    )
-                elif chunk.is_thinking:
-                    response = ChatResponseChunk(type="thinking", content=chunk.content)
-                else:
-                    response = ChatResponseChunk(type="chunk", content=chunk.content)
-
-                yield f"data: {response.model_dump_json()}\n\n"
+            chunks = coalesce_chunks(
+                buffer.tail(last_event_id),
+                window_ms=options.coalesce_ms,
+                max_bytes=options.coalesce_bytes,
+            )
+            async for event_id, chunk in chunks:
+                yield encode_chunk(chunk, fast=options.fast_frames, event_id=event_id)
 
         except Exception as e:
             error_response = ChatResponseChunk(
@@ -212,16 +293,150 @@ async def chat_stream(
     )
 
 
+@router.post(
+    "/conversations/{conversation_id}/chat",
+    summary="Send a message and stream response",
+    response_class=StreamingResponse,
+    response_model=None,
+    responses={
+        200: {"model": ChatCompletionOut, "description": "Returned when options.stream is false"},
+        429: {"description": "Too many requests queued for the model; see Retry-After"},
+        503: {"description": "The LLM provider is down; see Retry-After"},
+    },
+)
+async def chat_stream(
+    conversation_id: str,
+    data: ChatRequest,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[ChatService, Depends(get_chat_service)],
+) -> Response:
+    """Stream AI response as Server-Sent Events.
+
+    Each frame carries an ``id:``; if the connection drops, resume with
+    ``GET .../chat/stream`` and the last id received as ``Last-Event-ID``.
+    With ``options.stream`` set to false, the whole response is returned as
+    a single JSON ``ChatCompletionOut`` instead.
+
+    While the model is at its concurrency limit, ``queued`` events report the
+    request's place in line; if the line is full, the response is 429 with
+    ``Retry-After``. While the provider is known to be down the response is
+    503 with ``Retry-After``, without waiting on connection timeouts.
+    """
+    try:
+        if not data.options.stream:
+            return await _complete(conversation_id, data, current_user["email"], service)
+
+        buffer = await service.start_generation(
+            conversation_id=conversation_id,
+            user_id=current_user["email"],
+            content=data.message,
+            options=data.options,
+        )
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ProviderUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return _sse_response(buffer, data.options)
+
+
+async def _complete(
+    conversation_id: str,
+    data: ChatRequest,
+    user_id: str,
+    service: ChatService,
+) -> JSONResponse:
+    result = await service.complete_message(
+        conversation_id=conversation_id,
+        user_id=user_id,
+        content=data.message,
+        options=data.options,
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
+
+    completion, message_id = result
+    if completion.metadata and completion.metadata.get("error"):
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=completion.content,
+        )
+
+    out = ChatCompletionOut(
+        message_id=message_id,
+        content=completion.content,
+        thinking=completion.thinking or None,
+        metadata=completion.metadata,
+    )
+    return JSONResponse(content=out.model_dump(mode="json"))
+
+
+@router.get(
+    "/conversations/{conversation_id}/chat/stream",
+    summary="Resume an in-flight streaming response",
+    response_class=StreamingResponse,
+)
+async def resume_chat_stream(
+    conversation_id: str,
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    last_event_id: Annotated[int, Header(alias="Last-Event-ID", ge=0)] = 0,
+) -> StreamingResponse:
+    """Replay chunks after ``Last-Event-ID``, then follow the live generation.
+
+    Chunks are framed with the options of the original request. Buffers are
+    kept by the worker process running the generation, so with several
+    workers a resume that lands on another one gets a 404 and the client
+    should fall back to reloading the conversation.
+    """
+    buffer = StreamRegistry.get(conversation_id)
+    if buffer is None or buffer.user_id != current_user["email"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active or recent stream for this conversation",
+        )
+
+    return _sse_response(buffer, buffer.options, last_event_id)
+
+
 @router.delete(
     "/conversations/{conversation_id}/chat",
     status_code=status.HTTP_204_NO_CONTENT,
-    summary="Stop an active streaming response",
+    summary="Stop the conversation's active responses",
 )
 async def stop_chat_stream(
     conversation_id: str,
     current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+    service: Annotated[ChatService, Depends(get_chat_service)],
 ) -> None:
-    ChatService.cancel_stream(conversation_id)
+    """Stop every generation of the conversation, on whichever worker runs it.
+
+    Covers streamed replies and ``stream: false`` requests, which then return
+    with ``cancelled`` metadata. Only the conversation's owner may stop them. A stream buffered by this
+    worker proves ownership without a database query.
+    """
+    buffer = StreamRegistry.get(conversation_id)
+    if buffer is None or buffer.user_id != current_user["email"]:
+        conversation = await service.conversations.get(
+            conversation_id=conversation_id,
+            user_id=current_user["email"],
+            include_messages=False,
+        )
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found",
+            )
+    await ChatService.cancel_stream(conversation_id)
 
 
 # =============================================================================
@@ -235,7 +450,7 @@ async def stop_chat_stream(
     summary="List available models",
 )
 async def list_models(
-    service: Annotated[ChatService, Depends(get_chat_service)],
+    service: Annotated[ChatService, Depends(get_provider_service)],
 ) -> ModelList:
     models = await service.list_available_models()
     return ModelList(models=models)
@@ -243,9 +458,9 @@ async def list_models(
 
 @router.get(
     "/health/llm",
-    summary="Check LLM provider health",
+    summary="Check LLM provider health (cached from background probes)",
 )
 async def health_check(
-    service: Annotated[ChatService, Depends(get_chat_service)],
+    service: Annotated[ChatService, Depends(get_provider_service)],
 ) -> dict[str, bool]:
     return await service.health_check()
@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+
+from app.core.metrics import Metrics
+from app.core.security import get_current_user
+from app.db.session import pool_status
 
 router = APIRouter()
 
@@ -6,3 +12,15 @@ router = APIRouter()
 @router.get("/health", tags=["health"])
 async def health_check() -> dict:
     return {"status": "ok", "message": "Garbanzo AI backend is running"}
+
+
+@router.get("/metrics", tags=["health"])
+async def metrics(
+    current_user: Annotated[dict[str, Any], Depends(get_current_user)],
+) -> dict[str, Any]:
+    """In-process counters and summaries for this worker; requires a login.
+
+    ``db.pool_wait_seconds`` summarizes how long requests waited for a
+    database connection; ``db_pool`` is the pool's current state.
+    """
+    return {**Metrics.snapshot(), "db_pool": pool_status()}
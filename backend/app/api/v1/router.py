@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, chat, health
+from app.api.v1.endpoints import auth, batches, chat, health
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(batches.router, prefix="/batches", tags=["batches"])
 api_router.include_router(health.router, prefix="", tags=["health"])
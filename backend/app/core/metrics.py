@@ -0,0 +1,56 @@
+"""Lightweight in-process metrics.
+
+Values are per worker process and reset on restart. They are exposed as JSON
+at ``GET /api/v1/metrics``.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class _Summary:
+    count: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """Process-wide registry of counters and value summaries."""
+
+    _counters: dict[str, float] = {}
+    _summaries: dict[str, _Summary] = {}
+
+    @classmethod
+    def increment(cls, name: str, value: float = 1) -> None:
+        cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def observe(cls, name: str, value: float) -> None:
+        summary = cls._summaries.get(name)
+        if summary is None:
+            summary = cls._summaries[name] = _Summary()
+        summary.observe(value)
+
+    @classmethod
+    def snapshot(cls) -> dict[str, Any]:
+        return {
+            "counters": dict(cls._counters),
+            "summaries": {name: s.as_dict() for name, s in cls._summaries.items()},
+        }
@@ -1,15 +1,60 @@
+import logging
+import time
+import uuid
 from collections.abc import AsyncGenerator
+from typing import Any
 
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
+from app.core.metrics import Metrics
 from app.db.base import Base
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            Metrics.increment("db.pool_timeouts")
+            raise
+        finally:
+            Metrics.observe("db.pool_wait_seconds", time.perf_counter() - started)
+
+
+def _connect_args() -> dict[str, Any]:
+    if settings.db_transaction_pooler:
+        # Consecutive transactions may run on different server connections, where
+        # statements prepared on this one don't exist or have clashing names.
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    }
+
+
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=_connect_args(),
 )
 
 async_session_maker = async_sessionmaker(
@@ -21,18 +66,82 @@ async_session_maker = async_sessionmaker(
 )
 
 
+# ``create_all`` only creates missing tables. These bring tables created by
+# older versions up to date and must be safe to run on every start.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE conversations"
+    " ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,"
+    " ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE,"
+    " ADD COLUMN IF NOT EXISTS last_message_preview VARCHAR(200)",
+    "CREATE INDEX IF NOT EXISTS ix_conversations_user_updated"
+    " ON conversations (user_id, updated_at DESC, id DESC) WHERE NOT is_deleted",
+    "CREATE INDEX IF NOT EXISTS ix_messages_conversation_created"
+    " ON messages (conversation_id, created_at, id)",
+]
+
+# Fills the message stats of conversations that predate them. The preview
+# matches ``message_preview`` in the conversation service.
+BACKFILL_CONVERSATION_STATS = """
+UPDATE conversations AS c
+SET message_count = s.message_count,
+    last_message_at = s.created_at,
+    last_message_preview = left(btrim(regexp_replace(s.content, '\\s+', ' ', 'g')), 120)
+FROM (
+    SELECT DISTINCT ON (conversation_id)
+        conversation_id, content, created_at,
+        count(*) OVER (PARTITION BY conversation_id) AS message_count
+    FROM messages
+    ORDER BY conversation_id, created_at DESC
+) AS s
+WHERE c.id = s.conversation_id
+"""
+
+
+async def _upgrade_schema(conn) -> None:
+    has_stats = await conn.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM information_schema.columns"
+            " WHERE table_name = 'conversations' AND column_name = 'message_count')"
+        )
+    )
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+    if not has_stats:
+        result = await conn.execute(text(BACKFILL_CONVERSATION_STATS))
+        logger.info("Backfilled message stats for %d conversations", result.rowcount)
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await _upgrade_schema(conn)
+
+
+def pool_status() -> dict[str, int]:
+    """Connections held by this process's pool right now."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Request session; commits on success if anything was done.
+
+    ``AsyncSession`` only checks out a connection on its first query, so a
+    request that never queries never holds one.
+    """
     async with async_session_maker() as session:
         try:
             yield session
-            await session.commit()
+            if session.in_transaction():
+                await session.commit()
         except Exception:
-            await session.rollback()
+            if session.in_transaction():
+                await session.rollback()
             raise
         finally:
             await session.close()
@@ -10,7 +10,15 @@ from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.router import api_router
 from app.core.config import get_settings
-from app.db.session import init_db
+from app.db.session import async_session_maker, init_db
+from app.services.batch_worker import BatchWorkerPool
+from app.services.cancellation import CancellationBus
+from app.services.compaction import ConversationCompactor
+from app.services.completion_cache import CompletionCache
+from app.services.history_cache import HistoryCache
+from app.services.model_catalog import ModelCatalog
+from app.services.providers import start_providers, stop_providers
+from app.services.scheduler import GenerationScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +54,51 @@ async def _ensure_test_user() -> None:
 async def lifespan(app: FastAPI):
     await init_db()
     await _ensure_test_user()
+    HistoryCache.configure(
+        max_bytes=settings.history_cache_max_bytes,
+        ttl_seconds=settings.history_cache_ttl_seconds,
+    )
+    CompletionCache.configure(
+        enabled=settings.completion_cache_enabled,
+        max_bytes=settings.completion_cache_max_bytes,
+        ttl_seconds=settings.completion_cache_ttl_seconds,
+        session_factory=async_session_maker if settings.completion_cache_persist else None,
+    )
+    ModelCatalog.configure(
+        ttl_seconds=settings.model_catalog_ttl_seconds,
+        stale_seconds=settings.model_catalog_stale_seconds,
+    )
+    GenerationScheduler.configure(
+        max_concurrent=settings.scheduler_max_concurrent_per_model,
+        max_queue=settings.scheduler_max_queue_per_model,
+        model_limits=settings.scheduler_model_limits_map,
+    )
+    if settings.cancel_bus_enabled:
+        if settings.cancel_bus_database_url:
+            await CancellationBus.start(settings.cancel_bus_database_url)
+        elif settings.db_transaction_pooler:
+            logger.warning(
+                "Cross-worker stream cancellation is off: LISTEN doesn't work through a "
+                "transaction pooler. Set CANCEL_BUS_DATABASE_URL to a direct Postgres URL."
+            )
+        else:
+            await CancellationBus.start(settings.database_url)
+    await start_providers()
+    if settings.batch_workers:
+        BatchWorkerPool.start(
+            async_session_maker,
+            provider_name=settings.llm_provider,
+            workers=settings.batch_workers,
+            poll_interval=settings.batch_poll_seconds,
+            reserved_slots=settings.batch_reserved_slots,
+            max_attempts=settings.batch_max_attempts,
+            item_timeout=settings.batch_item_timeout_seconds,
+        )
     yield
+    await BatchWorkerPool.stop()
+    await ConversationCompactor.stop()
+    await stop_providers()
+    await CancellationBus.stop()
 
 
 # Create FastAPI app
@@ -1,5 +1,16 @@
+from app.models.batch import BatchItem, BatchJob
+from app.models.completion_cache import CompletionCacheEntry
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.summary import ConversationSummary
 from app.models.user import User
 
-__all__ = ["User", "Conversation", "Message"]
+__all__ = [
+    "User",
+    "BatchJob",
+    "BatchItem",
+    "CompletionCacheEntry",
+    "Conversation",
+    "ConversationSummary",
+    "Message",
+]
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import DateTime, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class CompletionCacheEntry(Base):
+    """A stored deterministic (temperature 0) completion, shared by all workers."""
+
+    __tablename__ = "completion_cache"
+
+    key: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+        comment="sha256 of model, messages and generation options",
+    )
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    thinking: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    meta: Mapped[Optional[dict[str, Any]]] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -15,6 +15,16 @@ class Conversation(Base):
     """A conversation thread between a user and the AI."""
 
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Serves the newest-first conversation list and its keyset cursor.
+        Index(
+            "ix_conversations_user_updated",
+            "user_id",
+            text("updated_at DESC"),
+            text("id DESC"),
+            postgresql_where=text("NOT is_deleted"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     user_id: Mapped[str] = mapped_column(
@@ -34,6 +44,23 @@ class Conversation(Base):
         onupdate=func.now(),
     )
     is_deleted: Mapped[bool] = mapped_column(default=False, nullable=False)
+    # Kept up to date in the same transaction as every message insert, so
+    # listing conversations never has to touch the messages table.
+    message_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+    last_message_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    last_message_preview: Mapped[str | None] = mapped_column(
+        String(200),
+        nullable=True,
+        comment="Start of the newest message, whitespace collapsed",
+    )
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="conversations")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -15,6 +15,12 @@ class Message(Base):
     """A single message within a conversation."""
 
     __tablename__ = "messages"
+    # Fetch created_at via RETURNING on insert so it's usable right after commit.
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Windows of a conversation's history, in either direction.
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     conversation_id: Mapped[str] = mapped_column(
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+MAX_BATCH_PROMPTS = 10_000
+
+
+class BatchOptions(BaseModel):
+    """Generation options applied to every prompt of a batch."""
+
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="Sampling temperature")
+    max_tokens: Optional[int] = Field(default=None, ge=1, description="Maximum tokens to generate")
+    top_p: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0, description="Nucleus sampling parameter"
+    )
+
+
+class BatchCreate(BaseModel):
+    """Request to complete a list of prompts offline."""
+
+    model: str = Field(..., max_length=100, description="The model to run every prompt through")
+    prompts: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_PROMPTS,
+        description="User messages, each completed independently",
+    )
+    system: Optional[str] = Field(None, description="Optional system prompt sent with every prompt")
+    options: BatchOptions = Field(default_factory=BatchOptions, description="Generation options")
+
+
+class BatchOut(BaseModel):
+    """A batch and its progress."""
+
+    id: str = Field(..., description="Unique batch ID")
+    model: str = Field(..., description="Model the prompts run through")
+    status: Literal["queued", "running", "completed", "cancelled"] = Field(
+        ..., description="Batch state"
+    )
+    total: int = Field(..., description="Number of prompts")
+    completed: int = Field(..., description="Prompts completed successfully")
+    failed: int = Field(..., description="Prompts that ended in an error")
+    created_at: datetime = Field(..., description="When the batch was submitted")
+    started_at: Optional[datetime] = Field(None, description="When the first prompt was picked up")
+    finished_at: Optional[datetime] = Field(None, description="When the last prompt finished")
+
+    model_config = {"from_attributes": True}
+
+
+class BatchResultOut(BaseModel):
+    """The outcome of one prompt."""
+
+    index: int = Field(..., description="Position of the prompt in the submitted list")
+    status: Literal["pending", "running", "done", "error", "cancelled"] = Field(
+        ..., description="Prompt state"
+    )
+    content: Optional[str] = Field(None, description="The generated response")
+    thinking: Optional[str] = Field(
+        None, description="The model's reasoning, for models that expose it"
+    )
+    error: Optional[str] = Field(None, description="Why the prompt failed (status 'error')")
+    metadata: Optional[dict[str, Any]] = Field(
+        None, description="Usage metadata (token counts, timing)"
+    )
+
+    @classmethod
+    def from_model(cls, item: "Any") -> "BatchResultOut":
+        """Build from an ORM ``BatchItem``."""
+        return cls(
+            index=item.index,
+            status=item.status,
+            content=item.content,
+            thinking=item.thinking or None,
+            error=item.error,
+            metadata=item.meta,
+        )
+
+
+class BatchResultPage(BaseModel):
+    """A page of results, in prompt order."""
+
+    items: list[BatchResultOut] = Field(..., description="Results of this page")
+    next_after: Optional[int] = Field(
+        None,
+        description="Pass as ``after`` to get the next page; null on the last page",
+    )
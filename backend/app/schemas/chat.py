@@ -30,6 +30,35 @@ class ChatMessageOut(ChatMessage):
 
     model_config = {"from_attributes": True}
 
+    @classmethod
+    def from_model(cls, msg: "Any", include_meta: bool = True) -> "ChatMessageOut":
+        """Build from an ORM ``Message``; ``meta`` is not read unless included."""
+        return cls(
+            id=msg.id,
+            role=msg.role,  # type: ignore[arg-type]
+            content=msg.content,
+            created_at=msg.created_at,
+            meta=msg.meta if include_meta else None,
+        )
+
+
+class MessagePage(BaseModel):
+    """A window of a conversation's messages, oldest first."""
+
+    items: list[ChatMessageOut] = Field(..., description="The messages")
+    has_more: bool = Field(
+        ...,
+        description="Whether more messages lie beyond this window in the direction read",
+    )
+    before: Optional[str] = Field(
+        None,
+        description="Pass as before to get the messages preceding this window",
+    )
+    after: Optional[str] = Field(
+        None,
+        description="Pass as after to get the messages following this window",
+    )
+
 
 # ============================================================================
 # Chat Request/Response Schemas
@@ -59,6 +88,22 @@ class ChatOptions(BaseModel):
         default=True,
         description="Whether to stream the response",
     )
+    coalesce_ms: int = Field(
+        default=0,
+        ge=0,
+        le=1000,
+        description="Batch streamed tokens for up to this many milliseconds per SSE frame (0 disables)",
+    )
+    coalesce_bytes: int = Field(
+        default=0,
+        ge=0,
+        le=65536,
+        description="Flush a batched SSE frame once it holds this many bytes (0 disables)",
+    )
+    fast_frames: bool = Field(
+        default=True,
+        description="Write content frames from a pre-built template instead of a pydantic model",
+    )
 
 
 class ChatRequest(BaseModel):
@@ -74,9 +119,9 @@ class ChatRequest(BaseModel):
 class ChatResponseChunk(BaseModel):
     """A chunk of a streaming chat response."""
 
-    type: Literal["chunk", "thinking", "done", "error"] = Field(
+    type: Literal["chunk", "thinking", "queued", "done", "error"] = Field(
         ...,
-        description="The type of response chunk",
+        description="The type of response chunk; 'queued' carries metadata.queue_position while waiting for a slot",
     )
     content: Optional[str] = Field(
         None,
@@ -88,7 +133,25 @@ class ChatResponseChunk(BaseModel):
     )
     metadata: Optional[dict[str, Any]] = Field(
         None,
-        description="Final metadata (for type='done')",
+        description="Final metadata (for type='done'), or the queue position (for type='queued')",
+    )
+
+
+class ChatCompletionOut(BaseModel):
+    """A whole chat response, returned when ``options.stream`` is false."""
+
+    message_id: Optional[str] = Field(
+        None,
+        description="ID of the stored assistant message",
+    )
+    content: str = Field(..., description="The generated response")
+    thinking: Optional[str] = Field(
+        None,
+        description="The model's reasoning, for models that expose it",
+    )
+    metadata: Optional[dict[str, Any]] = Field(
+        None,
+        description="Usage metadata (token counts, timing)",
     )
 
 
@@ -142,30 +205,29 @@ class ConversationOut(BaseModel):
         default=0,
         description="Number of messages in the conversation",
     )
+    last_message_at: Optional[datetime] = Field(
+        None,
+        description="When the newest message was sent",
+    )
+    last_message_preview: Optional[str] = Field(
+        None,
+        description="Start of the newest message, on one line",
+    )
 
     model_config = {"from_attributes": True}
 
     @classmethod
     def from_model(cls, conv: "Any") -> "ConversationOut":
-        """Build from an ORM ``Conversation`` instance."""
-        from sqlalchemy import inspect as sa_inspect
-        from sqlalchemy.orm import InstanceState
-
-        message_count = 0
-        try:
-            state: InstanceState = sa_inspect(conv)
-            if "messages" not in state.unloaded:
-                message_count = len(conv.messages) if conv.messages else 0
-        except Exception:
-            pass
-
+        """Build from an ORM ``Conversation`` instance, without loading messages."""
         return cls(
             id=conv.id,
             title=conv.title,
             model=conv.model,
             created_at=conv.created_at,
             updated_at=conv.updated_at,
-            message_count=message_count,
+            message_count=conv.message_count,
+            last_message_at=conv.last_message_at,
+            last_message_preview=conv.last_message_preview,
         )
 
 
@@ -174,21 +236,22 @@ class ConversationDetailOut(ConversationOut):
 
     messages: list[ChatMessageOut] = Field(
         default_factory=list,
-        description="All messages in the conversation",
+        description="Messages in the conversation, oldest first (only the latest with latest=N)",
     )
 
     @classmethod
-    def from_model(cls, conv: "Any") -> "ConversationDetailOut":
-        """Build from an ORM ``Conversation`` with eagerly-loaded messages."""
+    def from_model(
+        cls,
+        conv: "Any",
+        messages: "Optional[list[Any]]" = None,
+    ) -> "ConversationDetailOut":
+        """Build from an ORM ``Conversation`` with eagerly-loaded messages.
+
+        Pass ``messages`` to return only those instead, e.g. the latest few.
+        """
         messages = [
-            ChatMessageOut(
-                id=msg.id,
-                role=msg.role,  # type: ignore[arg-type]
-                content=msg.content,
-                created_at=msg.created_at,
-                meta=msg.meta,
-            )
-            for msg in conv.messages
+            ChatMessageOut.from_model(msg)
+            for msg in (conv.messages if messages is None else messages)
         ]
         return cls(
             id=conv.id,
@@ -196,7 +259,9 @@ class ConversationDetailOut(ConversationOut):
             model=conv.model,
             created_at=conv.created_at,
             updated_at=conv.updated_at,
-            message_count=len(messages),
+            message_count=conv.message_count,
+            last_message_at=conv.last_message_at,
+            last_message_preview=conv.last_message_preview,
             messages=messages,
         )
 
@@ -205,9 +270,19 @@ class ConversationList(BaseModel):
     """List of conversations with pagination."""
 
     items: list[ConversationOut] = Field(..., description="The conversations")
-    total: int = Field(..., description="Total number of conversations")
-    page: int = Field(default=1, description="Current page number")
+    total: Optional[int] = Field(
+        None,
+        description="Total number of conversations; null when include_total is false",
+    )
+    page: Optional[int] = Field(
+        default=1,
+        description="Current page number; null when paging by cursor",
+    )
     page_size: int = Field(default=20, description="Items per page")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass as cursor to get the next page; null on the last page",
+    )
 
 
 # ============================================================================
@@ -224,6 +299,10 @@ class ModelInfo(BaseModel):
         None,
         description="Maximum context length in tokens",
     )
+    capabilities: Optional[list[str]] = Field(
+        None,
+        description="What the model supports, e.g. 'completion', 'tools', 'thinking', 'vision'",
+    )
     provider: str = Field(default="ollama", description="Provider name (e.g., 'ollama')")
 
 
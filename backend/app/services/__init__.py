@@ -3,6 +3,7 @@
 from app.services.conversation_service import ConversationService
 from app.services.llm_provider import (
     ChatChunk,
+    ChatCompletion,
     ChatOptions,
     LLMProvider,
     Message,
@@ -14,6 +15,7 @@ from app.services.user_service import UserService
 
 __all__ = [
     "ChatChunk",
+    "ChatCompletion",
     "ChatOptions",
     "ConversationService",
     "LLMProvider",
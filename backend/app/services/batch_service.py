@@ -0,0 +1,118 @@
+"""Service for submitting batches and reading their results."""
+
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.batch import BatchItem, BatchJob
+from app.schemas.batch import BatchOptions
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_ITEM_STATUSES = ("done", "error", "cancelled")
+
+# Prompts per INSERT when a batch is submitted.
+INSERT_CHUNK = 1000
+
+
+class BatchService:
+    """Creates, inspects and cancels batches. Processing is done by ``BatchWorkerPool``."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(
+        self,
+        user_id: str,
+        model: str,
+        prompts: list[str],
+        system: Optional[str] = None,
+        options: Optional[BatchOptions] = None,
+    ) -> BatchJob:
+        job = BatchJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            model=model,
+            status="queued",
+            system=system,
+            options=(options or BatchOptions()).model_dump(),
+            total=len(prompts),
+            completed=0,
+            failed=0,
+        )
+        self.db.add(job)
+        await self.db.flush()
+
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "batch_id": job.id,
+                "index": i,
+                "prompt": prompt,
+                "status": "pending",
+            }
+            for i, prompt in enumerate(prompts)
+        ]
+        for start in range(0, len(rows), INSERT_CHUNK):
+            await self.db.execute(insert(BatchItem), rows[start : start + INSERT_CHUNK])
+        await self.db.commit()
+        logger.info("Queued batch %s: %d prompts for %s", job.id, job.total, model)
+        return job
+
+    async def get(self, batch_id: str, user_id: str) -> Optional[BatchJob]:
+        result = await self.db.execute(
+            select(BatchJob).where(BatchJob.id == batch_id, BatchJob.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def results(self, batch_id: str, after: int = -1, limit: int = 100) -> list[BatchItem]:
+        """Up to ``limit`` items with an index greater than ``after``, in order."""
+        result = await self.db.execute(
+            select(BatchItem)
+            .where(BatchItem.batch_id == batch_id, BatchItem.index > after)
+            .order_by(BatchItem.index)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def iter_results(self, batch_id: str) -> AsyncIterator[BatchItem]:
+        """Finished items in prompt order, read through a server-side cursor."""
+        stream = await self.db.stream_scalars(
+            select(BatchItem)
+            .where(BatchItem.batch_id == batch_id, BatchItem.status.in_(FINISHED_ITEM_STATUSES))
+            .order_by(BatchItem.index)
+            .execution_options(yield_per=500)
+        )
+        async for item in stream:
+            yield item
+
+    async def cancel(self, batch_id: str, user_id: str) -> Optional[BatchJob]:
+        """Stop a batch. Prompts already running finish; the rest are marked cancelled."""
+        job = await self.get(batch_id, user_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+
+        await self.db.execute(
+            update(BatchItem)
+            .where(BatchItem.batch_id == batch_id, BatchItem.status == "pending")
+            .values(status="cancelled", finished_at=func.now())
+        )
+        job.status = "cancelled"
+        job.finished_at = func.now()
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def list(self, user_id: str, limit: int = 50) -> list[BatchJob]:
+        result = await self.db.execute(
+            select(BatchJob)
+            .where(BatchJob.user_id == user_id)
+            .order_by(BatchJob.created_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,313 @@
+"""Background workers that complete batch prompts at low priority."""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import Metrics
+from app.models.batch import BatchItem, BatchJob
+from app.services.batch_service import ACTIVE_STATUSES
+from app.services.circuit_breaker import is_provider_failure
+from app.services.completion_cache import CompletionCache, completion_cache_key, is_cacheable
+from app.services.llm_provider import (
+    ChatCompletion,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ProviderRegistry,
+    ProviderUnavailableError,
+)
+from app.services.scheduler import GenerationScheduler
+
+logger = logging.getLogger(__name__)
+
+# Scheduler "user" that all batch work is accounted to.
+BATCH_USER = "__batch__"
+
+
+class BatchWorkerPool:
+    """A fixed number of tasks that pull pending batch prompts from Postgres.
+
+    Each task takes a slot from ``GenerationScheduler`` with ``try_acquire``
+    before claiming a prompt, so batch work never queues ahead of chat
+    requests and leaves ``reserved_slots`` per model free for them. Prompts
+    are claimed with ``FOR UPDATE SKIP LOCKED``, so any number of processes
+    can run a pool against the same database. A prompt claimed longer than
+    ``item_timeout`` ago (its worker died) is claimed again; provider
+    failures and such takeovers are retried up to ``max_attempts`` times,
+    after which the prompt fails.
+    """
+
+    _tasks: list[asyncio.Task] = []
+    _wake: Optional[asyncio.Event] = None
+    _session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+    provider_name = "ollama"
+    poll_interval = 2.0
+    reserved_slots = 1
+    max_attempts = 3
+    item_timeout = 900.0
+
+    @classmethod
+    def start(
+        cls,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        provider_name: str,
+        workers: int,
+        poll_interval: float,
+        reserved_slots: int,
+        max_attempts: int,
+        item_timeout: float,
+    ) -> None:
+        cls._session_factory = session_factory
+        cls.provider_name = provider_name
+        cls.poll_interval = poll_interval
+        cls.reserved_slots = reserved_slots
+        cls.max_attempts = max_attempts
+        cls.item_timeout = item_timeout
+        cls._wake = asyncio.Event()
+        cls._tasks = [asyncio.create_task(cls._worker(i)) for i in range(workers)]
+        logger.info("Started %d batch workers", workers)
+
+    @classmethod
+    async def stop(cls) -> None:
+        tasks, cls._tasks = cls._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    def notify(cls) -> None:
+        """Wake idle workers in this process, e.g. after a batch was submitted."""
+        if cls._wake is not None:
+            cls._wake.set()
+
+    @classmethod
+    async def _worker(cls, number: int) -> None:
+        while True:
+            try:
+                busy = await cls._run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Batch worker %d failed", number)
+                busy = False
+            if busy:
+                continue
+            wake = cls._wake
+            try:
+                await asyncio.wait_for(wake.wait(), cls.poll_interval)
+            except TimeoutError:
+                pass
+            if wake.is_set():
+                cls._wake = asyncio.Event()
+
+    @classmethod
+    async def _run_once(cls) -> bool:
+        """Process one prompt of any model with a free slot. False when there was nothing to do."""
+        provider = ProviderRegistry.get(cls.provider_name)
+        if provider is None:
+            raise ValueError(f"Unknown provider: {cls.provider_name}")
+        try:
+            provider.ensure_available()
+        except ProviderUnavailableError:
+            return False
+
+        async with cls._session_factory() as db:
+            result = await db.execute(
+                select(BatchJob.model).where(BatchJob.status.in_(ACTIVE_STATUSES)).distinct()
+            )
+            models = list(result.scalars())
+
+        for model in models:
+            ticket = GenerationScheduler.try_acquire(model, BATCH_USER, headroom=cls.reserved_slots)
+            if ticket is None:
+                continue
+            try:
+                claimed = await cls._claim(model)
+                if claimed is None:
+                    continue
+                await cls._process(provider, *claimed)
+                return True
+            finally:
+                GenerationScheduler.release(ticket)
+        return False
+
+    @classmethod
+    async def _claim(cls, model: str) -> Optional[tuple[BatchItem, BatchJob]]:
+        stale = datetime.now(UTC) - timedelta(seconds=cls.item_timeout)
+        async with cls._session_factory() as db:
+            await cls._fail_exhausted(db, model, stale)
+            result = await db.execute(
+                select(BatchItem, BatchJob)
+                .join(BatchJob, BatchJob.id == BatchItem.batch_id)
+                .where(
+                    BatchJob.model == model,
+                    BatchJob.status.in_(ACTIVE_STATUSES),
+                    or_(
+                        BatchItem.status == "pending",
+                        and_(
+                            BatchItem.status == "running",
+                            BatchItem.locked_at < stale,
+                            BatchItem.attempts < cls.max_attempts,
+                        ),
+                    ),
+                )
+                .order_by(BatchJob.created_at, BatchItem.index)
+                .limit(1)
+                .with_for_update(of=BatchItem, skip_locked=True)
+            )
+            row = result.first()
+            if row is None:
+                await db.commit()
+                return None
+            item, job = row
+            item.status = "running"
+            item.attempts += 1
+            item.locked_at = func.now()
+            if job.status == "queued":
+                await db.execute(
+                    update(BatchJob)
+                    .where(BatchJob.id == job.id, BatchJob.status == "queued")
+                    .values(status="running", started_at=func.now())
+                )
+            await db.commit()
+            return item, job
+
+    @classmethod
+    async def _fail_exhausted(cls, db: AsyncSession, model: str, stale: datetime) -> None:
+        """Fail stale prompts that already used all their attempts.
+
+        These keep crashing their worker or outlasting ``item_timeout``;
+        claiming them again would regenerate them forever.
+        """
+        result = await db.execute(
+            update(BatchItem)
+            .where(
+                BatchItem.status == "running",
+                BatchItem.locked_at < stale,
+                BatchItem.attempts >= cls.max_attempts,
+                BatchItem.batch_id.in_(
+                    select(BatchJob.id).where(
+                        BatchJob.model == model,
+                        BatchJob.status.in_(ACTIVE_STATUSES),
+                    )
+                ),
+            )
+            .values(
+                status="error",
+                error=f"Gave up after {cls.max_attempts} attempts",
+                locked_at=None,
+                finished_at=func.now(),
+            )
+            .returning(BatchItem.batch_id)
+        )
+        for batch_id, failed in Counter(result.scalars()).items():
+            Metrics.increment("batch.failed", failed)
+            await cls._count_finished(db, batch_id, completed=0, failed=failed)
+
+    @classmethod
+    async def _count_finished(
+        cls,
+        db: AsyncSession,
+        batch_id: str,
+        *,
+        completed: int,
+        failed: int,
+    ) -> None:
+        """Add finished prompts to the job, completing it with the last one."""
+        # A cancelled batch keeps its status and finish time.
+        done = and_(
+            BatchJob.completed + BatchJob.failed + completed + failed >= BatchJob.total,
+            BatchJob.status == "running",
+        )
+        await db.execute(
+            update(BatchJob)
+            .where(BatchJob.id == batch_id)
+            .values(
+                completed=BatchJob.completed + completed,
+                failed=BatchJob.failed + failed,
+                status=case((done, "completed"), else_=BatchJob.status),
+                finished_at=case((done, func.now()), else_=BatchJob.finished_at),
+            )
+        )
+
+    @classmethod
+    async def _process(cls, provider: LLMProvider, item: BatchItem, job: BatchJob) -> None:
+        messages = []
+        if job.system:
+            messages.append(Message(role="system", content=job.system))
+        messages.append(Message(role="user", content=item.prompt))
+        options = ChatOptions(**job.options)
+
+        cache_key = None
+        if CompletionCache.enabled and is_cacheable(options):
+            cache_key = completion_cache_key(messages, job.model, options)
+        started = time.perf_counter()
+        completion = await CompletionCache.get(cache_key) if cache_key else None
+        if completion is None:
+            completion = await provider.complete_chat(messages, job.model, options)
+            if cache_key and not (completion.metadata and completion.metadata.get("error")):
+                await CompletionCache.put(cache_key, job.model, completion)
+        Metrics.observe("batch.item_seconds", time.perf_counter() - started)
+        await cls._record(item, completion)
+
+    @classmethod
+    async def _record(cls, item: BatchItem, completion: ChatCompletion) -> None:
+        metadata = completion.metadata or {}
+        failed = bool(metadata.get("error"))
+        unavailable = metadata.get("error_type") == "provider_unavailable"
+        retry = (
+            failed
+            and is_provider_failure(metadata)
+            and (unavailable or item.attempts < cls.max_attempts)
+        )
+
+        async with cls._session_factory() as db:
+            mine = and_(
+                BatchItem.id == item.id,
+                BatchItem.status == "running",
+                BatchItem.attempts == item.attempts,
+            )
+            if retry:
+                Metrics.increment("batch.retried")
+                await db.execute(
+                    update(BatchItem)
+                    .where(mine)
+                    .values(
+                        status="pending",
+                        locked_at=None,
+                        # The provider being down isn't the prompt's fault.
+                        attempts=item.attempts - 1 if unavailable else item.attempts,
+                    )
+                )
+                await db.commit()
+                return
+
+            result = await db.execute(
+                update(BatchItem)
+                .where(mine)
+                .values(
+                    status="error" if failed else "done",
+                    content=None if failed else completion.content,
+                    thinking=None if failed else completion.thinking,
+                    error=completion.content if failed else None,
+                    meta=None if failed else metadata,
+                    finished_at=func.now(),
+                )
+            )
+            if result.rowcount:
+                await cls._count_finished(
+                    db,
+                    item.batch_id,
+                    completed=0 if failed else 1,
+                    failed=1 if failed else 0,
+                )
+            await db.commit()
+        Metrics.increment("batch.failed" if failed else "batch.completed")
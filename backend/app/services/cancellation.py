@@ -0,0 +1,134 @@
+"""Cross-worker stream cancellation over Postgres LISTEN/NOTIFY."""
+
+import asyncio
+import logging
+from typing import Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "chat_cancel"
+CONNECT_TIMEOUT_SECONDS = 5.0
+RECONNECT_BACKOFF_SECONDS = 30.0
+
+
+class CancellationBus:
+    """Delivers stop requests to whichever worker is running a stream.
+
+    Each worker keeps one dedicated asyncpg connection that LISTENs on a single
+    channel; a stop request landing on any worker NOTIFYs it with the
+    conversation id as payload, and the worker running that stream sets its
+    event. Subscribing is a dict update, so streams never wait on Postgres. The
+    connection is opened at startup and re-opened by a background task after it
+    drops. Until it is up (or when the bus is not started) only in-process
+    cancellation works.
+    """
+
+    _connection: Optional[asyncpg.Connection] = None
+    _dsn: Optional[str] = None
+    _task: Optional[asyncio.Task] = None
+    _lost: Optional[asyncio.Event] = None
+    _publish_lock: Optional[asyncio.Lock] = None
+    _subscriptions: dict[str, set[asyncio.Event]] = {}
+
+    @classmethod
+    async def start(cls, database_url: str) -> None:
+        """Open the bus connection and keep it open. Failures are logged, not raised."""
+        cls._dsn = (
+            make_url(database_url)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        cls._publish_lock = asyncio.Lock()
+        await cls._connect()
+        cls._task = asyncio.create_task(cls._maintain())
+
+    @classmethod
+    async def stop(cls) -> None:
+        task, cls._task = cls._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        conn, cls._connection = cls._connection, None
+        cls._dsn = None
+        cls._publish_lock = None
+        cls._subscriptions.clear()
+        if conn is not None and not conn.is_closed():
+            await conn.close()
+
+    @classmethod
+    def subscribe(cls, conversation_id: str, event: asyncio.Event) -> None:
+        """Set ``event`` when any worker publishes a cancel for this conversation."""
+        cls._subscriptions.setdefault(conversation_id, set()).add(event)
+
+    @classmethod
+    def unsubscribe(cls, conversation_id: str, event: asyncio.Event) -> None:
+        events = cls._subscriptions.get(conversation_id)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del cls._subscriptions[conversation_id]
+
+    @classmethod
+    async def publish(cls, conversation_id: str) -> bool:
+        """NOTIFY all workers that this conversation's stream should stop."""
+        conn = cls._connection
+        if cls._publish_lock is None or conn is None or conn.is_closed():
+            return False
+        # One query at a time per asyncpg connection.
+        async with cls._publish_lock:
+            try:
+                await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, conversation_id)
+            except (asyncpg.PostgresError, OSError) as e:
+                logger.warning("Failed to publish cancellation for %s: %s", conversation_id, e)
+                return False
+        return True
+
+    @classmethod
+    def _on_notify(
+        cls, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        for event in cls._subscriptions.get(payload, ()):
+            event.set()
+
+    @classmethod
+    def _on_terminate(cls, connection: asyncpg.Connection) -> None:
+        if cls._connection is connection:
+            logger.warning("Cancellation bus connection lost; reconnecting in the background")
+            cls._connection = None
+            cls._lost.set()
+
+    @classmethod
+    async def _connect(cls) -> bool:
+        """Open the connection and LISTEN. Returns False if Postgres is unreachable."""
+        cls._lost = asyncio.Event()
+        try:
+            conn = await asyncpg.connect(cls._dsn, timeout=CONNECT_TIMEOUT_SECONDS)
+        except (asyncpg.PostgresError, OSError) as e:
+            logger.warning("Cancellation bus unavailable, using local cancellation only: %s", e)
+            cls._lost.set()
+            return False
+        try:
+            conn.add_termination_listener(cls._on_terminate)
+            await conn.add_listener(CHANNEL, cls._on_notify)
+        except (asyncpg.PostgresError, OSError) as e:
+            logger.warning("Cancellation bus LISTEN failed, using local cancellation only: %s", e)
+            conn.terminate()
+            cls._lost.set()
+            return False
+        cls._connection = conn
+        return True
+
+    @classmethod
+    async def _maintain(cls) -> None:
+        """Reconnect, after a backoff, whenever the connection is down."""
+        while True:
+            await cls._lost.wait()
+            await asyncio.sleep(RECONNECT_BACKOFF_SECONDS)
+            if await cls._connect():
+                logger.info("Cancellation bus reconnected")
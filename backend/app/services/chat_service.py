@@ -4,58 +4,121 @@ import asyncio
 import logging
 import uuid
 from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Optional
 
-from sqlalchemy import func
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.config import get_settings
+from app.core.metrics import Metrics
+from app.db.session import async_session_maker
+from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.summary import ConversationSummary
 from app.schemas.chat import ChatOptions, ModelInfo
-from app.services.conversation_service import ConversationService
-from app.services.llm_provider import ChatChunk, Message as LLMMessage, ProviderRegistry
-from app.core.config import get_settings
-from app.services.ollama_provider import OllamaProvider
+from app.services.cancellation import CancellationBus
+from app.services.compaction import ConversationCompactor, summary_prompt
+from app.services.completion_cache import (
+    CompletionCache,
+    completion_cache_key,
+    is_cacheable,
+    replay_chunks,
+)
+from app.services.context_builder import HistoryEntry, estimate_tokens, get_context_strategy
+from app.services.conversation_service import ConversationService, record_message
+from app.services.history_cache import CachedMessage, HistoryCache
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatCompletion,
+    LLMProvider,
+    ProviderRegistry,
+)
+from app.services.llm_provider import Message as LLMMessage
+from app.services.model_catalog import ModelCatalog
+from app.services.providers import ensure_providers
+from app.services.scheduler import GenerationScheduler, SlotTicket
+from app.services.stream_buffer import GenerationBuffer, StreamRegistry
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class PreparedTurn:
+    """Everything needed to generate a reply once the user message is saved."""
+
+    conversation_id: str
+    model: str
+    messages: list[LLMMessage]
+    ticket: Optional[SlotTicket] = None
+
+
 class ChatService:
     """Handles sending messages and streaming LLM responses.
 
-    Conversation CRUD is delegated to ``ConversationService``.
+    Conversation CRUD is delegated to ``ConversationService``. ``db`` may be
+    None when only the provider is used (model list, health).
     """
 
-    _active_streams: dict[str, asyncio.Event] = {}
+    _active_streams: dict[str, set[asyncio.Event]] = {}
+    _generation_tasks: set[asyncio.Task] = set()
+    _unknown_context_models: set[str] = set()
 
-    def __init__(self, db: AsyncSession, *, provider_name: str = "ollama"):
+    def __init__(
+        self,
+        db: Optional[AsyncSession],
+        *,
+        provider_name: str = "ollama",
+        session_factory: async_sessionmaker[AsyncSession] = async_session_maker,
+    ):
         self.db = db
         self._provider_name = provider_name
+        self._session_factory = session_factory
         self._conversations = ConversationService(db)
         self._ensure_default_provider()
 
     @classmethod
-    def cancel_stream(cls, conversation_id: str) -> bool:
-        """Signal an active stream to stop. Returns True if found."""
-        event = cls._active_streams.get(conversation_id)
-        if event:
+    async def cancel_stream(cls, conversation_id: str) -> bool:
+        """Signal every active generation of a conversation to stop.
+
+        Generations running in this process are stopped directly, and the
+        request is broadcast to the other workers, which may run more of
+        them. Returns True if one was found locally or the broadcast was sent.
+        """
+        events = cls._active_streams.get(conversation_id, ())
+        for event in events:
             event.set()
-            return True
-        return False
+        published = await CancellationBus.publish(conversation_id)
+        return bool(events) or published
+
+    @classmethod
+    def _register_generation(cls, conversation_id: str) -> asyncio.Event:
+        """Cancel event for one generation, reachable from ``cancel_stream``."""
+        event = asyncio.Event()
+        cls._active_streams.setdefault(conversation_id, set()).add(event)
+        CancellationBus.subscribe(conversation_id, event)
+        return event
+
+    @classmethod
+    def _unregister_generation(cls, conversation_id: str, event: asyncio.Event) -> None:
+        events = cls._active_streams.get(conversation_id)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del cls._active_streams[conversation_id]
+        CancellationBus.unsubscribe(conversation_id, event)
 
     @property
     def conversations(self) -> ConversationService:
         return self._conversations
 
     def _ensure_default_provider(self) -> None:
-        if "ollama" not in ProviderRegistry.list_providers():
-            settings = get_settings()
-            ProviderRegistry.register(OllamaProvider(base_url=settings.ollama_base_url))
+        ensure_providers()
 
-    def _get_provider(self) -> OllamaProvider:
+    def _get_provider(self) -> LLMProvider:
         provider = ProviderRegistry.get(self._provider_name)
         if provider is None:
             raise ValueError(f"Unknown provider: {self._provider_name}")
-        return provider  # type: ignore[return-value]
+        return provider
 
     async def send_message(
         self,
@@ -65,8 +128,8 @@ class ChatService:
         options: Optional[ChatOptions] = None,
     ) -> AsyncIterator[ChatChunk]:
         """Save user message, stream LLM response, and persist the result."""
-        conversation = await self._conversations.get(conversation_id, user_id)
-        if not conversation:
+        turn = await self.prepare_turn(conversation_id, user_id, content, options)
+        if turn is None:
             yield ChatChunk(
                 content="Conversation not found",
                 is_finished=True,
@@ -74,59 +137,227 @@ class ChatService:
             )
             return
 
+        async for chunk in self.stream_turn(turn, options):
+            yield chunk
+
+    async def start_generation(
+        self,
+        conversation_id: str,
+        user_id: str,
+        content: str,
+        options: Optional[ChatOptions] = None,
+    ) -> GenerationBuffer:
+        """Save the user message and run the generation in the background.
+
+        Chunks are published into a ``GenerationBuffer`` registered with
+        ``StreamRegistry``, so the response keeps generating if the client
+        disconnects and a reconnecting client can replay what it missed.
+        """
+        turn = await self.prepare_turn(conversation_id, user_id, content, options)
+        if turn is None:
+            # Not registered: the conversation id may belong to someone else.
+            buffer = GenerationBuffer(conversation_id, user_id)
+            buffer.publish(
+                ChatChunk(
+                    content="Conversation not found",
+                    is_finished=True,
+                    metadata={"error": True, "error_type": "not_found"},
+                )
+            )
+            buffer.finish()
+            return buffer
+
+        settings = get_settings()
+        buffer = StreamRegistry.open(
+            conversation_id,
+            user_id,
+            settings.stream_buffer_max_chunks,
+            options,
+        )
+        task = asyncio.create_task(
+            self._run_generation(turn, options, buffer, settings.stream_buffer_ttl_seconds)
+        )
+        ChatService._generation_tasks.add(task)
+        task.add_done_callback(ChatService._generation_tasks.discard)
+        return buffer
+
+    async def _run_generation(
+        self,
+        turn: PreparedTurn,
+        options: Optional[ChatOptions],
+        buffer: GenerationBuffer,
+        buffer_ttl: float,
+    ) -> None:
+        try:
+            async for chunk in self.stream_turn(turn, options):
+                buffer.publish(chunk)
+        finally:
+            StreamRegistry.close(buffer, buffer_ttl)
+
+    async def prepare_turn(
+        self,
+        conversation_id: str,
+        user_id: str,
+        content: str,
+        options: Optional[ChatOptions] = None,
+    ) -> Optional[PreparedTurn]:
+        """Persist the user message and build the history for the model.
+
+        The request session is committed before the model's context length is
+        looked up, which hands its connection back to the pool so nothing is
+        held while talking to the provider.
+
+        A generation slot is reserved with ``GenerationScheduler`` before
+        anything is written, so a full queue raises ``QueueFullError`` without
+        leaving a dangling user message. The slot travels with the turn.
+        Likewise ``ProviderUnavailableError`` is raised up front while the
+        provider's circuit is open.
+        """
+        self._get_provider().ensure_available()
+        conversation = await self._conversations.get(
+            conversation_id,
+            user_id,
+            include_messages=False,
+        )
+        if not conversation:
+            return None
+
+        ticket = GenerationScheduler.enqueue(conversation.model, user_id)
+        try:
+            turn = await self._prepare_turn(conversation, content, options)
+        except BaseException:
+            GenerationScheduler.release(ticket)
+            raise
+        turn.ticket = ticket
+        return turn
+
+    async def _prepare_turn(
+        self,
+        conversation: Conversation,
+        content: str,
+        options: Optional[ChatOptions],
+    ) -> PreparedTurn:
+        conversation_id = conversation.id
+        cached_history = await self._load_history(conversation_id)
+        summary = await self._conversations.get_summary(conversation_id)
+
+        tokens = estimate_tokens(content)
         user_message = Message(
             id=str(uuid.uuid4()),
             conversation_id=conversation_id,
             role="user",
             content=content,
-            conversation=conversation,
+            meta={"token_estimate": tokens},
         )
         self.db.add(user_message)
-        await self.db.flush()
+        await self.db.execute(record_message(conversation_id, content))
+        model = conversation.model
+        await self.db.commit()
+
+        stored = CachedMessage(user_message.id, "user", content, tokens, user_message.created_at)
+        cached_history.append(stored)
+        HistoryCache.extend(conversation_id, [stored])
 
-        conversation.updated_at = func.now()  # type: ignore[assignment]
-        await self.db.flush()
+        history = [
+            HistoryEntry(msg.role, msg.content, msg.tokens)
+            for msg in cached_history
+            if summary is None or msg.created_at > summary.covers_until
+        ]
+
+        return PreparedTurn(
+            conversation_id=conversation_id,
+            model=model,
+            messages=await self._build_message_history(history, model, options, summary),
+        )
+
+    async def _load_history(self, conversation_id: str) -> list[CachedMessage]:
+        """Conversation history from ``HistoryCache``, fetching only rows it lacks."""
+        cached = HistoryCache.get(conversation_id)
+        if cached is None:
+            Metrics.increment("history_cache.misses")
+            history = await self._conversations.get_history(conversation_id)
+            HistoryCache.put(conversation_id, history)
+            return history
 
-        llm_messages = self._build_message_history(conversation.messages)
+        Metrics.increment("history_cache.hits")
+        since = cached[-1].created_at if cached else None
+        newer = await self._conversations.get_history(conversation_id, since=since)
+        HistoryCache.extend(conversation_id, newer)
+        history = HistoryCache.get(conversation_id)
+        if history is None:
+            # Evicted while extending; fall back to a full read.
+            history = await self._conversations.get_history(conversation_id)
+        return history
 
-        provider = self._get_provider()
+    async def stream_turn(
+        self,
+        turn: PreparedTurn,
+        options: Optional[ChatOptions] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        """Stream the LLM response for a prepared turn and persist it.
+
+        No database connection is held while the provider is generating; the
+        assistant message is written through a short-lived session afterwards.
+        """
+        conversation_id = turn.conversation_id
         opts = options or ChatOptions()
 
-        full_response = ""
-        thinking_content = ""
+        response_parts: list[str] = []
+        thinking_parts: list[str] = []
         metadata: Optional[dict] = None
 
-        cancel_event = asyncio.Event()
-        ChatService._active_streams[conversation_id] = cancel_event
+        cancel_event = ChatService._register_generation(conversation_id)
+        cache_key = self._cache_key(turn, opts)
 
         try:
+            cached = await CompletionCache.get(cache_key) if cache_key else None
+            if cached is not None:
+                # Served without waiting for a generation slot.
+                replay = replay_chunks(cached)
+                for chunk in replay:
+                    yield chunk
+                await self._save_reply(
+                    conversation_id,
+                    cached.content,
+                    cached.thinking,
+                    replay[-1].metadata,
+                )
+                self._maybe_compact(conversation_id, turn.model)
+                return
+
+            if turn.ticket is not None:
+                async for position in GenerationScheduler.wait(turn.ticket, cancel_event):
+                    yield ChatChunk(
+                        content="", metadata={"queued": True, "queue_position": position}
+                    )
+                if not turn.ticket.granted:
+                    yield ChatChunk(content="", is_finished=True, metadata={"cancelled": True})
+                    return
+
+            provider = self._get_provider()
             async for chunk in provider.stream_chat(
-                messages=llm_messages,
-                model=conversation.model,
+                messages=turn.messages,
+                model=turn.model,
                 options=opts,
                 cancel_event=cancel_event,
             ):
                 if chunk.is_thinking:
-                    thinking_content += chunk.content
+                    thinking_parts.append(chunk.content)
                 elif chunk.content:
-                    full_response += chunk.content
+                    response_parts.append(chunk.content)
                 if chunk.is_finished:
                     metadata = chunk.metadata
                 yield chunk
 
-            if full_response:
-                msg_meta = dict(metadata) if metadata else {}
-                if thinking_content:
-                    msg_meta["thinking"] = thinking_content
-                assistant_message = Message(
-                    id=str(uuid.uuid4()),
-                    conversation_id=conversation_id,
-                    role="assistant",
-                    content=full_response,
-                    meta=msg_meta or None,
+            content, thinking = "".join(response_parts), "".join(thinking_parts)
+            await self._save_reply(conversation_id, content, thinking, metadata)
+            if cache_key and metadata and not (metadata.get("error") or metadata.get("cancelled")):
+                await CompletionCache.put(
+                    cache_key,
+                    turn.model,
+                    ChatCompletion(content, thinking, metadata),
                 )
-                self.db.add(assistant_message)
-                await self.db.commit()
+            self._maybe_compact(conversation_id, turn.model)
 
         except Exception as e:
             logger.exception("Error in chat streaming")
@@ -135,16 +366,214 @@ class ChatService:
                 is_finished=True,
                 metadata={"error": True, "error_type": "streaming_error"},
             )
-            await self.db.rollback()
         finally:
-            ChatService._active_streams.pop(conversation_id, None)
+            if turn.ticket is not None:
+                GenerationScheduler.release(turn.ticket)
+            ChatService._unregister_generation(conversation_id, cancel_event)
+
+    async def complete_message(
+        self,
+        conversation_id: str,
+        user_id: str,
+        content: str,
+        options: Optional[ChatOptions] = None,
+    ) -> Optional[tuple[ChatCompletion, Optional[str]]]:
+        """Save user message, get the whole LLM response in one call, and persist it.
+
+        Returns ``None`` if the conversation does not exist, otherwise the
+        completion and the id of the stored assistant message (``None`` when
+        nothing was stored, e.g. on a provider error). ``cancel_stream``
+        stops it too: the request then ends with ``cancelled`` metadata and
+        nothing is stored.
+        """
+        turn = await self.prepare_turn(conversation_id, user_id, content, options)
+        if turn is None:
+            return None
+
+        opts = options or ChatOptions()
+        cache_key = self._cache_key(turn, opts)
+        cancel_event = ChatService._register_generation(conversation_id)
+        try:
+            completion = await CompletionCache.get(cache_key) if cache_key else None
+            if completion is not None:
+                completion = ChatCompletion(
+                    completion.content,
+                    completion.thinking,
+                    {**(completion.metadata or {}), "cached": True},
+                )
+            else:
+                if turn.ticket is not None:
+                    async for _ in GenerationScheduler.wait(turn.ticket, cancel_event):
+                        pass
+                completion = await self._complete_unless_cancelled(turn, opts, cancel_event)
+                metadata = completion.metadata or {}
+                if cache_key and not (metadata.get("error") or metadata.get("cancelled")):
+                    await CompletionCache.put(cache_key, turn.model, completion)
+        finally:
+            if turn.ticket is not None:
+                GenerationScheduler.release(turn.ticket)
+            ChatService._unregister_generation(conversation_id, cancel_event)
+        if completion.metadata and (
+            completion.metadata.get("error") or completion.metadata.get("cancelled")
+        ):
+            return completion, None
+
+        message_id = await self._save_reply(
+            conversation_id,
+            completion.content,
+            completion.thinking,
+            completion.metadata,
+        )
+        self._maybe_compact(conversation_id, turn.model)
+        return completion, message_id
+
+    async def _complete_unless_cancelled(
+        self,
+        turn: PreparedTurn,
+        options: ChatOptions,
+        cancel_event: asyncio.Event,
+    ) -> ChatCompletion:
+        """``complete_chat``, abandoned as soon as ``cancel_event`` is set."""
+        if cancel_event.is_set():
+            return ChatCompletion("", metadata={"cancelled": True})
+        request = asyncio.ensure_future(
+            self._get_provider().complete_chat(
+                messages=turn.messages,
+                model=turn.model,
+                options=options,
+            )
+        )
+        cancelled = asyncio.ensure_future(cancel_event.wait())
+        try:
+            await asyncio.wait({request, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+            if not request.done():
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+        if request.cancelled():
+            return ChatCompletion("", metadata={"cancelled": True})
+        return request.result()
+
+    @staticmethod
+    def _cache_key(turn: PreparedTurn, options: ChatOptions) -> Optional[str]:
+        """Completion cache key for this turn, or None when it can't be cached."""
+        if not CompletionCache.enabled or not is_cacheable(options):
+            return None
+        return completion_cache_key(turn.messages, turn.model, options)
+
+    def _maybe_compact(self, conversation_id: str, model: str) -> None:
+        """Kick off background summarization of old turns, if enabled."""
+        settings = get_settings()
+        if not settings.compaction_enabled:
+            return
+        ConversationCompactor(
+            self._get_provider(),
+            self._session_factory,
+            model=settings.compaction_model,
+            threshold_tokens=settings.compaction_threshold_tokens,
+            keep_recent=settings.compaction_keep_recent,
+            reserved_slots=settings.compaction_reserved_slots,
+        ).schedule(conversation_id, model)
+
+    async def _save_reply(
+        self,
+        conversation_id: str,
+        content: str,
+        thinking: str,
+        metadata: Optional[dict],
+    ) -> Optional[str]:
+        """Persist an assistant reply through a short-lived session."""
+        if not content:
+            return None
+
+        meta = dict(metadata) if metadata else {}
+        if thinking:
+            meta["thinking"] = thinking
+        meta["token_estimate"] = estimate_tokens(content)
+        message = Message(
+            id=str(uuid.uuid4()),
+            conversation_id=conversation_id,
+            role="assistant",
+            content=content,
+            meta=meta,
+        )
+        async with self._session_factory() as session:
+            session.add(message)
+            await session.execute(record_message(conversation_id, content))
+            await session.commit()
 
-    def _build_message_history(self, messages: list[Message]) -> list[LLMMessage]:
-        return [LLMMessage(role=msg.role, content=msg.content) for msg in messages]
+        HistoryCache.extend(
+            conversation_id,
+            [
+                CachedMessage(
+                    message.id,
+                    "assistant",
+                    content,
+                    meta["token_estimate"],
+                    message.created_at,
+                )
+            ],
+        )
+        return message.id
+
+    async def _build_message_history(
+        self,
+        history: list[HistoryEntry],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        summary: Optional[ConversationSummary] = None,
+    ) -> list[LLMMessage]:
+        """Fit the history into the model's context window, minus room for the reply.
+
+        ``history`` holds only the messages newer than ``summary``; the summary
+        stands in for everything before them.
+        """
+        settings = get_settings()
+        reserve = (options.max_tokens if options else None) or settings.context_reply_reserve
+        budget = await self._context_length(model) - reserve
+
+        strategy = get_context_strategy(
+            settings.context_strategy,
+            keep_first=settings.context_keep_first,
+        )
+        summary_entry = None
+        if summary is not None:
+            summary_entry = HistoryEntry("system", summary_prompt(summary), summary.token_estimate)
+        selected = strategy.select(history, budget, summary_entry)
+        if summary_entry is not None and selected and selected[0] is summary_entry:
+            Metrics.observe(
+                "compaction.tokens_saved_per_turn",
+                summary.source_tokens - summary.token_estimate,
+            )
+        if len(selected) < len(history):
+            logger.debug(
+                "Context for %s: kept %d of %d messages (budget %d tokens)",
+                model,
+                len(selected),
+                len(history),
+                budget,
+            )
+        return [LLMMessage(role=e.role, content=e.content) for e in selected]
+
+    async def _context_length(self, model: str) -> int:
+        info = await ModelCatalog.get(self._get_provider(), model)
+        if info is None or not info.context_length:
+            default = get_settings().default_context_length
+            Metrics.increment("context.default_length_fallbacks")
+            if model not in ChatService._unknown_context_models:
+                ChatService._unknown_context_models.add(model)
+                logger.warning(
+                    "No context length known for %s; budgeting with the default %d tokens",
+                    model,
+                    default,
+                )
+            return default
+        return info.context_length
 
     async def list_available_models(self) -> list[ModelInfo]:
-        provider = self._get_provider()
-        models = await provider.list_models()
+        """Models from the in-memory catalog; Ollama is only asked when it's stale."""
+        models = await ModelCatalog.list_models(self._get_provider())
 
         return [
             ModelInfo(
@@ -152,6 +581,7 @@ class ChatService:
                 name=m.name,
                 description=m.description,
                 context_length=m.context_length,
+                capabilities=m.capabilities,
                 provider=self._provider_name,
             )
             for m in models
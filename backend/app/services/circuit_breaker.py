@@ -0,0 +1,241 @@
+"""Fail fast while an LLM provider is down."""
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from typing import Any, Optional
+
+from app.core.metrics import Metrics
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatCompletion,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ModelInfo,
+    ProviderUnavailableError,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state machine fed by request outcomes.
+
+    ``failure_threshold`` consecutive failures open the circuit. After
+    ``reset_timeout`` seconds one trial request is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, *, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may go through now. Half-open admits one at a time."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def record_neutral(self) -> None:
+        """The request ended without telling us anything (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+    @property
+    def retry_after(self) -> int:
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+    def _transition(self, state: str) -> None:
+        logger.log(
+            logging.WARNING if state == OPEN else logging.INFO,
+            "Circuit for %s: %s -> %s",
+            self.name,
+            self.state,
+            state,
+        )
+        Metrics.increment(f"circuit.{self.name}.{state}")
+        self.state = state
+
+
+def is_provider_failure(metadata: Optional[dict[str, Any]]) -> bool:
+    """Connection errors and 5xx count against the provider; 4xx do not."""
+    return bool(metadata and metadata.get("error")) and metadata.get("status_code", 500) >= 500
+
+
+class CircuitBreakerProvider(LLMProvider):
+    """Wraps a provider with a ``CircuitBreaker`` and a background health prober.
+
+    While the circuit is open, ``ensure_available`` raises
+    ``ProviderUnavailableError`` and requests are answered with an error
+    without touching the network. ``health_check`` returns the prober's last
+    result instead of making a request.
+    """
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        probe_interval: float = 10.0,
+    ):
+        self.inner = inner
+        self.breaker = CircuitBreaker(
+            inner.name,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+        self.probe_interval = probe_interval
+        self.healthy: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    def ensure_available(self) -> None:
+        if (
+            self.breaker.state == OPEN
+            and time.monotonic() - self.breaker.opened_at < self.breaker.reset_timeout
+        ):
+            raise ProviderUnavailableError(self.name, self.breaker.retry_after)
+        self.inner.ensure_available()
+
+    async def stream_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        if not self.breaker.allow():
+            yield self._unavailable_chunk()
+            return
+
+        outcome: Optional[bool] = None
+        try:
+            async for chunk in self.inner.stream_chat(messages, model, options, cancel_event):
+                if chunk.is_finished:
+                    metadata = chunk.metadata or {}
+                    outcome = (
+                        None if metadata.get("cancelled") else not is_provider_failure(metadata)
+                    )
+                elif outcome is None and not (chunk.metadata and chunk.metadata.get("error")):
+                    # The first token is proof enough that the provider is up.
+                    outcome = True
+                yield chunk
+        finally:
+            self._record(outcome)
+
+    async def complete_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+    ) -> ChatCompletion:
+        if not self.breaker.allow():
+            chunk = self._unavailable_chunk()
+            return ChatCompletion(content=chunk.content, metadata=chunk.metadata)
+        outcome: Optional[bool] = None
+        try:
+            completion = await self.inner.complete_chat(messages, model, options)
+            outcome = not is_provider_failure(completion.metadata)
+            return completion
+        finally:
+            self._record(outcome)
+
+    async def list_models(self) -> list[ModelInfo]:
+        return await self.inner.list_models()
+
+    async def health_check(self) -> bool:
+        """Last probe result; probes once if the prober hasn't run yet."""
+        if self.healthy is None:
+            await self.probe()
+        return bool(self.healthy) and self.breaker.state != OPEN
+
+    async def probe(self) -> bool:
+        try:
+            healthy = await self.inner.health_check()
+        except Exception:
+            healthy = False
+        self.healthy = healthy
+        self.checked_at = time.time()
+        # A healthy probe also clears failures counted while still CLOSED, so
+        # sporadic errors spread over a long time never add up to an open circuit.
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return healthy
+
+    async def start(self) -> None:
+        await self.inner.start()
+        self._task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.inner.close()
+
+    def _record(self, outcome: Optional[bool]) -> None:
+        if outcome is None:
+            self.breaker.record_neutral()
+        elif outcome:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _unavailable_chunk(self) -> ChatChunk:
+        Metrics.increment("circuit.rejected")
+        return ChatChunk(
+            content=f"{self.name} is unavailable; retry in {self.breaker.retry_after}s",
+            is_finished=True,
+            metadata={
+                "error": True,
+                "error_type": "provider_unavailable",
+                "retry_after": self.breaker.retry_after,
+            },
+        )
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.probe_interval)
@@ -0,0 +1,165 @@
+"""Background summarization of long conversations."""
+
+import asyncio
+import logging
+import uuid
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import Metrics
+from app.models.summary import ConversationSummary
+from app.services.context_builder import estimate_tokens
+from app.services.conversation_service import ConversationService
+from app.services.llm_provider import ChatOptions, LLMProvider
+from app.services.llm_provider import Message as LLMMessage
+from app.services.scheduler import GenerationScheduler
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_USER = "__compaction__"
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant. Rewrite the summary so it also covers the new messages. Keep "
+    "facts, decisions, names, numbers, code identifiers and open questions. "
+    "Reply with the summary only."
+)
+
+
+def summary_prompt(summary: ConversationSummary) -> str:
+    """How a stored summary is presented to the model in place of old messages."""
+    return f"Summary of the earlier conversation:\n{summary.content}"
+
+
+class ConversationCompactor:
+    """Folds the oldest turns of a long conversation into a rolling summary.
+
+    Runs after an assistant reply has been stored, as a fire-and-forget task
+    with its own session, so it never delays the user-facing stream. At most
+    one compaction per conversation runs at a time in this process. Like
+    batch work, the summary request only takes a ``GenerationScheduler``
+    slot with ``try_acquire`` while nobody is queued and ``reserved_slots``
+    stay free for chat; otherwise it is skipped and the next reply schedules
+    it again.
+    """
+
+    _tasks: set[asyncio.Task] = set()
+    _in_progress: set[str] = set()
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        model: str = "",
+        threshold_tokens: int = 3000,
+        keep_recent: int = 6,
+        reserved_slots: int = 1,
+    ):
+        self.provider = provider
+        self.session_factory = session_factory
+        self.model = model
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent = keep_recent
+        self.reserved_slots = reserved_slots
+
+    def schedule(self, conversation_id: str, conversation_model: str) -> None:
+        if conversation_id in ConversationCompactor._in_progress:
+            return
+        ConversationCompactor._in_progress.add(conversation_id)
+        task = asyncio.create_task(self._run(conversation_id, conversation_model))
+        ConversationCompactor._tasks.add(task)
+        task.add_done_callback(ConversationCompactor._tasks.discard)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel running compactions, e.g. on shutdown."""
+        tasks = list(cls._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, conversation_id: str, conversation_model: str) -> None:
+        try:
+            await self.compact(conversation_id, conversation_model)
+        except Exception:
+            Metrics.increment("compaction.failures")
+            logger.exception("Compaction failed for conversation %s", conversation_id)
+        finally:
+            ConversationCompactor._in_progress.discard(conversation_id)
+
+    async def compact(
+        self, conversation_id: str, conversation_model: str
+    ) -> Optional[ConversationSummary]:
+        """Summarize the oldest uncompacted messages if the conversation is over threshold."""
+        async with self.session_factory() as db:
+            conversations = ConversationService(db)
+            previous = await conversations.get_summary(conversation_id)
+            since = previous.covers_until if previous else None
+            messages = await conversations.get_history(conversation_id, since=since)
+        # The session is closed here: no connection is held while the model runs.
+
+        if since is not None:
+            messages = [m for m in messages if m.created_at > since]
+        tokens = [m.tokens for m in messages]
+        total = sum(tokens) + (previous.token_estimate if previous else 0)
+        compactable = len(messages) - self.keep_recent
+        if total <= self.threshold_tokens or compactable <= 0:
+            return None
+
+        folded = messages[:compactable]
+        transcript = "\n\n".join(f"{m.role}: {m.content}" for m in folded)
+        model = self.model or conversation_model
+        ticket = GenerationScheduler.try_acquire(
+            model, COMPACTION_USER, headroom=self.reserved_slots
+        )
+        if ticket is None:
+            Metrics.increment("compaction.skipped")
+            logger.debug("Skipping compaction of %s: no spare %s slot", conversation_id, model)
+            return None
+        try:
+            completion = await self.provider.complete_chat(
+                messages=[
+                    LLMMessage(role="system", content=SUMMARY_INSTRUCTIONS),
+                    LLMMessage(
+                        role="user",
+                        content=(
+                            f"Current summary:\n{previous.content if previous else '(none)'}"
+                            f"\n\nNew messages:\n{transcript}"
+                        ),
+                    ),
+                ],
+                model=model,
+                options=ChatOptions(temperature=0.2),
+            )
+        finally:
+            GenerationScheduler.release(ticket)
+        if (completion.metadata and completion.metadata.get("error")) or not completion.content:
+            Metrics.increment("compaction.failures")
+            logger.warning("Compaction of %s failed: %s", conversation_id, completion.content)
+            return None
+
+        summary = ConversationSummary(
+            id=str(uuid.uuid4()),
+            conversation_id=conversation_id,
+            content=completion.content.strip(),
+            covers_until=folded[-1].created_at,
+            message_count=len(folded) + (previous.message_count if previous else 0),
+            source_tokens=sum(tokens[:compactable]) + (previous.source_tokens if previous else 0),
+            token_estimate=0,
+            model=model,
+        )
+        summary.token_estimate = estimate_tokens(summary_prompt(summary))
+        async with self.session_factory() as db:
+            db.add(summary)
+            await db.commit()
+
+        Metrics.increment("compaction.runs")
+        logger.info(
+            "Compacted %d messages of conversation %s into a %d-token summary",
+            len(folded),
+            conversation_id,
+            summary.token_estimate,
+        )
+        return summary
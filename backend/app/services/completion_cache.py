@@ -0,0 +1,207 @@
+"""Reuse deterministic completions instead of regenerating them."""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import Metrics
+from app.models.completion_cache import CompletionCacheEntry
+from app.services.llm_provider import ChatChunk, ChatCompletion
+from app.services.llm_provider import Message as LLMMessage
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping cost on top of the text itself.
+ENTRY_OVERHEAD_BYTES = 300
+# How often a worker deletes expired rows from the persistent table.
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+def is_cacheable(options: Any) -> bool:
+    """Only greedy decoding gives the same answer for the same prompt."""
+    return options is not None and options.temperature == 0
+
+
+def completion_cache_key(messages: list[LLMMessage], model: str, options: Any) -> str:
+    """Stable hash of everything that determines a temperature-0 completion."""
+    document = {
+        "model": model,
+        "messages": [[m.role, m.content] for m in messages],
+        "options": {
+            "temperature": options.temperature,
+            "max_tokens": options.max_tokens,
+            "top_p": options.top_p,
+        },
+    }
+    encoded = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    completion: ChatCompletion
+    expires_at: float
+    size: int
+
+
+class CompletionCache:
+    """Byte-bounded LRU of completions, optionally backed by a Postgres table.
+
+    The in-memory tier is per worker. With ``persist`` enabled, misses fall
+    through to ``completion_cache`` and stores are written there too, so
+    every worker (and restarts) can reuse them.
+    """
+
+    _entries: OrderedDict[str, _Entry] = OrderedDict()
+    _total_bytes = 0
+    enabled = False
+    max_bytes = 32 * 1024 * 1024
+    ttl_seconds = 86400.0
+    _session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+    _next_prune = 0.0
+
+    @classmethod
+    def configure(
+        cls,
+        *,
+        enabled: bool,
+        max_bytes: int,
+        ttl_seconds: float,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+    ) -> None:
+        cls.enabled = enabled
+        cls.max_bytes = max_bytes
+        cls.ttl_seconds = ttl_seconds
+        cls._session_factory = session_factory
+        cls._evict()
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[ChatCompletion]:
+        entry = cls._entries.get(key)
+        if entry is not None and entry.expires_at >= time.monotonic():
+            cls._entries.move_to_end(key)
+            Metrics.increment("completion_cache.hits")
+            return entry.completion
+        if entry is not None:
+            cls._drop(key)
+
+        completion = await cls._load(key)
+        if completion is None:
+            Metrics.increment("completion_cache.misses")
+            return None
+        Metrics.increment("completion_cache.hits")
+        Metrics.increment("completion_cache.db_hits")
+        cls._remember(key, completion)
+        return completion
+
+    @classmethod
+    async def put(cls, key: str, model: str, completion: ChatCompletion) -> None:
+        cls._remember(key, completion)
+        if cls._session_factory is None:
+            return
+        values = {
+            "model": model,
+            "content": completion.content,
+            "thinking": completion.thinking,
+            "meta": completion.metadata,
+        }
+        try:
+            async with cls._session_factory() as db:
+                # A row past its TTL is skipped by ``_load``; overwrite it so
+                # the key can hit again.
+                await db.execute(
+                    insert(CompletionCacheEntry)
+                    .values(key=key, **values)
+                    .on_conflict_do_update(
+                        index_elements=["key"],
+                        set_={**values, "created_at": func.now()},
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Failed to persist cached completion: %s", e)
+        if time.monotonic() >= cls._next_prune:
+            cls._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+            await cls._prune()
+
+    @classmethod
+    async def _prune(cls) -> None:
+        """Delete persisted completions older than the TTL."""
+        oldest = datetime.now(UTC) - timedelta(seconds=cls.ttl_seconds)
+        try:
+            async with cls._session_factory() as db:
+                result = await db.execute(
+                    delete(CompletionCacheEntry).where(CompletionCacheEntry.created_at < oldest)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Failed to prune cached completions: %s", e)
+            return
+        if result.rowcount:
+            logger.info("Pruned %d expired cached completions", result.rowcount)
+
+    @classmethod
+    async def _load(cls, key: str) -> Optional[ChatCompletion]:
+        if cls._session_factory is None:
+            return None
+        oldest = datetime.now(UTC) - timedelta(seconds=cls.ttl_seconds)
+        try:
+            async with cls._session_factory() as db:
+                row = await db.scalar(
+                    select(CompletionCacheEntry).where(
+                        CompletionCacheEntry.key == key,
+                        CompletionCacheEntry.created_at >= oldest,
+                    )
+                )
+        except Exception as e:
+            logger.warning("Failed to read cached completion: %s", e)
+            return None
+        if row is None:
+            return None
+        return ChatCompletion(content=row.content, thinking=row.thinking, metadata=row.meta)
+
+    @classmethod
+    def _remember(cls, key: str, completion: ChatCompletion) -> None:
+        cls._drop(key)
+        size = len(completion.content) + len(completion.thinking) + ENTRY_OVERHEAD_BYTES
+        cls._entries[key] = _Entry(completion, time.monotonic() + cls.ttl_seconds, size)
+        cls._total_bytes += size
+        cls._evict()
+
+    @classmethod
+    def _drop(cls, key: str) -> None:
+        entry = cls._entries.pop(key, None)
+        if entry is not None:
+            cls._total_bytes -= entry.size
+
+    @classmethod
+    def _evict(cls) -> None:
+        while cls._total_bytes > cls.max_bytes and cls._entries:
+            _, entry = cls._entries.popitem(last=False)
+            cls._total_bytes -= entry.size
+
+
+def replay_chunks(completion: ChatCompletion) -> list[ChatChunk]:
+    """The chunks of a normal stream that produced ``completion``."""
+    chunks = []
+    if completion.thinking:
+        chunks.append(ChatChunk(content=completion.thinking, is_thinking=True))
+    if completion.content:
+        chunks.append(ChatChunk(content=completion.content))
+    chunks.append(
+        ChatChunk(
+            content="",
+            is_finished=True,
+            metadata={**(completion.metadata or {}), "cached": True},
+        )
+    )
+    return chunks
@@ -0,0 +1,104 @@
+"""Fit conversation history into a model's context window."""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+# Role markers and separators the chat template adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for one message."""
+    return len(text) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class HistoryEntry:
+    """A message considered for the prompt, with its token estimate."""
+
+    role: str
+    content: str
+    tokens: int
+
+
+class ContextStrategy(ABC):
+    """Chooses which history entries to send when they don't all fit.
+
+    ``summary``, when given, stands in for messages that were compacted away
+    and goes first if everything fits. The last entry (the user's new
+    message) is always kept, even if it alone exceeds the budget.
+    """
+
+    def select(
+        self,
+        entries: list[HistoryEntry],
+        budget: int,
+        summary: Optional[HistoryEntry] = None,
+    ) -> list[HistoryEntry]:
+        pinned = [summary] if summary else []
+        if sum(e.tokens for e in pinned + entries) <= budget:
+            return pinned + entries
+        return self._trim(entries, budget, summary)
+
+    @abstractmethod
+    def _trim(
+        self,
+        entries: list[HistoryEntry],
+        budget: int,
+        summary: Optional[HistoryEntry],
+    ) -> list[HistoryEntry]: ...
+
+    @staticmethod
+    def _recent(entries: list[HistoryEntry], budget: int) -> list[HistoryEntry]:
+        """The longest suffix of ``entries`` that fits, never less than one entry."""
+        kept: list[HistoryEntry] = []
+        used = 0
+        for entry in reversed(entries):
+            if kept and used + entry.tokens > budget:
+                break
+            kept.append(entry)
+            used += entry.tokens
+        kept.reverse()
+        return kept
+
+
+class SlidingWindow(ContextStrategy):
+    """Keep the most recent messages that fit."""
+
+    def _trim(self, entries, budget, summary):
+        return self._recent(entries, budget)
+
+
+class KeepFirstPlusRecent(ContextStrategy):
+    """Keep the first ``keep_first`` messages (usually the task setup) plus recent ones."""
+
+    def __init__(self, keep_first: int = 2):
+        self.keep_first = keep_first
+
+    def _trim(self, entries, budget, summary):
+        head = entries[: min(self.keep_first, len(entries) - 1)]
+        head_tokens = sum(e.tokens for e in head)
+        if head_tokens >= budget:
+            return self._recent(entries, budget)
+        return head + self._recent(entries[len(head) :], budget - head_tokens)
+
+
+class RecentPlusSummary(ContextStrategy):
+    """Keep recent messages, always prefixed by the summary when one exists."""
+
+    def _trim(self, entries, budget, summary):
+        if summary is None or summary.tokens >= budget:
+            return self._recent(entries, budget)
+        return [summary] + self._recent(entries, budget - summary.tokens)
+
+
+def get_context_strategy(name: str, *, keep_first: int = 2) -> ContextStrategy:
+    """Build a strategy by name: sliding_window, keep_first or recent_plus_summary."""
+    if name == "sliding_window":
+        return SlidingWindow()
+    if name == "keep_first":
+        return KeepFirstPlusRecent(keep_first)
+    if name == "recent_plus_summary":
+        return RecentPlusSummary()
+    raise ValueError(f"Unknown context strategy: {name}")
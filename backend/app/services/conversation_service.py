@@ -2,17 +2,44 @@
 
 import logging
 import uuid
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import desc, func, select
+from sqlalchemy import Update, desc, func, literal, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer, selectinload
 
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.summary import ConversationSummary
+from app.services.context_builder import estimate_tokens
+from app.services.history_cache import CachedMessage, HistoryCache
 
 logger = logging.getLogger(__name__)
 
+# Characters of the newest message kept on the conversation for list views.
+PREVIEW_LENGTH = 120
+
+
+def message_preview(content: str) -> str:
+    """First ``PREVIEW_LENGTH`` characters of a message on a single line."""
+    return " ".join(content.split())[:PREVIEW_LENGTH]
+
+
+def record_message(conversation_id: str, content: str) -> Update:
+    """UPDATE counting a new message; run it in the insert's transaction."""
+    return (
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            message_count=Conversation.message_count + 1,
+            last_message_at=func.now(),
+            last_message_preview=message_preview(content),
+            updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
 
 class ConversationService:
     """Handles creation, retrieval, updating, and deletion of conversations.
@@ -41,25 +68,28 @@ class ConversationService:
             user_id=user_id,
             title=title,
             model=model,
+            message_count=0,
         )
 
         self.db.add(conversation)
 
         if initial_message:
+            conversation.message_count = 1
+            conversation.last_message_at = func.now()  # type: ignore[assignment]
+            conversation.last_message_preview = message_preview(initial_message)
             message = Message(
                 id=str(uuid.uuid4()),
                 conversation_id=conversation_id,
                 role="user",
                 content=initial_message,
+                meta={"token_estimate": estimate_tokens(initial_message)},
             )
             self.db.add(message)
 
         await self.db.commit()
 
         result = await self.db.execute(
-            select(Conversation)
-            .where(Conversation.id == conversation_id)
-            .options(selectinload(Conversation.messages))
+            select(Conversation).where(Conversation.id == conversation_id)
         )
         conversation = result.scalar_one()
 
@@ -84,30 +114,128 @@ class ConversationService:
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_history(
+        self,
+        conversation_id: str,
+        since: Optional[datetime] = None,
+    ) -> list[CachedMessage]:
+        """Messages needed to build a prompt, oldest first.
+
+        Selects only the columns the prompt needs (not the ``meta`` blob).
+        With ``since``, returns messages created at or after that time.
+        """
+        query = (
+            select(
+                Message.id,
+                Message.role,
+                Message.content,
+                Message.meta["token_estimate"].as_integer(),
+                Message.created_at,
+            )
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at)
+        )
+        if since is not None:
+            query = query.where(Message.created_at >= since)
+
+        result = await self.db.execute(query)
+        return [
+            CachedMessage(
+                id=id_,
+                role=role,
+                content=content,
+                tokens=tokens if tokens is not None else estimate_tokens(content),
+                created_at=created_at,
+            )
+            for id_, role, content, tokens, created_at in result.all()
+        ]
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        before: Optional[tuple[datetime, str]] = None,
+        after: Optional[tuple[datetime, str]] = None,
+        limit: int = 50,
+        include_meta: bool = True,
+    ) -> tuple[list[Message], bool]:
+        """Up to ``limit`` messages, oldest first, and whether more lie beyond them.
+
+        Positions are ``(created_at, id)`` pairs. With ``after``, reads forward
+        from it; otherwise reads back from ``before``, or from the newest
+        message. Without ``include_meta`` the ``meta`` column is not loaded.
+        """
+        position = tuple_(Message.created_at, Message.id)
+        created_at_type = Message.created_at.type
+        query = select(Message).where(Message.conversation_id == conversation_id)
+        if before is not None:
+            query = query.where(position < tuple_(literal(before[0], created_at_type), before[1]))
+        if after is not None:
+            query = query.where(position > tuple_(literal(after[0], created_at_type), after[1]))
+            query = query.order_by(Message.created_at, Message.id)
+        else:
+            query = query.order_by(desc(Message.created_at), desc(Message.id))
+        if not include_meta:
+            query = query.options(defer(Message.meta))
+
+        result = await self.db.execute(query.limit(limit + 1))
+        messages = list(result.scalars().all())
+        has_more = len(messages) > limit
+        del messages[limit:]
+        if after is None:
+            messages.reverse()
+        return messages, has_more
+
+    async def get_summary(self, conversation_id: str) -> Optional[ConversationSummary]:
+        """Latest rolling summary of the conversation's oldest messages, if any."""
+        result = await self.db.execute(
+            select(ConversationSummary)
+            .where(ConversationSummary.conversation_id == conversation_id)
+            .order_by(desc(ConversationSummary.created_at))
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
     async def list(
         self,
         user_id: str,
         page: int = 1,
         page_size: int = 20,
-    ) -> tuple[list[Conversation], int]:
-        count_query = select(func.count()).select_from(Conversation).where(
+        cursor: Optional[tuple[datetime, str]] = None,
+        include_total: bool = True,
+    ) -> tuple[list[Conversation], Optional[int]]:
+        """Newest first, by ``updated_at`` then ``id``.
+
+        With ``cursor`` (the ``updated_at`` and ``id`` of the last row already
+        seen), seeks past it through the ``(user_id, updated_at DESC)`` index
+        and ``page`` is ignored, so every page costs the same. ``page`` uses
+        OFFSET and gets slower the deeper it goes. The total is only counted
+        with ``include_total``; otherwise it is None.
+        """
+        visible = (
             Conversation.user_id == user_id,
             Conversation.is_deleted == False,  # noqa: E712
         )
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar() or 0
+        total = None
+        if include_total:
+            total_result = await self.db.execute(
+                select(func.count()).select_from(Conversation).where(*visible)
+            )
+            total = total_result.scalar() or 0
 
         query = (
             select(Conversation)
-            .where(
-                Conversation.user_id == user_id,
-                Conversation.is_deleted == False,  # noqa: E712
-            )
-            .options(selectinload(Conversation.messages))
-            .order_by(desc(Conversation.updated_at))
-            .offset((page - 1) * page_size)
+            .where(*visible)
+            .order_by(desc(Conversation.updated_at), desc(Conversation.id))
             .limit(page_size)
         )
+        if cursor is not None:
+            updated_at, conversation_id = cursor
+            query = query.where(
+                tuple_(Conversation.updated_at, Conversation.id)
+                < tuple_(literal(updated_at, Conversation.updated_at.type), conversation_id)
+            )
+        else:
+            query = query.offset((page - 1) * page_size)
 
         result = await self.db.execute(query)
         conversations = list(result.scalars().all())
@@ -131,6 +259,7 @@ class ConversationService:
             conversation.model = model
 
         await self.db.commit()
+        HistoryCache.invalidate(conversation_id)
         await self.db.refresh(conversation)
 
         return conversation
@@ -151,6 +280,7 @@ class ConversationService:
         else:
             await self.db.delete(conversation)
             await self.db.commit()
+        HistoryCache.invalidate(conversation_id)
 
         logger.info("Deleted conversation %s for user %s", conversation_id, user_id)
         return True
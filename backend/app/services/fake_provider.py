@@ -0,0 +1,212 @@
+"""An LLM provider that generates or replays tokens without a model, for load tests."""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ModelInfo,
+)
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while seven wizards quietly "
+    "debug the server and every token arrives on time"
+).split()
+
+
+@dataclass
+class Recording:
+    """A recorded Ollama /api/chat stream, reduced to what replay needs."""
+
+    name: str
+    chunks: list[tuple[str, bool]]  # (text, is_thinking)
+    final: dict[str, Any]
+    ttft: Optional[float] = None
+    token_interval: Optional[float] = None
+
+
+def load_recordings(path: str) -> list[Recording]:
+    """Read ``*.ndjson`` recordings from a file or directory.
+
+    Record one with, e.g.::
+
+        curl -N http://localhost:11434/api/chat -d '{"model": "llama3.2",
+            "messages": [{"role": "user", "content": "Hi"}]}' > hi.ndjson
+
+    Timing comes from the final object's durations when present.
+    """
+    root = Path(path)
+    files = sorted(root.glob("*.ndjson")) if root.is_dir() else [root]
+    recordings = []
+    for file in files:
+        chunks: list[tuple[str, bool]] = []
+        final: dict[str, Any] = {}
+        for line in file.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get("done"):
+                final = data
+                break
+            message = data.get("message", {})
+            if message.get("thinking"):
+                chunks.append((message["thinking"], True))
+            if message.get("content"):
+                chunks.append((message["content"], False))
+
+        recording = Recording(file.stem, chunks, final)
+        if final.get("eval_count") and final.get("eval_duration"):
+            recording.token_interval = final["eval_duration"] / 1e9 / final["eval_count"]
+        if "prompt_eval_duration" in final:
+            recording.ttft = (final.get("load_duration", 0) + final["prompt_eval_duration"]) / 1e9
+        recordings.append(recording)
+    logger.info("Loaded %d recorded streams from %s", len(recordings), path)
+    return recordings
+
+
+class FakeProvider(LLMProvider):
+    """Emits tokens on a schedule that looks like a real model, without one.
+
+    Each request waits a time to first token of ``ttft`` plus up to
+    ``ttft_jitter`` seconds, then streams at a speed drawn from a normal
+    distribution (``tokens_per_second`` ± ``tokens_per_second_stdev``; 0
+    streams as fast as the event loop allows).
+    It optionally streams ``thinking_tokens`` of reasoning first. A share
+    ``error_rate`` of requests fails at a random point with ``error_status``.
+    With ``recordings``, a recorded stream is replayed instead of generated
+    text, at the recording's own speed when it has durations.
+    """
+
+    def __init__(
+        self,
+        *,
+        models: Optional[list[str]] = None,
+        ttft: float = 0.2,
+        ttft_jitter: float = 0.05,
+        tokens_per_second: float = 50.0,
+        tokens_per_second_stdev: float = 10.0,
+        response_tokens: int = 200,
+        thinking_tokens: int = 0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        recordings: Optional[list[Recording]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.models = models or ["fake-model"]
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_stdev = tokens_per_second_stdev
+        self.response_tokens = response_tokens
+        self.thinking_tokens = thinking_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.recordings = recordings or []
+        self._rng = random.Random(seed)
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    async def stream_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        rng = self._rng
+        started = time.perf_counter()
+        recording = rng.choice(self.recordings) if self.recordings else None
+        if recording is not None:
+            chunks = recording.chunks
+            ttft = recording.ttft if recording.ttft is not None else self._draw_ttft()
+            interval = recording.token_interval or self._draw_interval()
+        else:
+            chunks = self._generate(options)
+            ttft = self._draw_ttft()
+            interval = self._draw_interval()
+        fail_at = rng.randrange(len(chunks) + 1) if rng.random() < self.error_rate else None
+
+        thinking_parts: list[str] = []
+        generated = 0
+        for i, (text, is_thinking) in enumerate(chunks):
+            # Sleep towards a deadline so per-token overhead doesn't add up.
+            delay = started + ttft + i * interval - time.perf_counter()
+            # Even at full speed, give other tasks a turn as real network reads would.
+            await asyncio.sleep(max(delay, 0))
+            if cancel_event and cancel_event.is_set():
+                yield ChatChunk(content="", is_finished=True, metadata={"cancelled": True})
+                return
+            if i == fail_at:
+                break
+            if is_thinking:
+                thinking_parts.append(text)
+            generated += 1
+            yield ChatChunk(content=text, is_finished=False, is_thinking=is_thinking)
+
+        if fail_at is not None:
+            yield ChatChunk(
+                content=f"Fake provider error: injected {self.error_status}",
+                is_finished=True,
+                metadata={"error": True, "status_code": self.error_status},
+            )
+            return
+
+        metadata: dict[str, Any] = {
+            "tokens_generated": generated,
+            "tokens_prompt": sum(len(m.content.split()) for m in messages),
+            "total_duration_ns": int((time.perf_counter() - started) * 1e9),
+        }
+        if recording is not None:
+            metadata["replayed"] = recording.name
+            if "prompt_eval_count" in recording.final:
+                metadata["tokens_prompt"] = recording.final["prompt_eval_count"]
+        if thinking_parts:
+            metadata["thinking"] = "".join(thinking_parts)
+        yield ChatChunk(content="", is_finished=True, metadata=metadata)
+
+    def _generate(self, options: Optional[ChatOptions]) -> list[tuple[str, bool]]:
+        rng = self._rng
+        count = self.response_tokens
+        if options is not None and options.max_tokens:
+            count = min(count, options.max_tokens)
+        thinking = [(rng.choice(WORDS) + " ", True) for _ in range(self.thinking_tokens)]
+        return thinking + [(rng.choice(WORDS) + " ", False) for _ in range(count)]
+
+    def _draw_ttft(self) -> float:
+        return self.ttft + self._rng.uniform(0, self.ttft_jitter)
+
+    def _draw_interval(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        rate = self._rng.gauss(self.tokens_per_second, self.tokens_per_second_stdev)
+        return 1.0 / max(rate, 1.0)
+
+    async def list_models(self) -> list[ModelInfo]:
+        capabilities = ["completion"] + (["thinking"] if self.thinking_tokens else [])
+        return [
+            ModelInfo(
+                id=model,
+                name=model,
+                description="Fake model for load testing",
+                context_length=8192,
+                capabilities=capabilities,
+            )
+            for model in self.models
+        ]
+
+    async def health_check(self) -> bool:
+        return True
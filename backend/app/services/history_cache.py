@@ -0,0 +1,112 @@
+"""In-memory cache of conversation history for prompt building."""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+# Rough per-message bookkeeping cost on top of the content itself.
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+@dataclass
+class CachedMessage:
+    """The parts of a stored message needed to build a prompt."""
+
+    id: str
+    role: str
+    content: str
+    tokens: int
+    created_at: datetime
+
+    @property
+    def size(self) -> int:
+        """Approximate memory footprint in bytes."""
+        return len(self.content) + MESSAGE_OVERHEAD_BYTES
+
+
+@dataclass
+class _Entry:
+    messages: list[CachedMessage]
+    expires_at: float
+    size: int = 0
+
+
+class HistoryCache:
+    """Ordered history per conversation, LRU-evicted by total size and expired by TTL.
+
+    Entries are appended to as messages are stored and dropped when a
+    conversation is updated or deleted. Callers still fetch rows newer than
+    ``CachedMessage.created_at`` of the last entry, so messages written by
+    other workers are picked up without a full reload.
+    """
+
+    _entries: OrderedDict[str, _Entry] = OrderedDict()
+    _total_bytes = 0
+    max_bytes = 64 * 1024 * 1024
+    ttl_seconds = 600.0
+
+    @classmethod
+    def configure(cls, *, max_bytes: int, ttl_seconds: float) -> None:
+        cls.max_bytes = max_bytes
+        cls.ttl_seconds = ttl_seconds
+        cls._evict()
+
+    @classmethod
+    def get(cls, conversation_id: str) -> Optional[list[CachedMessage]]:
+        """Return a copy of the cached history, or None on a miss."""
+        entry = cls._entries.get(conversation_id)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            cls.invalidate(conversation_id)
+            return None
+        cls._entries.move_to_end(conversation_id)
+        return list(entry.messages)
+
+    @classmethod
+    def put(cls, conversation_id: str, messages: list[CachedMessage]) -> None:
+        cls.invalidate(conversation_id)
+        entry = _Entry(
+            messages=list(messages),
+            expires_at=time.monotonic() + cls.ttl_seconds,
+            size=sum(m.size for m in messages),
+        )
+        cls._entries[conversation_id] = entry
+        cls._total_bytes += entry.size
+        cls._evict()
+
+    @classmethod
+    def extend(cls, conversation_id: str, messages: list[CachedMessage]) -> None:
+        """Append newly stored messages to a cached history, skipping known ids."""
+        entry = cls._entries.get(conversation_id)
+        if entry is None or not messages:
+            return
+        since = min(m.created_at for m in messages)
+        known = set()
+        for cached in reversed(entry.messages):
+            if cached.created_at < since:
+                break
+            known.add(cached.id)
+        for message in messages:
+            if message.id in known:
+                continue
+            entry.messages.append(message)
+            entry.size += message.size
+            cls._total_bytes += message.size
+        entry.expires_at = time.monotonic() + cls.ttl_seconds
+        cls._entries.move_to_end(conversation_id)
+        cls._evict()
+
+    @classmethod
+    def invalidate(cls, conversation_id: str) -> None:
+        entry = cls._entries.pop(conversation_id, None)
+        if entry is not None:
+            cls._total_bytes -= entry.size
+
+    @classmethod
+    def _evict(cls) -> None:
+        while cls._total_bytes > cls.max_bytes and cls._entries:
+            _, entry = cls._entries.popitem(last=False)
+            cls._total_bytes -= entry.size
@@ -1,11 +1,21 @@
 """Abstract base class for LLM providers."""
 
+import asyncio
 from abc import ABC, abstractmethod
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from typing import Any, Optional
 
 
+class ProviderUnavailableError(Exception):
+    """Raised when a provider is known to be down and requests fail fast."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"LLM provider {provider} is unavailable")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
 @dataclass
 class Message:
     """A message for the LLM."""
@@ -22,6 +32,7 @@ class ModelInfo:
     name: str
     description: Optional[str] = None
     context_length: Optional[int] = None
+    capabilities: Optional[list[str]] = None  # e.g. "completion", "tools", "thinking", "vision"
 
 
 @dataclass
@@ -43,6 +54,15 @@ class ChatChunk:
     metadata: Optional[dict[str, Any]] = None
 
 
+@dataclass
+class ChatCompletion:
+    """A complete, non-streamed response."""
+
+    content: str
+    thinking: str = ""
+    metadata: Optional[dict[str, Any]] = None
+
+
 class LLMProvider(ABC):
     """Abstract base class for LLM providers.
 
@@ -62,6 +82,7 @@ class LLMProvider(ABC):
         messages: list[Message],
         model: str,
         options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
     ) -> AsyncIterator[ChatChunk]:
         """Stream chat completion from the LLM.
 
@@ -69,12 +90,40 @@ class LLMProvider(ABC):
             messages: List of messages in the conversation
             model: The model identifier to use
             options: Optional generation parameters
+            cancel_event: Set by the caller to stop generation early
 
         Yields:
             ChatChunk: Chunks of the generated response
         """
         ...
 
+    async def complete_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+    ) -> ChatCompletion:
+        """Return the whole completion in one piece.
+
+        The default implementation drains ``stream_chat``; providers with a
+        native non-streaming API should override it. Errors are reported the
+        same way as in streaming: ``metadata["error"]`` is set and ``content``
+        holds the message.
+        """
+        content: list[str] = []
+        thinking: list[str] = []
+        async for chunk in self.stream_chat(messages, model, options):
+            if chunk.metadata and chunk.metadata.get("error"):
+                return ChatCompletion(content=chunk.content, metadata=chunk.metadata)
+            if chunk.is_finished:
+                return ChatCompletion(
+                    content="".join(content),
+                    thinking="".join(thinking),
+                    metadata=chunk.metadata,
+                )
+            (thinking if chunk.is_thinking else content).append(chunk.content)
+        return ChatCompletion(content="".join(content), thinking="".join(thinking))
+
     @abstractmethod
     async def list_models(self) -> list[ModelInfo]:
         """List available models from this provider.
@@ -93,6 +142,15 @@ class LLMProvider(ABC):
         """
         ...
 
+    def ensure_available(self) -> None:
+        """Raise ``ProviderUnavailableError`` if requests would currently be refused."""
+
+    async def start(self) -> None:
+        """Start background work (polling, preloading). Called at app startup."""
+
+    async def close(self) -> None:
+        """Stop background work and release connections. Called at app shutdown."""
+
 
 class ProviderRegistry:
     """Registry for LLM providers.
@@ -0,0 +1,108 @@
+"""In-memory catalog of the models each provider offers."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.metrics import Metrics
+from app.services.llm_provider import LLMProvider, ModelInfo
+from app.services.ollama_provider import canonical_model_name
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CatalogEntry:
+    models: dict[str, ModelInfo]
+    fetched_at: float
+
+
+class ModelCatalog:
+    """Model lists per provider, fresh for ``ttl_seconds``, then stale-while-revalidate.
+
+    A fresh entry is served as is. A stale one (up to ``stale_seconds`` past
+    the TTL) is still served immediately while a single background task
+    refreshes it. Only a missing or expired entry makes the caller wait. A
+    failed refresh keeps the previous list.
+    """
+
+    _entries: dict[str, _CatalogEntry] = {}
+    _refreshes: dict[str, asyncio.Task] = {}
+    ttl_seconds = 60.0
+    stale_seconds = 3600.0
+
+    @classmethod
+    def configure(cls, *, ttl_seconds: float, stale_seconds: float) -> None:
+        cls.ttl_seconds = ttl_seconds
+        cls.stale_seconds = stale_seconds
+
+    @classmethod
+    async def list_models(cls, provider: LLMProvider) -> list[ModelInfo]:
+        entry = cls._entries.get(provider.name)
+        age = time.monotonic() - entry.fetched_at if entry else None
+        if age is not None and age < cls.ttl_seconds:
+            Metrics.increment("model_catalog.hits")
+        elif age is not None and age < cls.ttl_seconds + cls.stale_seconds:
+            Metrics.increment("model_catalog.stale_hits")
+            cls.schedule_refresh(provider)
+        else:
+            Metrics.increment("model_catalog.misses")
+            # Shielded: the refresh is shared, so one waiter giving up (e.g. a
+            # disconnected client) must not cancel it for the others.
+            entry = await asyncio.shield(cls.schedule_refresh(provider))
+            if entry is None:
+                return []
+        return list(entry.models.values())
+
+    @classmethod
+    async def get(cls, provider: LLMProvider, model: str) -> Optional[ModelInfo]:
+        """Catalog entry for one model; an unknown id triggers a background refresh.
+
+        ``llama3.2`` and ``llama3.2:latest`` name the same model.
+        """
+        models = await cls.list_models(provider)
+        wanted = canonical_model_name(model)
+        for info in models:
+            if canonical_model_name(info.id) == wanted:
+                return info
+        if models:
+            # Possibly pulled since the last refresh.
+            cls.schedule_refresh(provider)
+        return None
+
+    @classmethod
+    def schedule_refresh(cls, provider: LLMProvider) -> asyncio.Task:
+        """Start a refresh unless one is already running; return its task."""
+        task = cls._refreshes.get(provider.name)
+        if task is None:
+            task = asyncio.create_task(cls._refresh(provider))
+            cls._refreshes[provider.name] = task
+            task.add_done_callback(lambda _: cls._refreshes.pop(provider.name, None))
+        return task
+
+    @classmethod
+    def invalidate(cls, provider_name: Optional[str] = None) -> None:
+        if provider_name is None:
+            cls._entries.clear()
+        else:
+            cls._entries.pop(provider_name, None)
+
+    @classmethod
+    async def _refresh(cls, provider: LLMProvider) -> Optional[_CatalogEntry]:
+        started = time.perf_counter()
+        try:
+            models = await provider.list_models()
+        except Exception as e:
+            logger.warning("Model catalog refresh for %s failed: %s", provider.name, e)
+            models = []
+        Metrics.observe("model_catalog.refresh_seconds", time.perf_counter() - started)
+
+        previous = cls._entries.get(provider.name)
+        if not models and previous is not None:
+            # Providers report failures as an empty list; keep what we had.
+            return previous
+        entry = _CatalogEntry({m.id: m for m in models}, time.monotonic())
+        cls._entries[provider.name] = entry
+        return entry
@@ -0,0 +1,205 @@
+"""Keep popular Ollama models loaded and unload idle ones."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.core.metrics import Metrics
+from app.services.ollama_provider import canonical_model_name
+
+if TYPE_CHECKING:
+    from app.services.ollama_provider import OllamaProvider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResidentModel:
+    """A model Ollama currently holds in memory, as reported by ``/api/ps``."""
+
+    name: str
+    size: int
+    size_vram: int
+    # When Ollama will unload it; moves whenever its last running request ends.
+    expires_at: Optional[datetime] = None
+    # ``expires_at`` is the same as at the previous poll.
+    settled: bool = False
+
+
+class ModelResidencyManager:
+    """Manages which models one Ollama instance keeps in memory.
+
+    - Preloads a configured set of models at startup.
+    - Sends a longer ``keep_alive`` for models used often in the recent window
+      (and for preloaded ones), a shorter one for the rest.
+    - Polls ``/api/ps`` and, when loaded models exceed the memory budget,
+      unloads the least recently used ones that are idle.
+
+    Models are keyed by canonical name (``llama3.2:latest``), as ``/api/ps``
+    reports them.
+    """
+
+    def __init__(
+        self,
+        provider: "OllamaProvider",
+        *,
+        preload: Optional[list[str]] = None,
+        hot_keep_alive: str = "30m",
+        default_keep_alive: str = "5m",
+        hot_requests: int = 3,
+        usage_window_seconds: float = 900.0,
+        memory_budget_bytes: int = 0,
+        poll_interval: float = 30.0,
+    ):
+        self.provider = provider
+        self.preload = preload or []
+        self._preloaded = {canonical_model_name(m) for m in self.preload}
+        self.hot_keep_alive = hot_keep_alive
+        self.default_keep_alive = default_keep_alive
+        self.hot_requests = hot_requests
+        self.usage_window_seconds = usage_window_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.poll_interval = poll_interval
+
+        self.resident: dict[str, ResidentModel] = {}
+        self._requests: dict[str, deque[float]] = {}
+        self._last_used: dict[str, float] = {}
+        self._in_flight: dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Preload configured models and start polling ``/api/ps``."""
+        if self.preload:
+            results = await asyncio.gather(
+                *(self.provider.load_model(m, self.hot_keep_alive) for m in self.preload)
+            )
+            loaded = [m for m, ok in zip(self.preload, results) if ok]
+            logger.info("Preloaded Ollama models: %s", ", ".join(loaded) or "none")
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def begin_request(self, model: str) -> str:
+        """Record a request for ``model`` and return the keep_alive to send with it."""
+        model = canonical_model_name(model)
+        now = time.monotonic()
+        requests = self._requests.setdefault(model, deque())
+        requests.append(now)
+        while requests and requests[0] < now - self.usage_window_seconds:
+            requests.popleft()
+        self._last_used[model] = now
+        self._in_flight[model] = self._in_flight.get(model, 0) + 1
+
+        if model not in self.resident:
+            # A cold load changes what's resident; re-check the budget soon.
+            Metrics.increment("ollama.cold_model_requests")
+            self._wake.set()
+
+        if model in self._preloaded or len(requests) >= self.hot_requests:
+            return self.hot_keep_alive
+        return self.default_keep_alive
+
+    def end_request(self, model: str) -> None:
+        model = canonical_model_name(model)
+        self._last_used[model] = time.monotonic()
+        remaining = self._in_flight.get(model, 0) - 1
+        if remaining > 0:
+            self._in_flight[model] = remaining
+        else:
+            self._in_flight.pop(model, None)
+
+    def is_resident(self, model: str) -> bool:
+        return canonical_model_name(model) in self.resident
+
+    async def refresh(self) -> None:
+        """Re-read the set of loaded models from ``/api/ps``."""
+        running = await self.provider.list_running()
+        previous = self.resident
+        self.resident = {}
+        for m in running:
+            name = canonical_model_name(m["name"])
+            expires_at = _parse_time(m.get("expires_at"))
+            seen = previous.get(name)
+            self.resident[name] = ResidentModel(
+                name=name,
+                size=m.get("size", 0),
+                size_vram=m.get("size_vram", 0),
+                expires_at=expires_at,
+                settled=seen is not None and seen.expires_at == expires_at,
+            )
+
+    def is_idle(self, model: ResidentModel) -> bool:
+        """Whether no request seems to be running on ``model``, in any process.
+
+        ``_in_flight`` only sees this process. Ollama stops a model's expiry
+        timer while a request runs and restarts it when the last one ends, so
+        a model also has to be within its keep_alive and have kept the same
+        ``expires_at`` since the previous poll. A request started elsewhere
+        since then can still slip through; Ollama defers the unload until
+        its running requests finish, so that costs a reload, not the reply.
+        """
+        if self._in_flight.get(model.name):
+            return False
+        if not model.settled or model.expires_at is None:
+            return False
+        return model.expires_at > datetime.now(UTC)
+
+    async def enforce_budget(self) -> list[str]:
+        """Unload least recently used idle models until under the memory budget."""
+        if not self.memory_budget_bytes:
+            return []
+
+        total = sum(m.size for m in self.resident.values())
+        idle = sorted(
+            (m for m in self.resident.values() if self.is_idle(m)),
+            key=lambda m: self._last_used.get(m.name, 0.0),
+        )
+        unloaded: list[str] = []
+        for model in idle:
+            if total <= self.memory_budget_bytes:
+                break
+            if await self.provider.unload_model(model.name):
+                total -= model.size
+                unloaded.append(model.name)
+                self.resident.pop(model.name, None)
+                Metrics.increment("ollama.models_unloaded")
+        if unloaded:
+            logger.info("Unloaded idle Ollama models over budget: %s", ", ".join(unloaded))
+        return unloaded
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                await self.enforce_budget()
+            except Exception as e:
+                logger.warning("Ollama residency poll failed: %s", e)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                # Give Ollama a moment to finish loading the cold model.
+                await asyncio.sleep(1.0)
+            except TimeoutError:
+                pass
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
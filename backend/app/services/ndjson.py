@@ -0,0 +1,99 @@
+"""Byte-level NDJSON decoding for provider streams."""
+
+import json
+import logging
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JSONDecoder:
+    """A JSON backend: how to decode one document and what it raises on bad input."""
+
+    name: str
+    loads: Callable[[bytes], Any]
+    errors: tuple[type[Exception], ...]
+
+
+_stdlib_json = json.JSONDecoder()
+
+
+def _stdlib_loads(data: bytes) -> Any:
+    # Skips json.loads' per-call encoding detection; Ollama always sends UTF-8.
+    return _stdlib_json.decode(data.decode("utf-8"))
+
+
+def _stdlib_decoder() -> JSONDecoder:
+    return JSONDecoder("stdlib", _stdlib_loads, (ValueError,))
+
+
+def _orjson_decoder() -> JSONDecoder:
+    import orjson
+
+    return JSONDecoder("orjson", orjson.loads, (orjson.JSONDecodeError,))
+
+
+_BACKENDS: dict[str, Callable[[], JSONDecoder]] = {
+    "orjson": _orjson_decoder,
+    "stdlib": _stdlib_decoder,
+}
+
+
+def get_json_decoder(backend: str = "auto") -> JSONDecoder:
+    """Resolve a JSON backend by name.
+
+    ``auto`` is orjson, a regular dependency and the only backend that
+    beats line-based stdlib parsing; stdlib remains as a fallback for
+    platforms without an orjson wheel. Naming orjson when it is not
+    installed falls back to the stdlib with a warning.
+    """
+    if backend == "auto":
+        try:
+            return _orjson_decoder()
+        except ImportError:
+            return _stdlib_decoder()
+
+    factory = _BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    try:
+        return factory()
+    except ImportError:
+        logger.warning("JSON backend %s is not installed, using stdlib json", backend)
+        return _stdlib_decoder()
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[bytes],
+    decoder: JSONDecoder,
+) -> AsyncIterator[Any]:
+    """Split a byte stream on newlines and decode each non-empty line.
+
+    Works on raw bytes, so no text decoding or per-line ``str`` is needed.
+    Lines that fail to decode are logged and skipped.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            line = buffer + chunk[start:end] if buffer else chunk[start:end]
+            buffer = b""
+            if line.strip():
+                try:
+                    yield decoder.loads(line)
+                except decoder.errors:
+                    logger.warning("Failed to parse NDJSON line: %r", line[:200])
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if start < len(chunk):
+            buffer += chunk[start:]
+
+    if buffer.strip():
+        try:
+            yield decoder.loads(buffer)
+        except decoder.errors:
+            logger.warning("Failed to parse NDJSON line: %r", buffer[:200])
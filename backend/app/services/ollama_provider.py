@@ -1,24 +1,58 @@
 """Ollama LLM provider implementation."""
 
 import asyncio
-import json
+import importlib.util
 import logging
 from collections.abc import AsyncIterator
-from typing import Any, Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
 
 import httpx
 
 from app.services.llm_provider import (
     ChatChunk,
+    ChatCompletion,
     ChatOptions,
     LLMProvider,
     Message,
     ModelInfo,
 )
+from app.services.ndjson import get_json_decoder, iter_ndjson
+
+if TYPE_CHECKING:
+    from app.services.model_residency import ModelResidencyManager
 
 logger = logging.getLogger(__name__)
 
 
+def canonical_model_name(name: str) -> str:
+    """The name Ollama reports for a model: ``llama3.2`` is ``llama3.2:latest``."""
+    # A registry host may carry a port ("host:5000/model"), so only the last
+    # path segment is checked for a tag.
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+@dataclass
+class HTTPClientSettings:
+    """Connection pool and timeouts for the Ollama HTTP client."""
+
+    max_connections: int = 100
+    # Streams tend to finish in bursts; idle connections past this are closed
+    # before queued requests can reuse them, so keep it close to max_connections.
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    # Longest wait for a free connection when all max_connections are busy.
+    pool_timeout: float = 30.0
+    # Longest silence between two chunks of a response.
+    read_timeout: float = 120.0
+    # Longest wait for the first chunk of a chat response (includes model loading).
+    first_byte_timeout: float = 120.0
+    # Longest wait for a non-streamed completion, which sends nothing until done.
+    completion_timeout: float = 600.0
+    http2: bool = False
+
+
 class OllamaProvider(LLMProvider):
     """Ollama LLM provider.
 
@@ -26,23 +60,58 @@ class OllamaProvider(LLMProvider):
     Default endpoint: http://localhost:11434
     """
 
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        *,
+        json_backend: str = "auto",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        show_concurrency: int = 4,
+        http: Optional[HTTPClientSettings] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self._client: Optional[httpx.AsyncClient] = None
+        self._transport = transport
+        self.http = http or HTTPClientSettings()
+        self.show_concurrency = show_concurrency
+        self._model_details: dict[tuple[str, str], tuple[Optional[int], list[str]]] = {}
+        self._json = get_json_decoder(json_backend)
+        self.residency: Optional[ModelResidencyManager] = None
 
     @property
     def name(self) -> str:
         return "ollama"
 
     def _get_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client."""
+        """Get or create the pooled HTTP client shared by all requests."""
         if self._client is None or self._client.is_closed:
+            http = self.http
+            http2 = http.http2
+            if http2 and importlib.util.find_spec("h2") is None:
+                logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+                http2 = False
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
-                timeout=httpx.Timeout(300.0),  # 5 minutes for long generations
+                timeout=self._timeout(read=http.read_timeout),
+                limits=httpx.Limits(
+                    max_connections=http.max_connections,
+                    max_keepalive_connections=http.max_keepalive_connections,
+                    keepalive_expiry=http.keepalive_expiry,
+                ),
+                http2=http2,
+                transport=self._transport,
             )
         return self._client
 
+    def _timeout(self, *, read: float) -> httpx.Timeout:
+        http = self.http
+        return httpx.Timeout(
+            connect=http.connect_timeout,
+            read=read,
+            write=http.connect_timeout,
+            pool=http.pool_timeout,
+        )
+
     async def stream_chat(
         self,
         messages: list[Message],
@@ -56,75 +125,52 @@ class OllamaProvider(LLMProvider):
         Pass cancel_event to allow the caller to abort mid-stream.
         """
         client = self._get_client()
-        opts = options or ChatOptions()
-
-        # Convert messages to Ollama format
-        ollama_messages = [
-            {"role": msg.role, "content": msg.content}
-            for msg in messages
-        ]
-
-        # Build options dict
-        request_options: dict[str, Any] = {
-            "temperature": opts.temperature,
-        }
-        if opts.max_tokens is not None:
-            request_options["num_predict"] = opts.max_tokens
-        if opts.top_p is not None:
-            request_options["top_p"] = opts.top_p
-
-        payload = {
-            "model": model,
-            "messages": ollama_messages,
-            "stream": True,
-            "options": request_options,
-        }
+        payload = self._build_chat_payload(
+            messages,
+            model,
+            options,
+            stream=True,
+            keep_alive=self._begin_use(model),
+        )
 
-        full_content = ""
-        accumulated_thinking = ""
+        thinking_parts: list[str] = []
+        final: Optional[ChatChunk] = None
 
         try:
-            async with client.stream(
-                "POST",
-                "/api/chat",
-                json=payload,
-            ) as response:
+            async with (
+                asyncio.timeout(self.http.first_byte_timeout) as deadline,
+                client.stream(
+                    "POST",
+                    "/api/chat",
+                    json=payload,
+                ) as response,
+            ):
                 response.raise_for_status()
 
-                async for line in response.aiter_lines():
+                async for data in iter_ndjson(response.aiter_bytes(), self._json):
+                    # From here on only the per-read timeout applies.
+                    deadline.reschedule(None)
+
                     # Check for cancellation on every chunk.
                     if cancel_event and cancel_event.is_set():
                         await response.aclose()
                         yield ChatChunk(content="", is_finished=True, metadata={"cancelled": True})
                         return
 
-                    if not line:
-                        continue
-
-                    try:
-                        data = json.loads(line)
-                    except json.JSONDecodeError:
-                        logger.warning(f"Failed to parse Ollama response: {line}")
-                        continue
-
                     # Check for completion
                     if data.get("done", False):
-                        metadata: dict[str, Any] = {}
-                        if "eval_count" in data:
-                            metadata["tokens_generated"] = data["eval_count"]
-                        if "prompt_eval_count" in data:
-                            metadata["tokens_prompt"] = data["prompt_eval_count"]
-                        if "total_duration" in data:
-                            metadata["total_duration_ns"] = data["total_duration"]
-                        if accumulated_thinking:
-                            metadata["thinking"] = accumulated_thinking
-
-                        yield ChatChunk(
+                        metadata = self._usage_metadata(data)
+                        if thinking_parts:
+                            metadata["thinking"] = "".join(thinking_parts)
+
+                        # Read on to the end of the body so the connection goes
+                        # back to the pool instead of being closed.
+                        final = ChatChunk(
                             content="",
                             is_finished=True,
                             metadata=metadata,
                         )
-                        break
+                        continue
 
                     # Extract content and thinking from message
                     message = data.get("message", {})
@@ -132,24 +178,19 @@ class OllamaProvider(LLMProvider):
                     thinking = message.get("thinking", "")
 
                     if thinking:
-                        accumulated_thinking += thinking
+                        thinking_parts.append(thinking)
                         yield ChatChunk(content=thinking, is_finished=False, is_thinking=True)
 
                     if content:
-                        full_content += content
                         yield ChatChunk(content=content, is_finished=False)
 
+            if final is not None:
+                yield final
+
         except httpx.HTTPStatusError as e:
             logger.error(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}")
-            error_msg = f"Ollama error: {e.response.status_code}"
-            try:
-                error_data = e.response.json()
-                if "error" in error_data:
-                    error_msg = f"Ollama error: {error_data['error']}"
-            except Exception:
-                pass
             yield ChatChunk(
-                content=error_msg,
+                content=self._http_error_message(e.response),
                 is_finished=True,
                 metadata={"error": True, "status_code": e.response.status_code},
             )
@@ -160,6 +201,13 @@ class OllamaProvider(LLMProvider):
                 is_finished=True,
                 metadata={"error": True},
             )
+        except TimeoutError:
+            logger.error("Ollama sent nothing within %ss", self.http.first_byte_timeout)
+            yield ChatChunk(
+                content=f"Ollama did not respond within {self.http.first_byte_timeout:g}s",
+                is_finished=True,
+                metadata={"error": True, "error_type": "timeout"},
+            )
         except Exception as e:
             logger.exception("Unexpected error in Ollama streaming")
             yield ChatChunk(
@@ -167,6 +215,127 @@ class OllamaProvider(LLMProvider):
                 is_finished=True,
                 metadata={"error": True},
             )
+        finally:
+            self._end_use(model)
+
+    async def complete_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+    ) -> ChatCompletion:
+        """Get a whole completion from Ollama with ``stream: false``."""
+        client = self._get_client()
+        payload = self._build_chat_payload(
+            messages,
+            model,
+            options,
+            stream=False,
+            keep_alive=self._begin_use(model),
+        )
+
+        try:
+            response = await client.post(
+                "/api/chat",
+                json=payload,
+                timeout=self._timeout(read=self.http.completion_timeout),
+            )
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}")
+            return ChatCompletion(
+                content=self._http_error_message(e.response),
+                metadata={"error": True, "status_code": e.response.status_code},
+            )
+        except httpx.RequestError as e:
+            logger.error(f"Ollama request error: {e}")
+            return ChatCompletion(
+                content=f"Failed to connect to Ollama: {e}",
+                metadata={"error": True},
+            )
+        except Exception as e:
+            logger.exception("Unexpected error in Ollama completion")
+            return ChatCompletion(content=f"Unexpected error: {e}", metadata={"error": True})
+        finally:
+            self._end_use(model)
+
+        message = data.get("message", {})
+        thinking = message.get("thinking", "")
+        metadata = self._usage_metadata(data)
+        if thinking:
+            metadata["thinking"] = thinking
+        return ChatCompletion(
+            content=message.get("content", ""),
+            thinking=thinking,
+            metadata=metadata,
+        )
+
+    @staticmethod
+    def _build_chat_payload(
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions],
+        *,
+        stream: bool,
+        keep_alive: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Build the /api/chat request body."""
+        opts = options or ChatOptions()
+
+        # Convert messages to Ollama format
+        ollama_messages = [{"role": msg.role, "content": msg.content} for msg in messages]
+
+        # Build options dict
+        request_options: dict[str, Any] = {
+            "temperature": opts.temperature,
+        }
+        if opts.max_tokens is not None:
+            request_options["num_predict"] = opts.max_tokens
+        if opts.top_p is not None:
+            request_options["top_p"] = opts.top_p
+
+        payload: dict[str, Any] = {
+            "model": model,
+            "messages": ollama_messages,
+            "stream": stream,
+            "options": request_options,
+        }
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return payload
+
+    def _begin_use(self, model: str) -> Optional[str]:
+        """Record a request for ``model`` and return the keep_alive hint to send."""
+        if self.residency is None:
+            return None
+        return self.residency.begin_request(model)
+
+    def _end_use(self, model: str) -> None:
+        if self.residency is not None:
+            self.residency.end_request(model)
+
+    @staticmethod
+    def _usage_metadata(data: dict[str, Any]) -> dict[str, Any]:
+        """Extract token counts and timing from a final /api/chat object."""
+        metadata: dict[str, Any] = {}
+        if "eval_count" in data:
+            metadata["tokens_generated"] = data["eval_count"]
+        if "prompt_eval_count" in data:
+            metadata["tokens_prompt"] = data["prompt_eval_count"]
+        if "total_duration" in data:
+            metadata["total_duration_ns"] = data["total_duration"]
+        return metadata
+
+    @staticmethod
+    def _http_error_message(response: httpx.Response) -> str:
+        try:
+            error_data = response.json()
+            if "error" in error_data:
+                return f"Ollama error: {error_data['error']}"
+        except Exception:
+            pass
+        return f"Ollama error: {response.status_code}"
 
     async def list_models(self) -> list[ModelInfo]:
         """List available models from Ollama."""
@@ -178,6 +347,7 @@ class OllamaProvider(LLMProvider):
             data = response.json()
 
             models = []
+            digests: dict[str, str] = {}
             for model in data.get("models", []):
                 model_name = model.get("name", "")
                 model_details = model.get("details", {})
@@ -188,34 +358,14 @@ class OllamaProvider(LLMProvider):
                 if len(name_parts) > 1 and name_parts[1] != "latest":
                     display_name += f" ({name_parts[1]})"
 
-                # Extract context length if available
-                context_length = None
-                if "parameter_size" in model_details:
-                    # Rough estimate based on model size
-                    param_size = model_details["parameter_size"]
-                    if "B" in param_size:
-                        try:
-                            size = float(param_size.replace("B", ""))
-                            # Typical 7B models have 4K-8K context
-                            # 70B models might have 128K
-                            if size <= 3:
-                                context_length = 4096
-                            elif size <= 8:
-                                context_length = 8192
-                            elif size <= 20:
-                                context_length = 32768
-                            else:
-                                context_length = 131072
-                        except ValueError:
-                            pass
-
                 models.append(ModelInfo(
                     id=model_name,
                     name=display_name,
                     description=f"{model_details.get('parameter_size', 'Unknown size')} {model_details.get('family', '')}",
-                    context_length=context_length,
                 ))
+                digests[model_name] = model.get("digest", "")
 
+            await self._fill_model_details(models, digests)
             return models
 
         except httpx.HTTPStatusError as e:
@@ -228,6 +378,43 @@ class OllamaProvider(LLMProvider):
             logger.exception("Unexpected error listing Ollama models")
             return []
 
+    async def _fill_model_details(self, models: list[ModelInfo], digests: dict[str, str]) -> None:
+        """Set context length and capabilities from ``/api/show``, a few models at a time.
+
+        Results are kept per model digest, so only new or re-pulled models are
+        looked up again.
+        """
+        semaphore = asyncio.Semaphore(self.show_concurrency)
+
+        async def fill(model: ModelInfo) -> None:
+            key = (model.id, digests.get(model.id, ""))
+            if key not in self._model_details:
+                async with semaphore:
+                    details = await self.show_model(model.id)
+                if details is None:
+                    return
+                self._model_details[key] = details
+            model.context_length, model.capabilities = self._model_details[key]
+
+        await asyncio.gather(*(fill(m) for m in models))
+
+    async def show_model(self, model: str) -> Optional[tuple[Optional[int], list[str]]]:
+        """Context length and capabilities of ``model`` (``/api/show``), or None on failure."""
+        try:
+            response = await self._get_client().post("/api/show", json={"model": model})
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPError as e:
+            logger.warning("Failed to show Ollama model %s: %s", model, e)
+            return None
+
+        context_length = None
+        for key, value in data.get("model_info", {}).items():
+            if key.endswith(".context_length"):
+                context_length = int(value)
+                break
+        return context_length, data.get("capabilities", [])
+
     async def health_check(self) -> bool:
         """Check if Ollama is accessible."""
         client = self._get_client()
@@ -238,8 +425,42 @@ class OllamaProvider(LLMProvider):
         except Exception:
             return False
 
+    async def list_running(self) -> list[dict[str, Any]]:
+        """Models currently loaded in Ollama's memory (``/api/ps``)."""
+        response = await self._get_client().get("/api/ps")
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    async def load_model(self, model: str, keep_alive: str) -> bool:
+        """Load ``model`` into memory without generating anything."""
+        return await self._set_keep_alive(model, keep_alive)
+
+    async def unload_model(self, model: str) -> bool:
+        """Ask Ollama to drop ``model`` from memory right away."""
+        return await self._set_keep_alive(model, 0)
+
+    async def _set_keep_alive(self, model: str, keep_alive: str | int) -> bool:
+        # A /api/generate request without a prompt only (un)loads the model.
+        try:
+            response = await self._get_client().post(
+                "/api/generate",
+                json={"model": model, "keep_alive": keep_alive},
+            )
+            response.raise_for_status()
+            return True
+        except httpx.HTTPError as e:
+            logger.warning("Failed to set keep_alive=%s for %s: %s", keep_alive, model, e)
+            return False
+
+    async def start(self) -> None:
+        self._get_client()
+        if self.residency is not None:
+            await self.residency.start()
+
     async def close(self) -> None:
-        """Close the HTTP client."""
+        """Stop residency polling and close the HTTP client, draining its connections."""
+        if self.residency is not None:
+            await self.residency.stop()
         if self._client and not self._client.is_closed:
             await self._client.aclose()
             self._client = None
@@ -0,0 +1,363 @@
+"""Spread requests across several Ollama instances."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from app.core.metrics import Metrics
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatCompletion,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ModelInfo,
+)
+from app.services.ollama_provider import OllamaProvider, canonical_model_name
+
+logger = logging.getLogger(__name__)
+
+# Recent time-to-first-token samples kept per model for the hedge delay.
+TTFT_WINDOW = 500
+MIN_TTFT_SAMPLES = 20
+# Unused hedge allowance that may pile up during quiet periods.
+MAX_HEDGE_BURST = 10.0
+
+_END = object()
+
+
+@dataclass
+class OllamaNode:
+    """Routing state for one Ollama instance."""
+
+    provider: OllamaProvider
+    # Position in OLLAMA_BASE_URLS; names the node in metrics instead of its URL.
+    index: int = 0
+    healthy: bool = True
+    failures: int = 0
+    in_flight: int = 0
+    requests: int = 0
+    # Models reported by /api/ps, plus those with a request running here, by
+    # canonical (tagged) name.
+    loaded: set[str] = field(default_factory=set)
+    active: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return self.provider.base_url
+
+
+class OllamaRouterProvider(LLMProvider):
+    """Routes each request to one of several ``OllamaProvider`` nodes.
+
+    A node that already has the model loaded is preferred, so models are
+    not swapped in and out of memory; among those, the one with the fewest
+    streams in flight wins. With ``spill_in_flight`` set, a model also
+    spills over to another node once every node holding it has that many
+    streams running and some other node has fewer; that loads a second
+    copy, which may evict another model there. Nodes are ejected after
+    ``max_failures`` consecutive connection or server errors (or a failed
+    health check) and return on the next passing one.
+
+    With ``hedge_ratio`` set, a stream whose first token hasn't arrived
+    within the ``hedge_percentile`` of recent time-to-first-token (or whose
+    node fails before producing one) is also sent to a second node. The
+    first of the two to produce a token wins and the other is cancelled.
+    Hedges are limited to about ``hedge_ratio`` of requests.
+    """
+
+    def __init__(
+        self,
+        nodes: list[OllamaProvider],
+        *,
+        poll_interval: float = 5.0,
+        max_failures: int = 3,
+        spill_in_flight: int = 0,
+        hedge_ratio: float = 0.0,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.25,
+        hedge_initial_delay: float = 2.0,
+    ):
+        if not nodes:
+            raise ValueError("OllamaRouterProvider needs at least one node")
+        self.nodes = [OllamaNode(provider=p, index=i) for i, p in enumerate(nodes)]
+        self.poll_interval = poll_interval
+        self.max_failures = max_failures
+        self.spill_in_flight = spill_in_flight
+        self.hedge_ratio = hedge_ratio
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self._hedge_budget = 0.0
+        self._ttft: dict[str, deque[float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def name(self) -> str:
+        return "ollama"
+
+    def pick_node(self, model: str, exclude: Optional[OllamaNode] = None) -> Optional[OllamaNode]:
+        """Choose the node for the next request to ``model``."""
+        candidates = [n for n in self.nodes if n.healthy and n is not exclude]
+        if not candidates and exclude is None:
+            # Health data may be stale; trying a node beats failing outright.
+            candidates = self.nodes
+        if not candidates:
+            return None
+        model = canonical_model_name(model)
+        warm = [n for n in candidates if model in n.loaded]
+        cold = [n for n in candidates if model not in n.loaded]
+        # Loading a model may evict another, so new placements go to the
+        # node holding the fewest models first, the least busy second.
+        placement = min(cold, key=lambda n: (len(n.loaded), n.in_flight, n.requests), default=None)
+        if not warm:
+            return placement
+        node = min(warm, key=lambda n: (n.in_flight, n.requests))
+        if (
+            self.spill_in_flight
+            and node.in_flight >= self.spill_in_flight
+            and placement is not None
+            and placement.in_flight < self.spill_in_flight
+        ):
+            Metrics.increment("router.spills")
+            return placement
+        return node
+
+    async def stream_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        node = self.pick_node(model)
+        if self.hedge_ratio:
+            self._hedge_budget = min(self._hedge_budget + self.hedge_ratio, MAX_HEDGE_BURST)
+            stream = self._hedged_stream(node, messages, model, options, cancel_event)
+        else:
+            stream = self._stream_node(node, messages, model, options, cancel_event)
+        async for chunk in stream:
+            yield chunk
+
+    async def _stream_node(
+        self,
+        node: OllamaNode,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions],
+        cancel_event: Optional[asyncio.Event],
+    ) -> AsyncIterator[ChatChunk]:
+        self._acquire(node, model)
+        started = time.monotonic()
+        first = True
+        try:
+            async for chunk in node.provider.stream_chat(messages, model, options, cancel_event):
+                if first and not (chunk.metadata and chunk.metadata.get("error")):
+                    self._record_ttft(model, time.monotonic() - started)
+                first = False
+                if chunk.is_finished:
+                    self._record_outcome(node, chunk.metadata)
+                yield chunk
+        finally:
+            self._release(node, model)
+
+    async def _hedged_stream(
+        self,
+        node: OllamaNode,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions],
+        cancel_event: Optional[asyncio.Event],
+    ) -> AsyncIterator[ChatChunk]:
+        """Stream from ``node``, racing a second node if the first token is late."""
+        output: asyncio.Queue[tuple[int, Any]] = asyncio.Queue()
+        attempts: list[asyncio.Task] = []
+
+        async def pump(target: OllamaNode, index: int) -> None:
+            try:
+                async for chunk in self._stream_node(
+                    target, messages, model, options, cancel_event
+                ):
+                    output.put_nowait((index, chunk))
+            finally:
+                output.put_nowait((index, _END))
+
+        def hedge() -> None:
+            second = self.pick_node(model, exclude=node)
+            if second is None or self._hedge_budget < 1:
+                return
+            self._hedge_budget -= 1
+            Metrics.increment("router.hedges")
+            attempts.append(asyncio.create_task(pump(second, len(attempts))))
+
+        attempts.append(asyncio.create_task(pump(node, 0)))
+        hedge_at = time.monotonic() + self._hedge_delay(model)
+        winner: Optional[int] = None
+        finished = 0
+        last_error: Optional[ChatChunk] = None
+        try:
+            while True:
+                can_hedge = winner is None and len(attempts) == 1
+                timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+                try:
+                    index, chunk = await asyncio.wait_for(output.get(), timeout)
+                except TimeoutError:
+                    hedge()
+                    hedge_at = float("inf")
+                    continue
+
+                if chunk is _END:
+                    finished += 1
+                    if index == winner or finished == len(attempts):
+                        if winner is None and last_error is not None:
+                            yield last_error
+                        return
+                    continue
+                if winner is None:
+                    if chunk.metadata and chunk.metadata.get("error"):
+                        # Failed before producing anything: try another node instead.
+                        last_error = chunk
+                        if can_hedge:
+                            hedge()
+                            hedge_at = float("inf")
+                        continue
+                    winner = index
+                    if len(attempts) > 1:
+                        Metrics.increment("router.hedge_wins" if winner else "router.hedge_losses")
+                    for i, attempt in enumerate(attempts):
+                        if i != winner:
+                            attempt.cancel()
+                if index == winner:
+                    yield chunk
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def complete_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+    ) -> ChatCompletion:
+        node = self.pick_node(model)
+        self._acquire(node, model)
+        try:
+            completion = await node.provider.complete_chat(messages, model, options)
+        finally:
+            self._release(node, model)
+        self._record_outcome(node, completion.metadata)
+        return completion
+
+    async def list_models(self) -> list[ModelInfo]:
+        """Models available on any healthy node."""
+        nodes = [n for n in self.nodes if n.healthy] or self.nodes
+        results = await asyncio.gather(*(n.provider.list_models() for n in nodes))
+        models: dict[str, ModelInfo] = {}
+        for node_models in results:
+            for model in node_models:
+                models.setdefault(model.id, model)
+        return list(models.values())
+
+    async def health_check(self) -> bool:
+        """True if at least one node is reachable."""
+        results = await asyncio.gather(*(n.provider.health_check() for n in self.nodes))
+        return any(results)
+
+    async def refresh(self) -> None:
+        """Re-check health and loaded models of every node."""
+        await asyncio.gather(*(self._refresh_node(n) for n in self.nodes))
+
+    async def start(self) -> None:
+        for node in self.nodes:
+            await node.provider.start()
+        await self.refresh()
+        self._task = asyncio.create_task(self._poll())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for node in self.nodes:
+            await node.provider.close()
+
+    def _acquire(self, node: OllamaNode, model: str) -> None:
+        model = canonical_model_name(model)
+        node.in_flight += 1
+        node.requests += 1
+        node.active[model] = node.active.get(model, 0) + 1
+        node.loaded.add(model)
+        Metrics.increment(f"router.requests.node{node.index}")
+
+    def _record_ttft(self, model: str, seconds: float) -> None:
+        Metrics.observe("router.ttft_seconds", seconds)
+        samples = self._ttft.get(model)
+        if samples is None:
+            samples = self._ttft[model] = deque(maxlen=TTFT_WINDOW)
+        samples.append(seconds)
+
+    def _hedge_delay(self, model: str) -> float:
+        """How long to wait for a first token before hedging."""
+        samples = self._ttft.get(model)
+        if not samples or len(samples) < MIN_TTFT_SAMPLES:
+            return self.hedge_initial_delay
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return max(self.hedge_min_delay, ordered[index])
+
+    def _release(self, node: OllamaNode, model: str) -> None:
+        model = canonical_model_name(model)
+        node.in_flight -= 1
+        remaining = node.active.get(model, 0) - 1
+        if remaining > 0:
+            node.active[model] = remaining
+        else:
+            node.active.pop(model, None)
+
+    def _record_outcome(self, node: OllamaNode, metadata: Optional[dict]) -> None:
+        # Connection errors carry no status code; 4xx (e.g. unknown model)
+        # says nothing about the node's health.
+        if not (metadata and metadata.get("error")):
+            node.failures = 0
+            return
+        if metadata.get("status_code", 500) < 500:
+            return
+        node.failures += 1
+        if node.healthy and node.failures >= self.max_failures:
+            self._eject(node, f"{node.failures} consecutive failed requests")
+
+    def _eject(self, node: OllamaNode, reason: str) -> None:
+        node.healthy = False
+        Metrics.increment("router.nodes_ejected")
+        logger.warning("Ejected Ollama node %s: %s", node.url, reason)
+
+    async def _refresh_node(self, node: OllamaNode) -> None:
+        if not await node.provider.health_check():
+            if node.healthy:
+                self._eject(node, "health check failed")
+            return
+        try:
+            running = await node.provider.list_running()
+        except Exception as e:
+            logger.warning("Failed to read /api/ps from %s: %s", node.url, e)
+            return
+        node.loaded = {canonical_model_name(m["name"]) for m in running} | set(node.active)
+        if not node.healthy:
+            logger.info("Ollama node %s is healthy again", node.url)
+        node.healthy = True
+        node.failures = 0
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Ollama node poll failed: %s", e)
@@ -0,0 +1,21 @@
+"""Opaque cursors for keyset pagination over ``(timestamp, id)`` orderings."""
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(at: datetime, id_: str) -> str:
+    """Cursor pointing just past the row with this timestamp and id."""
+    raw = json.dumps([at.isoformat(), id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of ``encode_cursor``. Raises ``ValueError`` for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        at, id_ = json.loads(raw)
+        return datetime.fromisoformat(at), str(id_)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,118 @@
+"""Registration and lifecycle of the configured LLM providers."""
+
+import logging
+from typing import Optional
+
+from app.core.config import Settings, get_settings
+from app.services.circuit_breaker import CircuitBreakerProvider
+from app.services.fake_provider import FakeProvider, load_recordings
+from app.services.llm_provider import LLMProvider, ProviderRegistry
+from app.services.model_catalog import ModelCatalog
+from app.services.model_residency import ModelResidencyManager
+from app.services.ollama_provider import HTTPClientSettings, OllamaProvider
+from app.services.ollama_router import OllamaRouterProvider
+from app.services.single_flight import SingleFlightProvider
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_providers(settings: Optional[Settings] = None) -> None:
+    """Register the providers described by settings, once per process."""
+    settings = settings or get_settings()
+    if settings.llm_provider in ProviderRegistry.list_providers():
+        return
+    if settings.llm_provider == "fake":
+        provider: LLMProvider = _fake_provider(settings)
+    else:
+        provider = _ollama_provider(settings)
+    # The same wrappers as in production, so load tests exercise them too.
+    if settings.circuit_breaker_enabled:
+        provider = CircuitBreakerProvider(
+            provider,
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            reset_timeout=settings.circuit_breaker_reset_seconds,
+            probe_interval=settings.llm_probe_interval_seconds,
+        )
+    if settings.single_flight_enabled:
+        provider = SingleFlightProvider(provider)
+    ProviderRegistry.register(provider)
+
+
+def _ollama_provider(settings: Settings) -> LLMProvider:
+    nodes = [_ollama_node(url, settings) for url in settings.ollama_base_urls_list]
+    if len(nodes) == 1:
+        return nodes[0]
+    return OllamaRouterProvider(
+        nodes,
+        poll_interval=settings.ollama_router_poll_seconds,
+        max_failures=settings.ollama_router_max_failures,
+        spill_in_flight=settings.ollama_router_spill_in_flight,
+        hedge_ratio=settings.ollama_hedge_ratio,
+        hedge_percentile=settings.ollama_hedge_percentile,
+        hedge_min_delay=settings.ollama_hedge_min_delay_seconds,
+    )
+
+
+def _fake_provider(settings: Settings) -> FakeProvider:
+    return FakeProvider(
+        models=settings.fake_models_list,
+        ttft=settings.fake_ttft_ms / 1000,
+        ttft_jitter=settings.fake_ttft_jitter_ms / 1000,
+        tokens_per_second=settings.fake_tokens_per_second,
+        tokens_per_second_stdev=settings.fake_tokens_per_second_stdev,
+        response_tokens=settings.fake_response_tokens,
+        thinking_tokens=settings.fake_thinking_tokens,
+        error_rate=settings.fake_error_rate,
+        error_status=settings.fake_error_status,
+        recordings=load_recordings(settings.fake_replay_path)
+        if settings.fake_replay_path
+        else None,
+    )
+
+
+def _ollama_node(base_url: str, settings: Settings) -> OllamaProvider:
+    provider = OllamaProvider(
+        base_url=base_url,
+        json_backend=settings.json_backend,
+        show_concurrency=settings.ollama_show_concurrency,
+        http=HTTPClientSettings(
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive_connections,
+            keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+            connect_timeout=settings.ollama_connect_timeout_seconds,
+            pool_timeout=settings.ollama_pool_timeout_seconds,
+            read_timeout=settings.ollama_read_timeout_seconds,
+            first_byte_timeout=settings.ollama_first_byte_timeout_seconds,
+            completion_timeout=settings.ollama_completion_timeout_seconds,
+            http2=settings.ollama_http2,
+        ),
+    )
+    provider.residency = ModelResidencyManager(
+        provider,
+        preload=settings.ollama_preload_models_list,
+        hot_keep_alive=settings.ollama_keep_alive_hot,
+        default_keep_alive=settings.ollama_keep_alive_default,
+        hot_requests=settings.ollama_hot_model_requests,
+        usage_window_seconds=settings.ollama_usage_window_seconds,
+        memory_budget_bytes=settings.ollama_memory_budget_mb * 1024 * 1024,
+        poll_interval=settings.ollama_residency_poll_seconds,
+    )
+    return provider
+
+
+async def start_providers() -> None:
+    """Start background work of registered providers and warm the model catalog."""
+    ensure_providers()
+    for name in ProviderRegistry.list_providers():
+        provider = ProviderRegistry.get(name)
+        try:
+            await provider.start()
+        except Exception as e:
+            logger.warning("Could not start provider %s: %s", name, e)
+        ModelCatalog.schedule_refresh(provider)
+
+
+async def stop_providers() -> None:
+    """Stop background work and close provider HTTP clients."""
+    for name in ProviderRegistry.list_providers():
+        await ProviderRegistry.get(name).close()
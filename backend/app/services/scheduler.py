@@ -0,0 +1,220 @@
+"""Per-model admission control for generations."""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.metrics import Metrics
+from app.services.ollama_provider import canonical_model_name
+
+
+class QueueFullError(Exception):
+    """Raised when a model's wait queue has no room for another request."""
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"Too many requests queued for {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+@dataclass(eq=False)
+class SlotTicket:
+    """A request's place in a model's queue, and later its running slot."""
+
+    model: str
+    user_id: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted_at: Optional[float] = None
+    released: bool = False
+
+    @property
+    def granted(self) -> bool:
+        return self.granted_at is not None
+
+
+class _ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        # Waiting tickets per user; users are served in rotation.
+        self.waiting: OrderedDict[str, deque[SlotTicket]] = OrderedDict()
+        self.queued = 0
+        self.avg_hold_seconds = 5.0
+        self.changed = asyncio.Event()
+
+    def has_capacity(self) -> bool:
+        return not self.limit or self.running < self.limit
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def position(self, ticket: SlotTicket) -> int:
+        """1-based place in the round-robin order in which tickets will be granted."""
+        users = list(self.waiting)
+        index = users.index(ticket.user_id)
+        turn = self.waiting[ticket.user_id].index(ticket)
+        ahead = 0
+        for i, user in enumerate(users):
+            count = len(self.waiting[user])
+            ahead += min(count, turn + 1 if i < index else turn)
+        return ahead + 1
+
+
+class GenerationScheduler:
+    """Caps concurrent generations per model, queueing the rest fairly.
+
+    Each model runs at most ``max_concurrent`` generations (0 = no cap, or a
+    per-model value from ``model_limits``). Up to ``max_queue`` more wait in
+    line; waiting users are served round-robin, so one user's burst does not
+    starve everyone else. Beyond that ``enqueue`` raises ``QueueFullError``.
+    Models are keyed by canonical name, so ``llama3.2`` and
+    ``llama3.2:latest`` share one queue. State is per worker process.
+    """
+
+    _queues: dict[str, _ModelQueue] = {}
+    max_concurrent = 4
+    max_queue = 32
+    model_limits: dict[str, int] = {}
+
+    @classmethod
+    def configure(
+        cls,
+        *,
+        max_concurrent: int,
+        max_queue: int,
+        model_limits: Optional[dict[str, int]] = None,
+    ) -> None:
+        cls.max_concurrent = max_concurrent
+        cls.max_queue = max_queue
+        cls.model_limits = {
+            canonical_model_name(model): limit for model, limit in (model_limits or {}).items()
+        }
+        for model, queue in cls._queues.items():
+            queue.limit = cls.model_limits.get(model, max_concurrent)
+            cls._grant(queue)
+            queue.notify()
+
+    @classmethod
+    def enqueue(cls, model: str, user_id: str) -> SlotTicket:
+        """Take a slot for ``model`` now, or a place in its queue."""
+        model = canonical_model_name(model)
+        queue = cls._queue(model)
+        ticket = SlotTicket(model=model, user_id=user_id)
+        if queue.has_capacity() and not queue.queued:
+            cls._start(queue, ticket)
+            return ticket
+        if queue.queued >= cls.max_queue:
+            Metrics.increment("scheduler.rejected")
+            raise QueueFullError(model, cls._retry_after(queue))
+
+        queue.waiting.setdefault(user_id, deque()).append(ticket)
+        queue.queued += 1
+        Metrics.increment("scheduler.queued")
+        return ticket
+
+    @classmethod
+    def try_acquire(cls, model: str, user_id: str, *, headroom: int = 0) -> Optional[SlotTicket]:
+        """Take a slot for background work, or return None without queueing.
+
+        Only succeeds while nobody is waiting and at least ``headroom`` more
+        slots stay free (but never all of them), so interactive requests
+        always go first.
+        """
+        model = canonical_model_name(model)
+        queue = cls._queue(model)
+        if queue.queued or (
+            queue.limit and queue.running + min(headroom, queue.limit - 1) >= queue.limit
+        ):
+            return None
+        ticket = SlotTicket(model=model, user_id=user_id)
+        cls._start(queue, ticket)
+        return ticket
+
+    @classmethod
+    async def wait(
+        cls,
+        ticket: SlotTicket,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[int]:
+        """Yield the ticket's queue position whenever it changes, until it is granted.
+
+        Returns early, still ungranted, if ``cancel_event`` is set.
+        """
+        queue = cls._queues[ticket.model]
+        last_position = 0
+        while not ticket.granted:
+            if cancel_event and cancel_event.is_set():
+                return
+            changed = queue.changed
+            position = queue.position(ticket)
+            if position != last_position:
+                last_position = position
+                yield position
+                continue
+
+            waiters = [asyncio.ensure_future(changed.wait())]
+            if cancel_event:
+                waiters.append(asyncio.ensure_future(cancel_event.wait()))
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    @classmethod
+    def release(cls, ticket: SlotTicket) -> None:
+        """Give back a running slot, or leave the queue. Safe to call twice."""
+        if ticket.released:
+            return
+        ticket.released = True
+        queue = cls._queues[ticket.model]
+        if ticket.granted:
+            queue.running -= 1
+            held = time.monotonic() - ticket.granted_at
+            queue.avg_hold_seconds = 0.8 * queue.avg_hold_seconds + 0.2 * held
+        else:
+            waiting = queue.waiting.get(ticket.user_id)
+            if waiting and ticket in waiting:
+                waiting.remove(ticket)
+                queue.queued -= 1
+                if not waiting:
+                    del queue.waiting[ticket.user_id]
+        cls._grant(queue)
+        queue.notify()
+
+    @classmethod
+    def _queue(cls, model: str) -> _ModelQueue:
+        queue = cls._queues.get(model)
+        if queue is None:
+            queue = cls._queues[model] = _ModelQueue(
+                cls.model_limits.get(model, cls.max_concurrent)
+            )
+        return queue
+
+    @classmethod
+    def _grant(cls, queue: _ModelQueue) -> None:
+        while queue.waiting and queue.has_capacity():
+            user_id, waiting = next(iter(queue.waiting.items()))
+            ticket = waiting.popleft()
+            queue.queued -= 1
+            if waiting:
+                queue.waiting.move_to_end(user_id)
+            else:
+                del queue.waiting[user_id]
+            cls._start(queue, ticket)
+            Metrics.observe("scheduler.queue_wait_seconds", ticket.granted_at - ticket.enqueued_at)
+
+    @staticmethod
+    def _start(queue: _ModelQueue, ticket: SlotTicket) -> None:
+        queue.running += 1
+        ticket.granted_at = time.monotonic()
+
+    @staticmethod
+    def _retry_after(queue: _ModelQueue) -> int:
+        """Rough seconds until a running generation ends and the queue moves."""
+        return max(1, math.ceil(queue.avg_hold_seconds / (queue.limit or 1)))
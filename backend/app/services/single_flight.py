@@ -0,0 +1,200 @@
+"""Share one upstream generation between identical concurrent requests."""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from app.core.metrics import Metrics
+from app.services.completion_cache import completion_cache_key, is_cacheable
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatCompletion,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ModelInfo,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One upstream stream and the chunks it has produced so far."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: list[ChatChunk] = []
+        self.done = False
+        self.subscribers = 0
+        self.cancel_event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def publish(self, chunk: ChatChunk) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class _Completion:
+    """One upstream non-streamed request and how many callers await it."""
+
+    def __init__(self, key: str, task: asyncio.Task):
+        self.key = key
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlightProvider(LLMProvider):
+    """Wraps a provider so identical in-flight requests share one generation.
+
+    Requests are identical when model, messages and generation options hash
+    to the same key, and only temperature-0 requests are merged: sampled
+    replies are expected to differ, so those always get their own
+    generation. The first one starts the upstream stream; later ones attach
+    as subscribers and replay every chunk produced so far before following
+    live. A subscriber that stops (closes its iterator or sets its
+    ``cancel_event``) only detaches; the upstream is cancelled once the last
+    subscriber has left. Non-streamed completions work the same way. A
+    finished flight is forgotten, so this is not a cache: only requests that
+    overlap in time are merged.
+    """
+
+    def __init__(self, inner: LLMProvider):
+        self.inner = inner
+        self._flights: dict[str, _Flight] = {}
+        self._completions: dict[str, _Completion] = {}
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    async def stream_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        if not is_cacheable(options):
+            async for chunk in self.inner.stream_chat(messages, model, options, cancel_event):
+                yield chunk
+            return
+
+        key = completion_cache_key(messages, model, options)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(key)
+            flight.task = asyncio.create_task(self._run(flight, messages, model, options))
+        else:
+            Metrics.increment("single_flight.joined")
+
+        flight.subscribers += 1
+        cursor = 0
+        try:
+            while True:
+                changed = flight.changed
+                while cursor < len(flight.chunks):
+                    if cancel_event and cancel_event.is_set():
+                        yield ChatChunk(content="", is_finished=True, metadata={"cancelled": True})
+                        return
+                    chunk = flight.chunks[cursor]
+                    cursor += 1
+                    yield chunk
+                    if chunk.is_finished:
+                        return
+                if flight.done:
+                    return
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                Metrics.increment("single_flight.upstream_cancelled")
+                flight.cancel_event.set()
+                # New requests must not join a stream that is being stopped.
+                self._forget(flight)
+
+    async def _run(
+        self,
+        flight: _Flight,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions],
+    ) -> None:
+        try:
+            async for chunk in self.inner.stream_chat(
+                messages, model, options, flight.cancel_event
+            ):
+                flight.publish(chunk)
+        except Exception as e:
+            logger.exception("Shared upstream stream failed")
+            flight.publish(
+                ChatChunk(
+                    content=f"Unexpected error: {e}",
+                    is_finished=True,
+                    metadata={"error": True},
+                )
+            )
+        finally:
+            flight.finish()
+            self._forget(flight)
+
+    def _forget(self, flight: _Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    async def complete_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+    ) -> ChatCompletion:
+        if not is_cacheable(options):
+            return await self.inner.complete_chat(messages, model, options)
+
+        key = completion_cache_key(messages, model, options)
+        pending = self._completions.get(key)
+        if pending is None:
+            task = asyncio.create_task(self.inner.complete_chat(messages, model, options))
+            pending = self._completions[key] = _Completion(key, task)
+            task.add_done_callback(lambda _: self._forget_completion(pending))
+        else:
+            Metrics.increment("single_flight.joined")
+
+        pending.waiters += 1
+        try:
+            # Shielded: one caller going away must not cancel the others' result.
+            return await asyncio.shield(pending.task)
+        finally:
+            pending.waiters -= 1
+            if pending.waiters == 0 and not pending.task.done():
+                Metrics.increment("single_flight.upstream_cancelled")
+                pending.task.cancel()
+                self._forget_completion(pending)
+
+    def _forget_completion(self, pending: _Completion) -> None:
+        if self._completions.get(pending.key) is pending:
+            del self._completions[pending.key]
+
+    async def list_models(self) -> list[ModelInfo]:
+        return await self.inner.list_models()
+
+    async def health_check(self) -> bool:
+        return await self.inner.health_check()
+
+    def ensure_available(self) -> None:
+        self.inner.ensure_available()
+
+    async def start(self) -> None:
+        await self.inner.start()
+
+    async def close(self) -> None:
+        await self.inner.close()
@@ -0,0 +1,136 @@
+"""Server-Sent Events framing for chat streams."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from app.schemas.chat import ChatResponseChunk
+from app.services.llm_provider import ChatChunk
+
+# Pre-built frames for the hot path. They produce the same JSON document as
+# ``ChatResponseChunk.model_dump_json()`` without validating a model per token.
+_CONTENT_FRAME = 'data: {"type":"chunk","content":%s,"error":null,"metadata":null}\n\n'
+_THINKING_FRAME = 'data: {"type":"thinking","content":%s,"error":null,"metadata":null}\n\n'
+
+_END = object()
+
+
+def to_response_chunk(chunk: ChatChunk) -> ChatResponseChunk:
+    """Map a provider chunk to the API response schema."""
+    if chunk.is_finished:
+        return ChatResponseChunk(type="done", metadata=chunk.metadata)
+    if chunk.metadata and chunk.metadata.get("queued"):
+        return ChatResponseChunk(type="queued", metadata=chunk.metadata)
+    if chunk.metadata and chunk.metadata.get("error"):
+        return ChatResponseChunk(type="error", error=chunk.content, metadata=chunk.metadata)
+    if chunk.is_thinking:
+        return ChatResponseChunk(type="thinking", content=chunk.content)
+    return ChatResponseChunk(type="chunk", content=chunk.content)
+
+
+def encode_chunk(chunk: ChatChunk, *, fast: bool = True, event_id: Optional[int] = None) -> str:
+    """Encode a provider chunk as an SSE frame, with an ``id:`` line if given.
+
+    With ``fast`` enabled, plain content and thinking chunks are written from a
+    template; terminal and error chunks always go through the pydantic model.
+    """
+    if fast and not chunk.is_finished and not chunk.metadata:
+        template = _THINKING_FRAME if chunk.is_thinking else _CONTENT_FRAME
+        frame = template % json.dumps(chunk.content, ensure_ascii=False)
+    else:
+        frame = f"data: {to_response_chunk(chunk).model_dump_json()}\n\n"
+    if event_id is not None:
+        return f"id: {event_id}\n{frame}"
+    return frame
+
+
+def _is_mergeable(chunk: ChatChunk) -> bool:
+    return bool(chunk.content) and not chunk.is_finished and not chunk.metadata
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[tuple[int, ChatChunk]],
+    *,
+    window_ms: int = 0,
+    max_bytes: int = 0,
+) -> AsyncIterator[tuple[int, ChatChunk]]:
+    """Merge consecutive ``(event_id, chunk)`` content chunks into larger ones.
+
+    A merged chunk carries the id of the last chunk folded into it. Buffered
+    text is flushed when ``window_ms`` has passed since the first buffered
+    token, when it reaches ``max_bytes`` of UTF-8, when the chunk kind changes
+    (thinking vs. content), or when a terminal/error chunk arrives. With both
+    limits at 0 the stream is passed through unchanged.
+    """
+    if not window_ms and not max_bytes:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[tuple[int, ChatChunk] | BaseException | object] = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for item in chunks:
+                queue.put_nowait(item)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_END)
+
+    pump_task = asyncio.create_task(pump())
+
+    pending: list[str] = []
+    pending_id = 0
+    pending_thinking = False
+    pending_bytes = 0
+    deadline: Optional[float] = None
+
+    def flush() -> tuple[int, ChatChunk]:
+        nonlocal pending, pending_bytes, deadline
+        merged = ChatChunk(content="".join(pending), is_thinking=pending_thinking)
+        pending, pending_bytes, deadline = [], 0, None
+        return pending_id, merged
+
+    try:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except TimeoutError:
+                    yield flush()
+                    continue
+
+            if item is _END or isinstance(item, BaseException):
+                if pending:
+                    yield flush()
+                if isinstance(item, BaseException):
+                    raise item
+                return
+
+            event_id, chunk = item
+            if pending and (not _is_mergeable(chunk) or chunk.is_thinking != pending_thinking):
+                yield flush()
+
+            if not _is_mergeable(chunk):
+                yield event_id, chunk
+                continue
+
+            if not pending:
+                pending_thinking = chunk.is_thinking
+                if window_ms:
+                    deadline = loop.time() + window_ms / 1000
+            pending.append(chunk.content)
+            pending_id = event_id
+            pending_bytes += len(chunk.content.encode("utf-8"))
+            if (max_bytes and pending_bytes >= max_bytes) or (
+                deadline is not None and loop.time() >= deadline
+            ):
+                yield flush()
+    finally:
+        pump_task.cancel()
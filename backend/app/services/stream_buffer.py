@@ -0,0 +1,125 @@
+"""Replay buffers that let clients resume an in-flight chat stream."""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import AsyncIterator
+from itertools import islice
+from typing import Optional
+
+from app.schemas.chat import ChatOptions
+from app.services.llm_provider import ChatChunk
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationBuffer:
+    """Bounded, numbered record of the chunks produced by one generation.
+
+    Chunk ids start at 1 and increase monotonically, so they can be sent as SSE
+    ``id:`` fields and handed back via ``Last-Event-ID``. Only the most recent
+    ``max_chunks`` are kept. ``options`` are the request's, so a resumed
+    stream is framed the way the client asked for originally.
+    """
+
+    def __init__(
+        self,
+        conversation_id: str,
+        user_id: str,
+        max_chunks: int = 4096,
+        options: Optional[ChatOptions] = None,
+    ):
+        self.conversation_id = conversation_id
+        self.user_id = user_id
+        self.options = options or ChatOptions()
+        self.finished = False
+        self._chunks: deque[tuple[int, ChatChunk]] = deque(maxlen=max_chunks)
+        self._last_id = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, chunk: ChatChunk) -> int:
+        """Append a chunk and wake any tailing readers. Returns its id."""
+        self._last_id += 1
+        self._chunks.append((self._last_id, chunk))
+        self._notify()
+        return self._last_id
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def tail(self, last_event_id: int = 0) -> AsyncIterator[tuple[int, ChatChunk]]:
+        """Replay chunks after ``last_event_id``, then follow the live generation."""
+        cursor = last_event_id
+        while True:
+            changed = self._changed
+            if self._chunks:
+                first_id = self._chunks[0][0]
+                if cursor < first_id - 1:
+                    yield (
+                        first_id - 1,
+                        ChatChunk(
+                            content="Part of the response is no longer available for replay",
+                            metadata={"error": True, "error_type": "replay_gap"},
+                        ),
+                    )
+                    cursor = first_id - 1
+                pending = list(islice(self._chunks, max(0, cursor - first_id + 1), None))
+                for event_id, chunk in pending:
+                    yield event_id, chunk
+                    cursor = event_id
+
+            if self.finished and cursor >= self._last_id:
+                return
+            if cursor < self._last_id:
+                continue
+            await changed.wait()
+
+
+class StreamRegistry:
+    """Process-wide index of generation buffers, keyed by conversation id.
+
+    Buffers are evicted ``ttl`` seconds after their generation finishes. The
+    registry lives in the worker process that runs the generation, so only
+    that worker can resume its stream.
+    """
+
+    _buffers: dict[str, GenerationBuffer] = {}
+
+    @classmethod
+    def open(
+        cls,
+        conversation_id: str,
+        user_id: str,
+        max_chunks: int,
+        options: Optional[ChatOptions] = None,
+    ) -> GenerationBuffer:
+        """Create and register the buffer for a new generation."""
+        buffer = GenerationBuffer(conversation_id, user_id, max_chunks, options)
+        cls._buffers[conversation_id] = buffer
+        return buffer
+
+    @classmethod
+    def get(cls, conversation_id: str) -> Optional[GenerationBuffer]:
+        return cls._buffers.get(conversation_id)
+
+    @classmethod
+    def close(cls, buffer: GenerationBuffer, ttl: float) -> None:
+        """Mark a buffer finished and schedule its eviction."""
+        buffer.finish()
+        asyncio.get_running_loop().call_later(ttl, cls._evict, buffer)
+
+    @classmethod
+    def _evict(cls, buffer: GenerationBuffer) -> None:
+        # A newer generation may have replaced this buffer in the meantime.
+        if cls._buffers.get(buffer.conversation_id) is buffer:
+            del cls._buffers[buffer.conversation_id]
+            logger.debug("Evicted stream buffer for %s", buffer.conversation_id)
@@ -0,0 +1,180 @@
+"""Compare batch inference with sending the same prompts one request at a time.
+
+Starts the app under uvicorn with ``LLM_PROVIDER=fake`` (or targets
+``--url``) and completes ``--prompts`` prompts twice:
+
+- per request: ``--clients`` concurrent loops, each creating a conversation
+  and posting a non-streamed chat request per prompt, the way a one-off
+  script would;
+- batch: one ``POST /batches`` with every prompt, polled until finished and
+  read back as NDJSON.
+
+It reports prompts/sec for both. ``--model-concurrency`` plays the part of
+Ollama's parallel slots; batch workers leave ``--reserved-slots`` of them
+free for chat. Requires the Postgres from ``docker compose up -d``. Run
+from ``backend/``:
+
+    uv run python -m benchmarks.batch_throughput --prompts 200 --clients 1
+    uv run python -m benchmarks.batch_throughput --prompts 500 --clients 4 --model-concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from benchmarks.load_test import login, wait_ready
+
+
+def start_server(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DEBUG": "false",
+        "LLM_PROVIDER": "fake",
+        "FAKE_MODELS": args.model,
+        "FAKE_TTFT_MS": str(args.fake_ttft_ms),
+        "FAKE_TOKENS_PER_SECOND": str(args.fake_tokens_per_second),
+        "FAKE_RESPONSE_TOKENS": str(args.fake_tokens),
+        "SCHEDULER_MAX_CONCURRENT_PER_MODEL": str(args.model_concurrency),
+        "BATCH_WORKERS": str(args.batch_workers),
+        "BATCH_RESERVED_SLOTS": str(args.reserved_slots),
+        "BATCH_POLL_SECONDS": "0.5",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+def prompts(count: int) -> list[str]:
+    # Distinct prompts, so single-flight and the completion cache don't merge them.
+    return [f"batch benchmark {uuid.uuid4()}" for _ in range(count)]
+
+
+async def per_request(base_url: str, headers: dict, args) -> tuple[float, int]:
+    """Seconds to complete every prompt with individual chat requests, and errors."""
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for prompt in prompts(args.prompts):
+        queue.put_nowait(prompt)
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        while not queue.empty():
+            prompt = queue.get_nowait()
+            # A fresh client per prompt, as a simple script using requests.post would.
+            async with httpx.AsyncClient(base_url=base_url, timeout=600) as http:
+                response = await http.post(
+                    "/api/v1/chat/conversations",
+                    json={"title": "batch benchmark", "model": args.model},
+                    headers=headers,
+                )
+                response.raise_for_status()
+                response = await http.post(
+                    f"/api/v1/chat/conversations/{response.json()['id']}/chat",
+                    json={"message": prompt, "options": {"stream": False}},
+                    headers=headers,
+                )
+                if response.status_code != 200:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    return time.perf_counter() - started, errors
+
+
+async def batch(http: httpx.AsyncClient, headers: dict, args) -> tuple[float, int]:
+    """Seconds from submitting a batch to having read all its results, and errors."""
+    started = time.perf_counter()
+    response = await http.post(
+        "/api/v1/batches",
+        json={"model": args.model, "prompts": prompts(args.prompts)},
+        headers=headers,
+    )
+    response.raise_for_status()
+    batch_id = response.json()["id"]
+    while True:
+        job = (await http.get(f"/api/v1/batches/{batch_id}", headers=headers)).json()
+        if job["status"] not in ("queued", "running"):
+            break
+        await asyncio.sleep(0.2)
+
+    results = 0
+    async with http.stream(
+        "GET", f"/api/v1/batches/{batch_id}/results.ndjson", headers=headers
+    ) as response:
+        async for line in response.aiter_lines():
+            results += bool(line)
+    elapsed = time.perf_counter() - started
+    if results != args.prompts:
+        print(f"warning: read {results} results for {args.prompts} prompts")
+    return elapsed, job["failed"]
+
+
+async def run(args, base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as http:
+        await wait_ready(http)
+        headers = await login(http)
+        modes = [
+            (f"per request x{args.clients}", await per_request(base_url, headers, args)),
+            (f"batch ({args.batch_workers} workers)", await batch(http, headers, args)),
+        ]
+
+    print(f"{'mode':<24} {'seconds':>8} {'prompts/s':>10} {'errors':>7}")
+    for name, (seconds, errors) in modes:
+        print(f"{name:<24} {seconds:8.1f} {args.prompts / seconds:10.1f} {errors:7d}")
+    (_, (base, _)), (_, (batched, _)) = modes
+    print(f"batch speedup: {base / batched:.2f}x")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=1, help="Concurrent per-request loops")
+    parser.add_argument("--batch-workers", type=int, default=4)
+    parser.add_argument("--reserved-slots", type=int, default=1)
+    parser.add_argument("--model", default="fake-model")
+    parser.add_argument(
+        "--model-concurrency",
+        type=int,
+        default=4,
+        help="Scheduler slots per model, like OLLAMA_NUM_PARALLEL",
+    )
+    parser.add_argument("--fake-ttft-ms", type=float, default=200.0)
+    parser.add_argument("--fake-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--fake-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_server(args)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await run(args, base_url)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Check stream cancellation across worker processes and measure its latency.
+
+Starts several worker processes that each subscribe a handful of conversation
+ids on ``CancellationBus``, like a uvicorn worker running those streams. The
+parent then publishes a stop for every id from its own bus and records how
+long each takes to reach the worker that owns it. It exits non-zero if any
+stop request is lost.
+
+Requires the Postgres from ``docker compose up -d``. Run from ``backend/``:
+
+    uv run python -m benchmarks.cancel_across_workers --workers 8 --streams 16
+"""
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import statistics
+import sys
+import time
+import uuid
+
+from app.core.config import get_settings
+from app.services.cancellation import CancellationBus
+
+
+async def _worker_main(conversation_ids: list[str], ready, results, timeout: float) -> None:
+    await CancellationBus.start(get_settings().database_url)
+    events = {cid: asyncio.Event() for cid in conversation_ids}
+    for cid, event in events.items():
+        CancellationBus.subscribe(cid, event)
+    ready.put(len(events))
+
+    async def wait_one(cid: str) -> None:
+        try:
+            await asyncio.wait_for(events[cid].wait(), timeout)
+            results.put((cid, time.time()))
+        except TimeoutError:
+            results.put((cid, None))
+
+    await asyncio.gather(*(wait_one(cid) for cid in conversation_ids))
+    await CancellationBus.stop()
+
+
+def _worker(conversation_ids: list[str], ready, results, timeout: float) -> None:
+    asyncio.run(_worker_main(conversation_ids, ready, results, timeout))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--streams", type=int, default=16, help="Streams per worker")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    ready, results = ctx.Queue(), ctx.Queue()
+    assignments = [[str(uuid.uuid4()) for _ in range(args.streams)] for _ in range(args.workers)]
+    processes = [
+        ctx.Process(target=_worker, args=(ids, ready, results, args.timeout)) for ids in assignments
+    ]
+    for p in processes:
+        p.start()
+    for _ in processes:
+        await asyncio.to_thread(ready.get)
+
+    await CancellationBus.start(get_settings().database_url)
+    sent_at: dict[str, float] = {}
+    for ids in assignments:
+        for cid in ids:
+            sent_at[cid] = time.time()
+            if not await CancellationBus.publish(cid):
+                print("Publishing failed; is Postgres reachable?", file=sys.stderr)
+                return 1
+    await CancellationBus.stop()
+
+    latencies: list[float] = []
+    lost = 0
+    for _ in sent_at:
+        cid, received_at = await asyncio.to_thread(results.get)
+        if received_at is None:
+            lost += 1
+        else:
+            latencies.append((received_at - sent_at[cid]) * 1000)
+    for p in processes:
+        p.join()
+
+    total = len(sent_at)
+    print(f"workers={args.workers} streams={total} delivered={total - lost} lost={lost}")
+    if latencies:
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"latency ms: p50={statistics.median(latencies):.2f} "
+            f"p95={p95:.2f} max={latencies[-1]:.2f}"
+        )
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
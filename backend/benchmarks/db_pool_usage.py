@@ -0,0 +1,120 @@
+"""Measure DB pool usage while many chat responses stream concurrently.
+
+Runs ``ChatService.send_message`` against a stand-in provider that emits
+tokens slowly, and samples ``engine.pool.checkedout()`` while the streams are
+in flight. Pool usage should stay flat as the number of streams grows, since
+no connection is held during generation.
+
+Requires the Postgres from ``docker compose up -d``. Run from ``backend/``:
+
+    uv run python -m benchmarks.db_pool_usage --streams 1 8 32 64
+"""
+
+import argparse
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from app.db.session import async_session_maker, engine, init_db
+from app.models.conversation import Conversation
+from app.models.user import User
+from app.services.chat_service import ChatService
+from app.services.llm_provider import (
+    ChatChunk,
+    ChatOptions,
+    LLMProvider,
+    Message,
+    ModelInfo,
+    ProviderRegistry,
+)
+
+BENCH_USER = "pool-bench@garbanzo.dev"
+
+
+class SlowProvider(LLMProvider):
+    """Emits a fixed number of tokens with a delay between each."""
+
+    def __init__(self, tokens: int, delay: float):
+        self.tokens = tokens
+        self.delay = delay
+
+    @property
+    def name(self) -> str:
+        return "pool-bench"
+
+    async def stream_chat(
+        self,
+        messages: list[Message],
+        model: str,
+        options: Optional[ChatOptions] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> AsyncIterator[ChatChunk]:
+        for _ in range(self.tokens):
+            await asyncio.sleep(self.delay)
+            yield ChatChunk(content="tok ")
+        yield ChatChunk(content="", is_finished=True, metadata={})
+
+    async def list_models(self) -> list[ModelInfo]:
+        return [ModelInfo(id="bench", name="Bench")]
+
+    async def health_check(self) -> bool:
+        return True
+
+
+async def _create_conversations(count: int) -> list[str]:
+    async with async_session_maker() as db:
+        if await db.get(User, BENCH_USER) is None:
+            db.add(User(email=BENCH_USER, hashed_password="x"))
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        db.add_all(Conversation(id=cid, user_id=BENCH_USER, model="bench") for cid in ids)
+        await db.commit()
+    return ids
+
+
+async def _run_stream(conversation_id: str) -> None:
+    async with async_session_maker() as db:
+        service = ChatService(db, provider_name="pool-bench")
+        async for _ in service.send_message(conversation_id, BENCH_USER, "hello"):
+            pass
+
+
+async def _measure(streams: int, interval: float) -> tuple[int, float]:
+    conversation_ids = await _create_conversations(streams)
+    samples: list[int] = []
+
+    async def sampler() -> None:
+        while True:
+            samples.append(engine.pool.checkedout())
+            await asyncio.sleep(interval)
+
+    sampling = asyncio.create_task(sampler())
+    try:
+        await asyncio.gather(*(_run_stream(cid) for cid in conversation_ids))
+    finally:
+        sampling.cancel()
+
+    return max(samples), sum(samples) / len(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--sample-interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    await init_db()
+    ProviderRegistry.register(SlowProvider(args.tokens, args.token_delay))
+
+    print(f"{'streams':>8} {'max checked out':>16} {'mean checked out':>17}")
+    for streams in args.streams:
+        peak, mean = await _measure(streams, args.sample_interval)
+        print(f"{streams:>8} {peak:>16} {mean:>17.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,438 @@
+"""End-to-end load test: concurrent chat streams plus CRUD traffic against the real app.
+
+Starts the app under uvicorn with ``LLM_PROVIDER=fake`` (or targets
+``--url``), opens ``--streams`` concurrent SSE chat streams of ``--turns``
+messages each while ``--crud-clients`` list, read and rename conversations,
+and reports time to first token, inter-token latency, tokens/sec, request
+latency percentiles, DB pool wait (from ``/api/v1/metrics``, so only one
+worker's view with ``--workers`` > 1) and server RSS.
+Results are written as JSON so runs can be compared across commits.
+
+Requires the Postgres from ``docker compose up -d``. Run from ``backend/``:
+
+    uv run python -m benchmarks.load_test --streams 100 --turns 3 --crud-clients 4
+    uv run python -m benchmarks.load_test --streams 200 --fake-tokens-per-second 0 --baseline old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+BENCH_EMAIL = "load-test@garbanzo.dev"
+BENCH_PASSWORD = "load-test-password"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+@dataclass
+class StreamResult:
+    ttft: Optional[float] = None
+    latency: float = 0.0
+    tokens: int = 0
+    gaps: list[float] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def percentiles(values: list[float]) -> Optional[dict[str, float]]:
+    """p50/p95/p99 in milliseconds (nearest rank), or None without samples."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return 1000 * ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {"p50_ms": rank(50), "p95_ms": rank(95), "p99_ms": rank(99), "count": len(ordered)}
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process and its children (Linux only)."""
+    total = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            status = Path(f"/proc/{current}/status").read_text()
+            for line in status.splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+            for task in Path(f"/proc/{current}/task").iterdir():
+                pending.extend(int(c) for c in (task / "children").read_text().split())
+    except OSError:
+        return total or None
+    return total
+
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DEBUG": "false",
+        "LLM_PROVIDER": "fake",
+        "FAKE_MODELS": args.model,
+        "FAKE_TTFT_MS": str(args.fake_ttft_ms),
+        "FAKE_TOKENS_PER_SECOND": str(args.fake_tokens_per_second),
+        "FAKE_RESPONSE_TOKENS": str(args.fake_tokens),
+        "FAKE_ERROR_RATE": str(args.fake_error_rate),
+        "SCHEDULER_MAX_CONCURRENT_PER_MODEL": str(args.model_concurrency),
+        "BATCH_WORKERS": "0",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/api/v1/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not become ready")
+        await asyncio.sleep(0.2)
+
+
+async def login(client: httpx.AsyncClient) -> dict[str, str]:
+    await client.post(
+        "/api/v1/auth/register", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    )
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def chat_stream(
+    client: httpx.AsyncClient, headers: dict, conversation_id: str
+) -> StreamResult:
+    result = StreamResult()
+    # Distinct prompts, so single-flight and the completion cache don't merge streams.
+    body = {"message": f"load test {uuid.uuid4()}"}
+    started = last = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST",
+            f"/api/v1/chat/conversations/{conversation_id}/chat",
+            json=body,
+            headers=headers,
+        ) as response:
+            if response.status_code != 200:
+                result.error = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                now = time.perf_counter()
+                if event["type"] in ("chunk", "thinking"):
+                    if result.ttft is None:
+                        result.ttft = now - started
+                    else:
+                        result.gaps.append(now - last)
+                    last = now
+                    result.tokens += 1
+                elif event["type"] == "error":
+                    result.error = event.get("error") or "error"
+                elif event["type"] == "done":
+                    result.tokens = (event.get("metadata") or {}).get(
+                        "tokens_generated", result.tokens
+                    )
+    except httpx.HTTPError as e:
+        result.error = type(e).__name__
+    finally:
+        result.latency = time.perf_counter() - started
+    return result
+
+
+async def stream_client(
+    client: httpx.AsyncClient, headers: dict, model: str, turns: int, results: list[StreamResult]
+) -> None:
+    response = await client.post(
+        "/api/v1/chat/conversations",
+        json={"title": "load test", "model": model},
+        headers=headers,
+    )
+    response.raise_for_status()
+    conversation_id = response.json()["id"]
+    for _ in range(turns):
+        results.append(await chat_stream(client, headers, conversation_id))
+
+
+async def crud_client(
+    client: httpx.AsyncClient,
+    headers: dict,
+    stop: asyncio.Event,
+    latencies: list[float],
+    errors: list[str],
+) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(
+                "/api/v1/chat/conversations", params={"page_size": 20}, headers=headers
+            )
+            response.raise_for_status()
+            items = response.json()["items"]
+            if items:
+                conversation_id = items[0]["id"]
+                (
+                    await client.get(
+                        f"/api/v1/chat/conversations/{conversation_id}", headers=headers
+                    )
+                ).raise_for_status()
+                (
+                    await client.patch(
+                        f"/api/v1/chat/conversations/{conversation_id}",
+                        json={"title": f"renamed {started:.3f}"},
+                        headers=headers,
+                    )
+                ).raise_for_status()
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def sample_rss(pid: Optional[int], stop: asyncio.Event, samples: list[int]) -> None:
+    if pid is None:
+        return
+    while not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except TimeoutError:
+            pass
+
+
+async def run(args, base_url: str, server_pid: Optional[int]) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.streams + args.crud_clients + 10)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=httpx.Timeout(300.0)
+    ) as client:
+        await wait_ready(client)
+        headers = await login(client)
+        metrics_before = (await client.get("/api/v1/metrics", headers=headers)).json()
+
+        stop = asyncio.Event()
+        streams: list[StreamResult] = []
+        crud_latencies: list[float] = []
+        crud_errors: list[str] = []
+        rss_samples: list[int] = []
+        background = [asyncio.create_task(sample_rss(server_pid, stop, rss_samples))]
+        background += [
+            asyncio.create_task(crud_client(client, headers, stop, crud_latencies, crud_errors))
+            for _ in range(args.crud_clients)
+        ]
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                stream_client(client, headers, args.model, args.turns, streams)
+                for _ in range(args.streams)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background)
+        metrics_after = (await client.get("/api/v1/metrics", headers=headers)).json()
+
+    ok = [s for s in streams if s.error is None]
+    pool_wait = metrics_after["summaries"].get("db.pool_wait_seconds")
+    pool_wait_before = metrics_before["summaries"].get("db.pool_wait_seconds") or {
+        "count": 0,
+        "sum": 0.0,
+    }
+    if pool_wait:
+        count = pool_wait["count"] - pool_wait_before["count"]
+        waited = pool_wait["sum"] - pool_wait_before["sum"]
+        pool_wait = {
+            "checkouts": count,
+            "avg_ms": 1000 * waited / count if count else 0.0,
+            "max_ms": 1000 * pool_wait["max"],
+        }
+    total_tokens = sum(s.tokens for s in ok)
+    return {
+        "elapsed_s": elapsed,
+        "streams": {
+            "requests": len(streams),
+            "errors": len(streams) - len(ok),
+            "ttft": percentiles([s.ttft for s in ok if s.ttft is not None]),
+            "inter_token": percentiles([gap for s in ok for gap in s.gaps]),
+            "latency": percentiles([s.latency for s in ok]),
+            "tokens_per_second": total_tokens / elapsed if elapsed else 0.0,
+            "tokens_total": total_tokens,
+        },
+        "crud": {
+            "requests": len(crud_latencies),
+            "errors": len(crud_errors),
+            "latency": percentiles(crud_latencies),
+        },
+        "db_pool_wait": pool_wait,
+        "rss_mb": {
+            "start": rss_samples[0] / 2**20,
+            "peak": max(rss_samples) / 2**20,
+            "end": rss_samples[-1] / 2**20,
+        }
+        if rss_samples
+        else None,
+    }
+
+
+def print_summary(results: dict[str, Any]) -> None:
+    streams = results["streams"]
+    print(
+        f"streams: {streams['requests']} requests, {streams['errors']} errors, "
+        f"{streams['tokens_per_second']:.0f} tokens/s over {results['elapsed_s']:.1f}s"
+    )
+    for label, key in (("TTFT", "ttft"), ("inter-token", "inter_token"), ("latency", "latency")):
+        p = streams[key]
+        if p:
+            print(
+                f"  {label:<12} p50 {p['p50_ms']:8.1f} ms  p95 {p['p95_ms']:8.1f} ms  p99 {p['p99_ms']:8.1f} ms"
+            )
+    crud = results["crud"]
+    if crud["latency"]:
+        p = crud["latency"]
+        print(
+            f"crud: {crud['requests']} requests, {crud['errors']} errors, "
+            f"p50 {p['p50_ms']:.1f} ms  p95 {p['p95_ms']:.1f} ms  p99 {p['p99_ms']:.1f} ms"
+        )
+    if results["db_pool_wait"]:
+        w = results["db_pool_wait"]
+        print(
+            f"db pool wait: {w['checkouts']} checkouts, avg {w['avg_ms']:.2f} ms, max {w['max_ms']:.2f} ms"
+        )
+    if results["rss_mb"]:
+        r = results["rss_mb"]
+        print(
+            f"server RSS: start {r['start']:.0f} MB, peak {r['peak']:.0f} MB, end {r['end']:.0f} MB"
+        )
+
+
+def compare(results: dict[str, Any], baseline_path: Path) -> None:
+    """Print the change of headline numbers against an earlier results file."""
+    baseline = json.loads(baseline_path.read_text())
+    old = baseline["results"]
+    rows = [
+        ("tokens/s", old["streams"]["tokens_per_second"], results["streams"]["tokens_per_second"]),
+    ]
+    for key in ("ttft", "inter_token", "latency"):
+        if old["streams"][key] and results["streams"][key]:
+            rows.append(
+                (f"{key} p99 ms", old["streams"][key]["p99_ms"], results["streams"][key]["p99_ms"])
+            )
+    if old["crud"]["latency"] and results["crud"]["latency"]:
+        rows.append(
+            ("crud p95 ms", old["crud"]["latency"]["p95_ms"], results["crud"]["latency"]["p95_ms"])
+        )
+    if old["rss_mb"] and results["rss_mb"]:
+        rows.append(("peak RSS MB", old["rss_mb"]["peak"], results["rss_mb"]["peak"]))
+
+    print(f"vs {baseline.get('revision') or baseline_path.name}:")
+    for label, before, after in rows:
+        change = 100 * (after - before) / before if before else 0.0
+        print(f"  {label:<18} {before:10.1f} -> {after:10.1f} ({change:+.1f}%)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="Server process to sample RSS from with --url")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--streams", type=int, default=50, help="Concurrent chat streams")
+    parser.add_argument("--turns", type=int, default=3, help="Messages sent per stream")
+    parser.add_argument("--crud-clients", type=int, default=4)
+    parser.add_argument("--model", default="fake-model")
+    parser.add_argument(
+        "--model-concurrency", type=int, default=0, help="Scheduler slots per model (0 = no cap)"
+    )
+    parser.add_argument("--fake-ttft-ms", type=float, default=200.0)
+    parser.add_argument("--fake-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--fake-tokens", type=int, default=100)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--label", default="", help="Free-form note stored with the results")
+    parser.add_argument("--output", type=Path, help="JSON file (default: benchmarks/results/...)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    server = None
+    base_url, pid = args.url, args.pid
+    if base_url is None:
+        server = start_server(args)
+        base_url, pid = f"http://127.0.0.1:{args.port}", server.pid
+    try:
+        results = await run(args, base_url, pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    revision = git_revision()
+    document = {
+        "benchmark": "load_test",
+        "revision": revision,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "label": args.label,
+        "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "results": results,
+    }
+    output = (
+        args.output
+        or RESULTS_DIR / f"load_test-{time.strftime('%Y%m%d-%H%M%S')}-{revision or 'unknown'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2))
+
+    print_summary(results)
+    if args.baseline:
+        compare(results, args.baseline)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""Replay Ollama /api/chat streams through the old and new parsing paths.
+
+Compares the previous approach (``aiter_lines`` + stdlib ``json.loads`` +
+``str +=`` accumulation) against ``iter_ndjson`` over ``aiter_bytes`` with
+orjson (the default) and the stdlib fallback, and list accumulation. Streams are synthesized in
+Ollama's format, or replayed from recordings captured with e.g.
+``curl -N http://localhost:11434/api/chat -d @request.json > stream.ndjson``.
+
+    uv run python -m benchmarks.ndjson_parse --tokens 1000 10000 50000
+    uv run python -m benchmarks.ndjson_parse --recording stream.ndjson
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import httpx
+
+from app.services.ndjson import JSONDecoder, get_json_decoder, iter_ndjson
+
+WORDS = [" the", " model", " answers", " with", " tokens", " like", " these", ",", " ünïcode", "\n"]
+NETWORK_CHUNK = 4096
+
+
+def synthesize_stream(tokens: int, thinking_tokens: int = 0) -> bytes:
+    lines = []
+    for i in range(thinking_tokens):
+        lines.append(
+            {
+                "model": "llama3.2",
+                "created_at": "2025-01-01T00:00:00.000000Z",
+                "message": {"role": "assistant", "content": "", "thinking": WORDS[i % len(WORDS)]},
+                "done": False,
+            }
+        )
+    for i in range(tokens):
+        lines.append(
+            {
+                "model": "llama3.2",
+                "created_at": "2025-01-01T00:00:00.000000Z",
+                "message": {"role": "assistant", "content": WORDS[i % len(WORDS)]},
+                "done": False,
+            }
+        )
+    lines.append(
+        {
+            "model": "llama3.2",
+            "created_at": "2025-01-01T00:00:00.000000Z",
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "total_duration": 1,
+            "prompt_eval_count": 10,
+            "eval_count": tokens,
+        }
+    )
+    return b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for i in range(0, len(self.body), NETWORK_CHUNK):
+            yield self.body[i : i + NETWORK_CHUNK]
+
+
+def _response(body: bytes) -> httpx.Response:
+    return httpx.Response(200, stream=_ReplayStream(body))
+
+
+async def parse_legacy(body: bytes) -> int:
+    full_content = ""
+    thinking = ""
+    async for line in _response(body).aiter_lines():
+        if not line:
+            continue
+        data = json.loads(line)
+        if data.get("done", False):
+            break
+        message = data.get("message", {})
+        thinking += message.get("thinking", "")
+        full_content += message.get("content", "")
+    return len(full_content) + len(thinking)
+
+
+async def parse_bytes(body: bytes, decoder: JSONDecoder) -> int:
+    content_parts: list[str] = []
+    thinking_parts: list[str] = []
+    async for data in iter_ndjson(_response(body).aiter_bytes(), decoder):
+        if data.get("done", False):
+            break
+        message = data.get("message", {})
+        if thinking := message.get("thinking", ""):
+            thinking_parts.append(thinking)
+        if content := message.get("content", ""):
+            content_parts.append(content)
+    return len("".join(content_parts)) + len("".join(thinking_parts))
+
+
+async def _time(coro_factory, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--recording", type=Path, nargs="*", default=[])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    streams = [(f"{n} tokens", synthesize_stream(n, n // 10)) for n in args.tokens]
+    streams += [(path.name, path.read_bytes()) for path in args.recording]
+
+    decoders: dict[str, JSONDecoder] = {}
+    for name in ("stdlib", "orjson"):
+        decoder = get_json_decoder(name)
+        decoders.setdefault(decoder.name, decoder)
+
+    header = f"{'stream':<16} {'legacy ms':>10}"
+    header += "".join(f" {name + ' ms':>12}" for name in decoders)
+    print(header)
+    for label, body in streams:
+        legacy = await _time(lambda: parse_legacy(body), args.repeat)
+        row = f"{label:<16} {legacy * 1000:>10.1f}"
+        for decoder in decoders.values():
+            elapsed = await _time(lambda: parse_bytes(body, decoder), args.repeat)
+            row += f" {elapsed * 1000:>12.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""Count TCP connections the Ollama client opens under many concurrent streams.
+
+Starts a fake Ollama on localhost (a bare asyncio HTTP/1.1 server that
+answers /api/chat with a chunked NDJSON stream and keeps connections alive),
+then runs ``--rounds`` rounds of ``--streams`` concurrent ``stream_chat``
+calls through one ``OllamaProvider``. For each round it prints the
+connections accepted, the peak number open at once and the stream latency,
+so a pool that keeps reusing its connections shows a flat line. The same
+load is also run with a fresh client per request as a baseline. No Ollama
+or DB needed. Run from ``backend/``:
+
+    uv run python -m benchmarks.ollama_connections --streams 500 --rounds 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.llm_provider import Message
+from app.services.ollama_provider import HTTPClientSettings, OllamaProvider
+
+
+class FakeOllamaServer:
+    """Streams ``tokens`` NDJSON chunks per /api/chat request over keep-alive HTTP/1.1."""
+
+    def __init__(self, tokens: int, token_ms: float):
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.accepted = 0
+        self.open = 0
+        self.peak_open = 0
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        for writer in self._writers:
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset(self) -> None:
+        self.accepted = 0
+        self.peak_open = self.open
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.accepted += 1
+        self.open += 1
+        self._writers.add(writer)
+        self.peak_open = max(self.peak_open, self.open)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/x-ndjson\r\n"
+                    b"Transfer-Encoding: chunked\r\n\r\n"
+                )
+                for _ in range(self.tokens):
+                    await asyncio.sleep(self.token_ms / 1000)
+                    self._chunk(writer, b'{"message":{"content":"tok "},"done":false}\n')
+                    await writer.drain()
+                self._chunk(writer, b'{"done":true,"eval_count":1}\n')
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.open -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+async def stream_once(provider: OllamaProvider) -> tuple[float, bool]:
+    start = time.perf_counter()
+    ok = True
+    async for chunk in provider.stream_chat([Message(role="user", content="hi")], "bench:7b"):
+        if chunk.metadata and chunk.metadata.get("error"):
+            ok = False
+    return time.perf_counter() - start, ok
+
+
+async def run_round(
+    base_url: str, http: HTTPClientSettings, streams: int, pooled: bool, provider: OllamaProvider
+) -> tuple[list[float], int]:
+    async def fresh() -> tuple[float, bool]:
+        one = OllamaProvider(base_url, http=http)
+        try:
+            return await stream_once(one)
+        finally:
+            await one.close()
+
+    results = await asyncio.gather(
+        *(stream_once(provider) if pooled else fresh() for _ in range(streams))
+    )
+    return [latency for latency, _ in results], sum(1 for _, ok in results if not ok)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--max-keepalive", type=int, default=100)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.tokens, args.token_ms)
+    base_url = await server.start()
+    http = HTTPClientSettings(
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_keepalive,
+    )
+
+    print(
+        f"{'client':<8} {'round':>5} {'accepted':>9} {'peak open':>10} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    for label, pooled in (("pooled", True), ("fresh", False)):
+        provider = OllamaProvider(base_url, http=http)
+        await provider.start()
+        for i in range(args.rounds):
+            server.reset()
+            latencies, errors = await run_round(base_url, http, args.streams, pooled, provider)
+            print(
+                f"{label:<8} {i + 1:>5} {server.accepted:>9} {server.peak_open:>10} {errors:>7} "
+                f"{1000 * statistics.median(latencies):>8.1f} "
+                f"{1000 * statistics.quantiles(latencies, n=100)[-1]:>8.1f}"
+            )
+        await provider.close()
+        # Let the server notice closed connections before the next run.
+        await asyncio.sleep(0.2)
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+"""Check how OllamaRouterProvider spreads load across several Ollama nodes.
+
+Each node is an in-process fake Ollama (an ``httpx.MockTransport``) that holds
+at most ``--models-per-node`` models in memory. Requesting a model that isn't
+loaded costs ``--load-ms`` and, when the node is full, evicts the least
+recently used model (a swap). Concurrent clients ask for random models and
+the script reports requests per node and swaps, for the router and for plain
+round-robin as a baseline. ``model-0`` is requested without a tag, as
+conversations usually do, and reported as ``model-0:latest`` like Ollama does;
+with few clients, affinity for it then depends on ``/api/ps`` alone. With
+``--stall-ms``, node 0 sometimes stalls before its first token, and the router
+is also run with hedging to compare p99 time-to-first-token. No Ollama or DB needed. Run from ``backend/``:
+
+    uv run python -m benchmarks.ollama_router --nodes 3 --models 6 --clients 48
+    uv run python -m benchmarks.ollama_router --nodes 3 --models 6 --clients 2 --requests 100
+    uv run python -m benchmarks.ollama_router --models 3 --models-per-node 3 --requests 40 \
+        --stall-ms 1000 --stall-prob 0.1 --hedge-ratio 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import OrderedDict
+from itertools import count
+
+import httpx
+
+from app.core.metrics import Metrics
+from app.services.llm_provider import Message
+from app.services.ollama_provider import OllamaProvider
+from app.services.ollama_router import OllamaNode, OllamaRouterProvider
+
+
+class FakeOllamaNode:
+    """Just enough of the Ollama HTTP API for routing: /api/chat, /api/ps, /api/tags."""
+
+    def __init__(
+        self,
+        models: list[str],
+        capacity: int,
+        load_ms: float,
+        tokens: int,
+        token_ms: float,
+        stall_ms: float = 0.0,
+        stall_prob: float = 0.0,
+    ):
+        self.models = models
+        self.stall_ms = stall_ms
+        self.stall_prob = stall_prob
+        self.capacity = capacity
+        self.load_ms = load_ms
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.loaded: OrderedDict[str, None] = OrderedDict()
+        self.loads = 0
+        self.swaps = 0
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/api/tags":
+            return httpx.Response(
+                200, json={"models": [{"name": m, "details": {}} for m in self.models]}
+            )
+        if path == "/api/ps":
+            return httpx.Response(
+                200, json={"models": [{"name": m, "size": 1} for m in self.loaded]}
+            )
+        if path == "/api/chat":
+            model = json.loads(request.content)["model"]
+            # Like Ollama, report untagged models under ":latest".
+            if ":" not in model:
+                model += ":latest"
+            self.requests += 1
+            await self._ensure_loaded(model)
+            return httpx.Response(200, content=self._stream())
+        return httpx.Response(404)
+
+    async def _ensure_loaded(self, model: str) -> None:
+        if model in self.loaded:
+            self.loaded.move_to_end(model)
+            return
+        self.loads += 1
+        if len(self.loaded) >= self.capacity:
+            self.loaded.popitem(last=False)
+            self.swaps += 1
+        self.loaded[model] = None
+        await asyncio.sleep(self.load_ms / 1000)
+
+    async def _stream(self):
+        if self.stall_ms and random.random() < self.stall_prob:
+            await asyncio.sleep(self.stall_ms / 1000)
+        for _ in range(self.tokens):
+            await asyncio.sleep(self.token_ms / 1000)
+            yield b'{"message":{"content":"tok "},"done":false}\n'
+        yield b'{"done":true,"eval_count":1}\n'
+
+
+class RoundRobinRouter(OllamaRouterProvider):
+    """Baseline: ignore loaded models and in-flight counts."""
+
+    def __init__(self, nodes, **kwargs):
+        super().__init__(nodes, **kwargs)
+        self._next = count()
+
+    def pick_node(self, model: str) -> OllamaNode:
+        return self.nodes[next(self._next) % len(self.nodes)]
+
+
+async def run(router_cls, args, hedge_ratio: float = 0.0) -> dict:
+    # Conversations usually name models without a tag, e.g. "llama3.2".
+    models = ["model-0"] + [f"model-{i}:7b" for i in range(1, args.models)]
+    fakes = [
+        FakeOllamaNode(
+            models,
+            args.models_per_node,
+            args.load_ms,
+            args.tokens,
+            args.token_ms,
+            stall_ms=args.stall_ms if i == 0 else 0.0,
+            stall_prob=args.stall_prob,
+        )
+        for i in range(args.nodes)
+    ]
+    providers = [
+        OllamaProvider(f"http://node-{i}", transport=httpx.MockTransport(fake.handle))
+        for i, fake in enumerate(fakes)
+    ]
+    router = router_cls(providers, poll_interval=0.5, hedge_ratio=hedge_ratio)
+    await router.start()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    hedges_before = Metrics.snapshot()["counters"].get("router.hedges", 0)
+
+    async def client() -> None:
+        for _ in range(args.requests):
+            model = rng.choice(models)
+            start = time.perf_counter()
+            first = None
+            async for _ in router.stream_chat([Message(role="user", content="hi")], model):
+                if first is None:
+                    first = time.perf_counter() - start
+            latencies.append(time.perf_counter() - start)
+            ttfts.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    await router.close()
+
+    per_node = [f.requests for f in fakes]
+    hedges = Metrics.snapshot()["counters"].get("router.hedges", 0) - hedges_before
+    return {
+        "hedge_pct": 100 * hedges / len(latencies),
+        "ttft_p99_ms": 1000 * statistics.quantiles(ttfts, n=100)[-1],
+        "requests_per_node": per_node,
+        "spread_stdev_pct": 100 * statistics.pstdev(per_node) / statistics.mean(per_node),
+        "model_loads": sum(f.loads for f in fakes),
+        "swaps": sum(f.swaps for f in fakes),
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * statistics.quantiles(latencies, n=20)[-1],
+        "elapsed_s": elapsed,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--models", type=int, default=6)
+    parser.add_argument("--models-per-node", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=48)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--load-ms", type=float, default=200.0)
+    parser.add_argument("--stall-ms", type=float, default=0.0, help="First-token stall on node 0")
+    parser.add_argument("--stall-prob", type=float, default=0.1)
+    parser.add_argument("--hedge-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    runs = [("router", OllamaRouterProvider, 0.0), ("round-robin", RoundRobinRouter, 0.0)]
+    if args.stall_ms:
+        runs.append(("hedged", OllamaRouterProvider, args.hedge_ratio))
+
+    print(
+        f"{'routing':<12} {'per node':<20} {'stdev %':>8} {'loads':>6} {'swaps':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'ttft p99':>9} {'hedge %':>8}"
+    )
+    for label, cls, hedge_ratio in runs:
+        r = await run(cls, args, hedge_ratio)
+        print(
+            f"{label:<12} {str(r['requests_per_node']):<20} {r['spread_stdev_pct']:>8.1f} "
+            f"{r['model_loads']:>6} {r['swaps']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{r['ttft_p99_ms']:>9.1f} {r['hedge_pct']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
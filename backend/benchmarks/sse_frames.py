@@ -0,0 +1,81 @@
+"""Compare SSE framing strategies for the chat stream endpoint.
+
+Feeds a synthetic token stream through ``coalesce_chunks`` and ``encode_chunk``
+with different settings and reports frames per second, bytes on the wire and
+CPU time per streamed token. No database or Ollama is needed.
+
+    uv run python -m benchmarks.sse_frames --tokens 20000 --token-interval-ms 2
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+from app.services.llm_provider import ChatChunk
+from app.services.sse import coalesce_chunks, encode_chunk
+
+WORDS = ["The", " quick", " brown", " fox", " jumps", " over", " the", " lazy", " dög", ".\n"]
+
+
+async def _token_stream(tokens: int, interval: float) -> AsyncIterator[tuple[int, ChatChunk]]:
+    for i in range(tokens):
+        if interval and i % 10 == 0:
+            # Sleep once per ten tokens; per-token sleeps are dominated by timer slack.
+            await asyncio.sleep(interval * 10)
+        yield i + 1, ChatChunk(content=WORDS[i % len(WORDS)])
+    yield tokens + 1, ChatChunk(content="", is_finished=True, metadata={"tokens_generated": tokens})
+
+
+async def _run(tokens: int, interval: float, *, fast: bool, window_ms: int, max_bytes: int) -> dict:
+    frames = 0
+    wire_bytes = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    chunks = coalesce_chunks(
+        _token_stream(tokens, interval),
+        window_ms=window_ms,
+        max_bytes=max_bytes,
+    )
+    async for event_id, chunk in chunks:
+        frame = encode_chunk(chunk, fast=fast, event_id=event_id)
+        frames += 1
+        wire_bytes += len(frame.encode("utf-8"))
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        "frames": frames,
+        "frames_per_sec": frames / wall,
+        "bytes": wire_bytes,
+        "cpu_us_per_token": cpu / tokens * 1e6,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--token-interval-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    interval = args.token_interval_ms / 1000
+
+    scenarios = [
+        ("pydantic, per token", dict(fast=False, window_ms=0, max_bytes=0)),
+        ("template, per token", dict(fast=True, window_ms=0, max_bytes=0)),
+        ("template, 256 B batches", dict(fast=True, window_ms=0, max_bytes=256)),
+        ("template, 20 ms window", dict(fast=True, window_ms=20, max_bytes=0)),
+        ("template, 50 ms window", dict(fast=True, window_ms=50, max_bytes=4096)),
+    ]
+
+    print(f"{'scenario':<26} {'frames':>8} {'frames/s':>12} {'bytes':>10} {'cpu us/token':>13}")
+    for label, kwargs in scenarios:
+        r = await _run(args.tokens, interval, **kwargs)
+        print(
+            f"{label:<26} {r['frames']:>8} {r['frames_per_sec']:>12.0f} "
+            f"{r['bytes']:>10} {r['cpu_us_per_token']:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.context_builder import (
+    HistoryEntry,
+    KeepFirstPlusRecent,
+    RecentPlusSummary,
+    SlidingWindow,
+    estimate_tokens,
+    get_context_strategy,
+)
+
+
+def history(*tokens: int) -> list[HistoryEntry]:
+    return [HistoryEntry("user", f"m{i}", t) for i, t in enumerate(tokens)]
+
+
+def contents(entries: list[HistoryEntry]) -> list[str]:
+    return [e.content for e in entries]
+
+
+SUMMARY = HistoryEntry("system", "summary", 15)
+
+
+def test_estimate_includes_message_overhead():
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("x" * 40) == 14
+
+
+@pytest.mark.parametrize("strategy", [SlidingWindow(), KeepFirstPlusRecent(2), RecentPlusSummary()])
+def test_everything_is_kept_when_it_fits(strategy):
+    entries = history(10, 10, 10)
+    assert strategy.select(entries, 30) == entries
+    assert strategy.select(entries, 45, SUMMARY) == [SUMMARY] + entries
+
+
+@pytest.mark.parametrize("strategy", [SlidingWindow(), KeepFirstPlusRecent(2), RecentPlusSummary()])
+def test_newest_message_is_kept_even_over_budget(strategy):
+    assert strategy.select(history(10, 50), 20)[-1].content == "m1"
+
+
+def test_sliding_window_keeps_the_newest_that_fit():
+    assert contents(SlidingWindow().select(history(10, 10, 10, 10), 25)) == ["m2", "m3"]
+
+
+def test_sliding_window_drops_the_summary_when_trimming():
+    assert contents(SlidingWindow().select(history(10, 10, 10), 25, SUMMARY)) == ["m1", "m2"]
+
+
+def test_keep_first_pins_the_opening_messages():
+    entries = history(5, 5, 10, 10, 10, 10)
+    assert contents(KeepFirstPlusRecent(2).select(entries, 30)) == ["m0", "m1", "m4", "m5"]
+
+
+def test_keep_first_falls_back_when_the_head_fills_the_budget():
+    entries = history(20, 20, 10, 10)
+    assert contents(KeepFirstPlusRecent(2).select(entries, 25)) == ["m2", "m3"]
+
+
+def test_recent_plus_summary_keeps_the_summary_first():
+    selected = RecentPlusSummary().select(history(10, 10, 10, 10), 40, SUMMARY)
+    assert selected[0] is SUMMARY
+    assert contents(selected[1:]) == ["m2", "m3"]
+
+
+def test_recent_plus_summary_without_summary_is_a_sliding_window():
+    assert contents(RecentPlusSummary().select(history(10, 10, 10), 25)) == ["m1", "m2"]
+
+
+def test_strategies_by_name():
+    assert isinstance(get_context_strategy("sliding_window"), SlidingWindow)
+    assert get_context_strategy("keep_first", keep_first=3).keep_first == 3
+    assert isinstance(get_context_strategy("recent_plus_summary"), RecentPlusSummary)
+    with pytest.raises(ValueError):
+        get_context_strategy("everything")
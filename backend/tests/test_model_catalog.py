@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+
+from app.services.llm_provider import ModelInfo
+from app.services.model_catalog import ModelCatalog
+
+
+class StubProvider:
+    name = "stub"
+
+    def __init__(self, ids: list[str]):
+        self.ids = ids
+        self.calls = 0
+
+    async def list_models(self) -> list[ModelInfo]:
+        self.calls += 1
+        return [ModelInfo(id=i, name=i, context_length=8192) for i in self.ids]
+
+
+def lookup(provider: StubProvider, model: str) -> Optional[ModelInfo]:
+    async def run():
+        ModelCatalog.invalidate()
+        info = await ModelCatalog.get(provider, model)
+        await asyncio.sleep(0)  # let any background refresh start
+        return info
+
+    return asyncio.run(run())
+
+
+def test_untagged_name_matches_latest():
+    provider = StubProvider(["llama3.2:latest", "qwen2.5:7b"])
+    info = lookup(provider, "llama3.2")
+    assert info is not None and info.id == "llama3.2:latest"
+    assert info.context_length == 8192
+    assert provider.calls == 1
+
+
+def test_latest_name_matches_untagged_listing():
+    info = lookup(StubProvider(["llama3.2"]), "llama3.2:latest")
+    assert info is not None and info.id == "llama3.2"
+
+
+def test_other_tags_do_not_match():
+    provider = StubProvider(["qwen2.5:7b"])
+    assert lookup(provider, "qwen2.5") is None
+    # An unknown model triggers one more refresh in case it was just pulled.
+    assert provider.calls == 2
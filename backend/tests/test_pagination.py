@@ -0,0 +1,45 @@
+import base64
+from datetime import UTC, datetime
+
+import pytest
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    at = datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=UTC)
+    assert decode_cursor(encode_cursor(at, "abc-123")) == (at, "abc-123")
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(datetime(2026, 1, 1, tzinfo=UTC), "?/+=")
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def test_naive_timestamps_stay_naive():
+    at = datetime(2026, 1, 1, 8, 0)
+    assert decode_cursor(encode_cursor(at, "x"))[0] == at
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "%%%",
+        b64(b"not json"),
+        b64(b'{"at": "2026-01-01"}'),
+        b64(b'["2026-01-01"]'),
+        b64(b'["yesterday", "x"]'),
+        b64(b"[1, 2]"),
+        b64(b"\xff\xfe"),
+    ],
+)
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
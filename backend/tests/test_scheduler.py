@@ -0,0 +1,93 @@
+import pytest
+
+from app.services.scheduler import GenerationScheduler, QueueFullError
+
+
+@pytest.fixture(autouse=True)
+def scheduler():
+    GenerationScheduler._queues.clear()
+    GenerationScheduler.configure(max_concurrent=1, max_queue=4)
+    yield GenerationScheduler
+    GenerationScheduler._queues.clear()
+
+
+def position(ticket) -> int:
+    return GenerationScheduler._queues[ticket.model].position(ticket)
+
+
+def test_grants_immediately_while_slots_are_free():
+    GenerationScheduler.configure(max_concurrent=2, max_queue=4)
+    first = GenerationScheduler.enqueue("m", "alice")
+    second = GenerationScheduler.enqueue("m", "bob")
+    third = GenerationScheduler.enqueue("m", "carol")
+    assert first.granted and second.granted
+    assert not third.granted
+    assert position(third) == 1
+
+
+def test_waiting_users_are_served_round_robin():
+    running = GenerationScheduler.enqueue("m", "alice")
+    a1 = GenerationScheduler.enqueue("m", "alice")
+    a2 = GenerationScheduler.enqueue("m", "alice")
+    b1 = GenerationScheduler.enqueue("m", "bob")
+    assert [position(t) for t in (a1, b1, a2)] == [1, 2, 3]
+
+    GenerationScheduler.release(running)
+    assert a1.granted and not b1.granted
+    GenerationScheduler.release(a1)
+    assert b1.granted and not a2.granted
+    GenerationScheduler.release(b1)
+    assert a2.granted
+
+
+def test_leaving_the_queue_moves_others_up():
+    GenerationScheduler.enqueue("m", "alice")
+    b1 = GenerationScheduler.enqueue("m", "bob")
+    c1 = GenerationScheduler.enqueue("m", "carol")
+    GenerationScheduler.release(b1)
+    assert position(c1) == 1
+    GenerationScheduler.release(b1)  # releasing twice is harmless
+    assert position(c1) == 1
+
+
+def test_full_queue_raises_with_retry_after():
+    GenerationScheduler.configure(max_concurrent=2, max_queue=1)
+    GenerationScheduler.enqueue("m", "alice")
+    GenerationScheduler.enqueue("m", "alice")
+    GenerationScheduler.enqueue("m", "bob")
+    with pytest.raises(QueueFullError) as exc:
+        GenerationScheduler.enqueue("m", "carol")
+    # Default 5 s average hold spread over 2 slots, rounded up.
+    assert exc.value.retry_after == 3
+    assert exc.value.model == "m:latest"
+
+
+def test_try_acquire_keeps_headroom_free():
+    GenerationScheduler.configure(max_concurrent=4, max_queue=4)
+    tickets = [GenerationScheduler.try_acquire("m", "__batch__", headroom=1) for _ in range(4)]
+    assert [t is not None for t in tickets] == [True, True, True, False]
+    # Interactive requests still get the reserved slot.
+    assert GenerationScheduler.enqueue("m", "alice").granted
+
+
+def test_try_acquire_returns_none_while_users_wait():
+    GenerationScheduler.enqueue("m", "alice")
+    waiting = GenerationScheduler.enqueue("m", "bob")
+    assert GenerationScheduler.try_acquire("m", "__batch__") is None
+    assert not waiting.released and position(waiting) == 1
+
+
+def test_headroom_never_reserves_every_slot():
+    assert GenerationScheduler.try_acquire("m", "__batch__", headroom=3) is not None
+
+
+def test_tagged_and_untagged_names_share_a_queue():
+    GenerationScheduler.enqueue("llama3.2", "alice")
+    assert GenerationScheduler.try_acquire("llama3.2:latest", "__batch__") is None
+    assert not GenerationScheduler.enqueue("llama3.2:latest", "bob").granted
+
+
+def test_per_model_limits_use_canonical_names():
+    GenerationScheduler.configure(max_concurrent=1, max_queue=4, model_limits={"big": 2})
+    assert GenerationScheduler.enqueue("big:latest", "alice").granted
+    assert GenerationScheduler.enqueue("big", "bob").granted
@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.llm_provider import ChatChunk
+from app.services.sse import encode_chunk, to_response_chunk
+
+TEXTS = [
+    "",
+    "hello",
+    ' "quoted" and \\backslashes\\',
+    "line\nbreak\ttab\rreturn",
+    "control \x00\x01\x1f\x7f chars",
+    "ünïcode, 漢字, emoji 🚀",
+    "line separators \u2028 \u2029",
+    "</script> & <b>html</b>",
+]
+
+
+@pytest.mark.parametrize("thinking", [False, True])
+@pytest.mark.parametrize("text", TEXTS)
+def test_fast_frames_match_pydantic_serialization(text, thinking):
+    # The fast path hand-builds the JSON; it must stay byte-identical to the
+    # schema's own serialization when ChatResponseChunk changes.
+    chunk = ChatChunk(content=text, is_thinking=thinking)
+    expected = f"data: {to_response_chunk(chunk).model_dump_json()}\n\n"
+    assert encode_chunk(chunk, fast=True) == expected
+    assert encode_chunk(chunk, fast=False) == expected
+
+
+def test_event_id_prefix():
+    chunk = ChatChunk(content="hi")
+    assert encode_chunk(chunk, event_id=7) == "id: 7\n" + encode_chunk(chunk)
+
+
+def test_terminal_and_error_chunks_bypass_the_template():
+    done = ChatChunk(content="", is_finished=True, metadata={"eval_count": 3})
+    assert encode_chunk(done) == f"data: {to_response_chunk(done).model_dump_json()}\n\n"
+    error = ChatChunk(content="boom", metadata={"error": True})
+    assert '"type":"error"' in encode_chunk(error)